@@ -1,32 +1,201 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.exc import DatabaseError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 import os
 from dotenv import load_dotenv
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
+from threading import Lock
+
+from backend.config import pool
+from backend.models.job import Base, Job
 
-Base = declarative_base()
 load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("SQLALCHEMY_DATABASE_URL")
-# Create all tables defined in the metadata if they don't exist
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
 
+sync_pool_stats = pool.PoolStats()
+async_pool_stats = pool.PoolStats()
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=pool.instrumented_pool_class(QueuePool, sync_pool_stats),
+    **pool.get_pool_options(),
+)
+pool.track_pool_events(engine, sync_pool_stats)
 
-# Create all tables defined in the metadata if they don't exist
-Base.metadata.create_all(bind=engine)
 
 # Create a session factory
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Lease renewals open a connection of their own, waiting for a free connection of
+# a busy pool could keep them from renewing before the lease expires
+lease_engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+LeaseSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=lease_engine)
+
+# Async drivers used for the non-blocking session of the API endpoints
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def get_async_database_url(database_url: str) -> str:
+    """
+    Get the async connection string matching a sync connection string.
+
+    Args:
+        database_url (str): The sync SQLAlchemy connection string.
+
+    Returns:
+        str: SQLALCHEMY_ASYNC_DATABASE_URL if set, otherwise the given
+        connection string with its driver swapped for an async one.
+    """
+    async_database_url = os.getenv("SQLALCHEMY_ASYNC_DATABASE_URL")
+    if async_database_url:
+        return async_database_url
+
+    url = make_url(database_url)
+    drivername = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+async_engine = create_async_engine(
+    get_async_database_url(SQLALCHEMY_DATABASE_URL),
+    poolclass=pool.instrumented_pool_class(AsyncAdaptedQueuePool, async_pool_stats),
+    **pool.get_pool_options(),
+)
+pool.track_pool_events(async_engine.sync_engine, async_pool_stats)
+
+# Objects stay usable after commit, the endpoints serialize them afterwards
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+# Columns added to tables that existed before them, create_all doesn't alter existing tables
+ADDED_COLUMNS = {
+    "jobs": ("misfire_policy", "misfire_grace_seconds"),
+    "job_type": (
+        "misfire_policy",
+        "misfire_grace_seconds",
+        "max_concurrency",
+        "rate_limit",
+        "rate_burst",
+    ),
+    "event_mappings": ("max_concurrency", "rate_limit", "rate_burst"),
+}
+
+_initialized = False
+_init_lock = Lock()
+
+
+def add_missing_columns(bind):
+    """
+    Add the columns of ADDED_COLUMNS missing from their table.
+
+    The columns are all nullable, existing rows get NULL and fall back to
+    the defaults. Calling it again, or from several processes at once, is
+    harmless.
+
+    Args:
+        bind (Engine): The engine of the database to upgrade.
+
+    Returns:
+        list: The "table.column" names of the added columns.
+    """
+    added = []
+    for table_name, column_names in ADDED_COLUMNS.items():
+        existing = {column["name"] for column in inspect(bind).get_columns(table_name)}
+
+        for column_name in column_names:
+            if column_name in existing:
+                continue
+
+            column = Base.metadata.tables[table_name].c[column_name]
+            quote = bind.dialect.identifier_preparer.quote
+            statement = text(
+                f"ALTER TABLE {quote(table_name)} ADD COLUMN {quote(column_name)} "
+                f"{column.type.compile(dialect=bind.dialect)}"
+            )
+            try:
+                with bind.begin() as connection:
+                    connection.execute(statement)
+            except DatabaseError:
+                # Another process added it first
+                if column_name not in {
+                    column["name"] for column in inspect(bind).get_columns(table_name)
+                }:
+                    raise
+                continue
+
+            added.append(f"{table_name}.{column_name}")
+
+    return added
+
+
+def init_database():
+    """
+    Create the missing tables, columns and indexes, and seed the table versions.
+
+    Importing this module doesn't touch the database, the application calls
+    this once on startup. Tools and workers that only use existing tables
+    don't need to. Calling it again is a no-op.
+    """
+    global _initialized
+
+    # Imported here, table_versions pulls in FastAPI which workers don't need
+    from backend.helper import table_versions
+
+    with _init_lock:
+        if _initialized:
+            return
+
+        # Create all tables defined in the metadata if they don't exist
+        Base.metadata.create_all(bind=engine)
+
+        # Columns added to existing tables by an upgrade
+        add_missing_columns(engine)
+
+        # create_all doesn't add new indexes to existing tables, so the job listing
+        # index is created explicitly
+        for index in Job.__table__.indexes:
+            if index.name == "ix_jobs_status_execution_time_priority":
+                index.create(bind=engine, checkfirst=True)
+
+        table_versions.seed(engine)
+
+        _initialized = True
+
+
+def get_pool_stats():
+    """
+    Get the statistics of the sync and async connection pools.
+
+    Returns:
+        dict: Pool statistics in JSON format, keyed by engine.
+    """
+    return {
+        "sync": sync_pool_stats.to_json(engine.pool),
+        "async": async_pool_stats.to_json(async_engine.sync_engine.pool),
+    }
+
 
 @contextmanager
-def get_database_connection() -> Session:
+def get_database_connection(session_factory=None) -> Session:
     """
     Context manager for handling database connections and transactions.
 
+    Args:
+        session_factory (sessionmaker, optional): Creates the session.
+            Defaults to SessionLocal, on the pooled engine.
+
     Yields:
         Session: A SQLAlchemy database session.
 
@@ -37,7 +206,7 @@ def get_database_connection() -> Session:
         - The session is committed if no exceptions occur.
         - The session is rolled back if an exception occurs.
     """
-    db = SessionLocal()
+    db = (session_factory or SessionLocal)()
     try:
         yield db
         db.commit()
@@ -46,3 +215,31 @@ def get_database_connection() -> Session:
         raise
     finally:
         db.close()
+
+
+@asynccontextmanager
+async def get_async_database_connection() -> AsyncSession:
+    """
+    Async context manager for handling database connections and transactions.
+
+    Queries made through this session don't block the event loop.
+
+    Yields:
+        AsyncSession: A SQLAlchemy async database session.
+
+    Raises:
+        Any: Any exception raised during the transaction.
+
+    Notes:
+        - The session is committed if no exceptions occur.
+        - The session is rolled back if an exception occurs.
+    """
+    db = AsyncSessionLocal()
+    try:
+        yield db
+        await db.commit()
+    except:
+        await db.rollback()
+        raise
+    finally:
+        await db.close()
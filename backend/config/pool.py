@@ -0,0 +1,140 @@
+import os
+from threading import Lock
+from time import perf_counter
+
+from sqlalchemy import event, exc
+
+# Connection pool settings shared by the sync and the async engine. Size the
+# pool against the scheduler/execution threads and the uvicorn worker count.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+
+def get_pool_options():
+    """
+    Get the engine keyword arguments configuring the connection pool.
+
+    Returns:
+        dict: Keyword arguments for create_engine/create_async_engine.
+    """
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+
+
+class PoolStats:
+    """
+    Counters describing the activity of a connection pool.
+
+    Attributes:
+        connects (int): Number of new DBAPI connections opened.
+        checkouts (int): Number of connections handed out by the pool.
+        checkins (int): Number of connections returned to the pool.
+        invalidations (int): Number of connections invalidated.
+        timeouts (int): Number of checkouts that timed out waiting for a connection.
+        wait_time_total (float): Total seconds spent waiting for a connection.
+        wait_time_max (float): Longest wait for a connection, in seconds.
+    """
+
+    def __init__(self):
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self._lock = Lock()
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.wait_time_total += seconds
+            self.wait_time_max = max(self.wait_time_max, seconds)
+
+    def to_json(self, pool):
+        """
+        Convert the counters and the live state of the pool to JSON.
+
+        Args:
+            pool: The pool the counters belong to.
+
+        Returns:
+            dict: JSON representation of the pool statistics.
+        """
+        with self._lock:
+            stats = {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_time_total": self.wait_time_total,
+                "wait_time_max": self.wait_time_max,
+                "wait_time_avg": self.wait_time_total / self.checkouts
+                if self.checkouts
+                else 0.0,
+            }
+
+        if hasattr(pool, "checkedout"):
+            stats.update(
+                {
+                    "size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "overflow_in_use": max(pool.overflow(), 0),
+                }
+            )
+
+        return stats
+
+
+def instrumented_pool_class(pool_class, stats: PoolStats):
+    """
+    Create a pool class that records how long checkouts wait for a connection.
+
+    Args:
+        pool_class: The pool class to instrument, e.g. QueuePool.
+        stats (PoolStats): The counters to record into.
+
+    Returns:
+        type: A subclass of pool_class.
+    """
+
+    class InstrumentedPool(pool_class):
+        def _do_get(self):
+            started = perf_counter()
+            try:
+                return super()._do_get()
+            except exc.TimeoutError:
+                stats.increment("timeouts")
+                raise
+            finally:
+                stats.record_wait(perf_counter() - started)
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    return InstrumentedPool
+
+
+def track_pool_events(engine, stats: PoolStats):
+    """
+    Count connects, checkouts, checkins and invalidations of an engine's pool.
+
+    Args:
+        engine: The (sync) engine whose pool should be tracked.
+        stats (PoolStats): The counters to record into.
+    """
+    event.listen(engine, "connect", lambda *args: stats.increment("connects"))
+    event.listen(engine, "checkout", lambda *args: stats.increment("checkouts"))
+    event.listen(engine, "checkin", lambda *args: stats.increment("checkins"))
+    event.listen(engine, "invalidate", lambda *args: stats.increment("invalidations"))
+    event.listen(engine, "soft_invalidate", lambda *args: stats.increment("invalidations"))
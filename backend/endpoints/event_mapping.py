@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from sqlalchemy import select
 
 from backend.schema.event_mapping import EventMappingCreate, EventMappingUpdate
-from backend.config.db import get_database_connection
+from backend.config.db import get_async_database_connection
 from backend.models.job import EventMapping
-from backend.helper import log
+from backend.helper import log, reference_cache, table_versions
 
 router = APIRouter()
 
@@ -24,25 +25,39 @@ async def create_event_mapping(event_mapping: EventMappingCreate):
     Raises:
         HTTPException: If the event mapping could not be created.
     """
-    with get_database_connection() as db:
+    async with get_async_database_connection() as db:
         db_event_mapping = EventMapping(**event_mapping.dict())
         db.add(db_event_mapping)
-        db.commit()
-        db.refresh(db_event_mapping)
+        await db.run_sync(table_versions.bump, table_versions.EVENT_MAPPINGS)
+        await db.commit()
+        reference_cache.event_mappings.invalidate()
+        await db.refresh(db_event_mapping)
         return db_event_mapping
 
 
 @router.get("/")
-async def get_event_mappings():
+async def get_event_mappings(request: Request):
     """
     Get all event mappings.
 
+    Supports conditional requests through the ETag and Last-Modified
+    headers, an unchanged list is answered with 304.
+
+    Args:
+        request (Request): The incoming request, holding the validators.
+
     Returns:
         list: List of event mappings in JSON format.
     """
-    with get_database_connection() as db:
-        event_mappings = db.query(EventMapping).all()
-        return [event_mapping.to_json() for event_mapping in event_mappings]
+    async with get_async_database_connection() as db:
+
+        async def load_event_mappings():
+            event_mappings = (await db.scalars(select(EventMapping))).all()
+            return [event_mapping.to_json() for event_mapping in event_mappings]
+
+        return await table_versions.get_list_response(
+            request, db, table_versions.EVENT_MAPPINGS, load_event_mappings
+        )
 
 
 @router.put("/{event_mapping_id}")
@@ -60,16 +75,17 @@ async def update_event_mapping(event_mapping_id: int, updated_event_mapping: Eve
     Raises:
         HTTPException: If the event mapping could not be found.
     """
-    with get_database_connection() as db:
-        event_mapping = db.query(EventMapping).filter(
-            EventMapping.id == event_mapping_id).first()
+    async with get_async_database_connection() as db:
+        event_mapping = await db.get(EventMapping, event_mapping_id)
         if not event_mapping:
             raise HTTPException(
                 status_code=404, detail="Event Mapping not found")
         for attr, value in updated_event_mapping.dict(exclude_unset=True).items():
             setattr(event_mapping, attr, value)
-        db.commit()
-        db.refresh(event_mapping)
+        await db.run_sync(table_versions.bump, table_versions.EVENT_MAPPINGS)
+        await db.commit()
+        reference_cache.event_mappings.invalidate()
+        await db.refresh(event_mapping)
         return event_mapping
 
 
@@ -87,9 +103,8 @@ async def get_event_mapping(event_mapping_id: int):
     Raises:
         HTTPException: If the event mapping could not be found.
     """
-    with get_database_connection() as db:
-        event_mapping = db.query(EventMapping).filter(
-            EventMapping.id == event_mapping_id).first()
+    async with get_async_database_connection() as db:
+        event_mapping = await db.get(EventMapping, event_mapping_id)
         if not event_mapping:
             raise HTTPException(
                 status_code=404, detail="Event Mapping not found")
@@ -110,12 +125,13 @@ async def delete_event_mapping(event_mapping_id: int):
     Raises:
         HTTPException: If the event mapping could not be found.
     """
-    with get_database_connection() as db:
-        event_mapping = db.query(EventMapping).filter(
-            EventMapping.id == event_mapping_id).first()
+    async with get_async_database_connection() as db:
+        event_mapping = await db.get(EventMapping, event_mapping_id)
         if not event_mapping:
             raise HTTPException(
                 status_code=404, detail="Event Mapping not found")
-        db.delete(event_mapping)
-        db.commit()
+        await db.delete(event_mapping)
+        await db.run_sync(table_versions.bump, table_versions.EVENT_MAPPINGS)
+        await db.commit()
+        reference_cache.event_mappings.invalidate()
         return {"detail": "Event Mapping deleted"}
@@ -1,23 +1,37 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from sqlalchemy import select
 
-from backend.config.db import get_database_connection
+from backend.config.db import get_async_database_connection
 from backend.schema.execution_type import ExecutionTypeCreate, ExecutionTypeUpdate
 from backend.models.job import ExecutionType
+from backend.helper import reference_cache, table_versions
 
 router = APIRouter()
 
 
 @router.get("/")
-async def get_execution_types():
+async def get_execution_types(request: Request):
     """
     Get all execution types.
 
+    Supports conditional requests through the ETag and Last-Modified
+    headers, an unchanged list is answered with 304.
+
+    Args:
+        request (Request): The incoming request, holding the validators.
+
     Returns:
         list: List of execution types in JSON format.
     """
-    with get_database_connection() as db:
-        execution_types = db.query(ExecutionType).all()
-        return [execution_type.to_json() for execution_type in execution_types]
+    async with get_async_database_connection() as db:
+
+        async def load_execution_types():
+            execution_types = (await db.scalars(select(ExecutionType))).all()
+            return [execution_type.to_json() for execution_type in execution_types]
+
+        return await table_versions.get_list_response(
+            request, db, table_versions.EXECUTION_TYPES, load_execution_types
+        )
 
 
 @router.post("/")
@@ -34,11 +48,13 @@ async def create_execution_type(execution_type: ExecutionTypeCreate):
     Raises:
         HTTPException: If the execution type could not be created.
     """
-    with get_database_connection() as db:
+    async with get_async_database_connection() as db:
         db_execution_type = ExecutionType(**execution_type.dict())
         db.add(db_execution_type)
-        db.commit()
-        db.refresh(db_execution_type)
+        await db.run_sync(table_versions.bump, table_versions.EXECUTION_TYPES)
+        await db.commit()
+        reference_cache.execution_types.invalidate()
+        await db.refresh(db_execution_type)
         return db_execution_type
 
 
@@ -57,16 +73,17 @@ async def update_execution_type(execution_type_id: int, updated_execution_type:
     Raises:
         HTTPException: If the execution type could not be found.
     """
-    with get_database_connection() as db:
-        execution_type = db.query(ExecutionType).filter(
-            ExecutionType.id == execution_type_id).first()
+    async with get_async_database_connection() as db:
+        execution_type = await db.get(ExecutionType, execution_type_id)
         if not execution_type:
             raise HTTPException(
                 status_code=404, detail="Execution Type not found")
         for attr, value in updated_execution_type.dict(exclude_unset=True).items():
             setattr(execution_type, attr, value)
-        db.commit()
-        db.refresh(execution_type)
+        await db.run_sync(table_versions.bump, table_versions.EXECUTION_TYPES)
+        await db.commit()
+        reference_cache.execution_types.invalidate()
+        await db.refresh(execution_type)
         return execution_type
 
 
@@ -84,9 +101,8 @@ async def get_execution_type(execution_type_id: int):
     Raises:
         HTTPException: If the execution type could not be found.
     """
-    with get_database_connection() as db:
-        execution_type = db.query(ExecutionType).filter(
-            ExecutionType.id == execution_type_id).first()
+    async with get_async_database_connection() as db:
+        execution_type = await db.get(ExecutionType, execution_type_id)
         if not execution_type:
             raise HTTPException(
                 status_code=404, detail="Execution Type not found")
@@ -107,12 +123,13 @@ async def delete_execution_type(execution_type_id: int):
     Raises:
         HTTPException: If the execution type could not be found.
     """
-    with get_database_connection() as db:
-        execution_type = db.query(ExecutionType).filter(
-            ExecutionType.id == execution_type_id).first()
+    async with get_async_database_connection() as db:
+        execution_type = await db.get(ExecutionType, execution_type_id)
         if not execution_type:
             raise HTTPException(
                 status_code=404, detail="Execution Type not found")
-        db.delete(execution_type)
-        db.commit()
+        await db.delete(execution_type)
+        await db.run_sync(table_versions.bump, table_versions.EXECUTION_TYPES)
+        await db.commit()
+        reference_cache.execution_types.invalidate()
         return {"detail": "Execution Type deleted"}
@@ -1,21 +1,28 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+import os
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from datetime import datetime
-from sqlalchemy import distinct
-from typing import Optional
+from sqlalchemy import distinct, select
+from typing import List, Optional
 
-from backend.config.db import get_database_connection
-from backend.schema.job import JobCreate, JobUpdate
+from backend.config.db import get_async_database_connection
+from backend.schema.job import JobBulkCreate, JobCreate, JobUpdate
 from backend.models.job import Job
-from backend.models.job import ExecutionType
-from backend.helper import constants, job_helper, log
-from backend.tasks.job_tasks import execute_job
+from backend.helper import constants, job_events, job_helper, log, pagination, reference_cache, table_versions
+from backend.tasks import event_dispatcher
 from backend.config.db import get_database_connection
-from backend.models.job import EventMapping
 from backend.validation import job_validation
 
 router = APIRouter()
 logger = log.setup_logging()
 
+# Seconds between keep-alive comments on an idle job status stream
+JOB_STREAM_KEEPALIVE_SECONDS = float(os.getenv("JOB_STREAM_KEEPALIVE_SECONDS", "15"))
+
 
 @router.get("/status")
 async def get_distinct_job_statuses():
@@ -27,9 +34,8 @@ async def get_distinct_job_statuses():
     """
     try:
         logger.info("Request received to fetch all distinct job statuses")
-        with get_database_connection() as db:
-            query = db.query(distinct(Job.status))
-            statuses = [status[0] for status in query.all()]
+        async with get_async_database_connection() as db:
+            statuses = (await db.scalars(select(distinct(Job.status)))).all()
 
             logger.info(
                 "Distinct job statuses has been fetched successfully : %s",
@@ -38,12 +44,57 @@ async def get_distinct_job_statuses():
 
             return statuses
     except Exception as e:
-        db.rollback()
-
         logger.exception("Failed to fetch all distinct job statuses: %s ", str(e))
         raise HTTPException(status_code=500, detail=constants.GENERIC_ERROR_MESSAGE)
 
 
+@router.get("/stream")
+async def stream_job_statuses(
+    request: Request,
+    status: Optional[List[str]] = Query(None),
+    job_type_id: Optional[List[int]] = Query(None),
+):
+    """
+    Stream job status transitions as server-sent events.
+
+    Every transition is sent as a "status" event holding the job ID, the
+    new status, the job type ID and the time of the transition. A "resync"
+    event means events were dropped because the client fell behind, and
+    the client should reload the job list.
+
+    Args:
+        request (Request): The incoming request, used to detect disconnects.
+        status (List[str], optional): Only stream transitions to these statuses.
+        job_type_id (List[int], optional): Only stream jobs of these job types.
+
+    Returns:
+        StreamingResponse: The text/event-stream response.
+    """
+    subscription = job_events.subscribe(statuses=status, job_type_ids=job_type_id)
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.get(), JOB_STREAM_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/")
 async def create_job(job: JobCreate):
     """
@@ -59,10 +110,10 @@ async def create_job(job: JobCreate):
         HTTPException: If the job could not be created.
     """
     try:
-        with get_database_connection() as db:
+        async with get_async_database_connection() as db:
             logger.info("Request received to create a job: %s", str(job))
 
-            job_validation.validate_job_name(db, job.name)
+            await db.run_sync(job_validation.validate_job_name, job.name)
 
             db_job = Job(**job.dict())
 
@@ -70,38 +121,115 @@ async def create_job(job: JobCreate):
                 job_validation.validate_execution_time(job.execution_time)
 
             else:
-                job_validation.validate_event_mapping(db, job.event_mapping_id)
+                await db.run_sync(
+                    job_validation.validate_event_mapping, job.event_mapping_id
+                )
 
             execution_type = (
-                db.query(ExecutionType)
-                .filter(ExecutionType.id == job.execution_type_id)
-                .first()
-                .to_json()["name"]
-            )
+                await db.run_sync(
+                    reference_cache.execution_types.get, job.execution_type_id
+                )
+            )["name"]
             job_validation.validate_event_mapping_required(
                 execution_type, job.event_mapping_id
             )
 
             db.add(db_job)
-            db.commit()
-            db.refresh(db_job)
+            await db.run_sync(table_versions.bump, table_versions.JOBS)
+            await db.commit()
+            await db.refresh(db_job)
 
             logger.info("Job created successfully: %s", str(db_job.to_json()))
             return db_job.to_json()
 
     except HTTPException as e:
-        db.rollback()
-
         logger.exception("Failed to create a job: %s", str(e))
         raise HTTPException(status_code=e.status_code, detail=e.detail)
 
     except Exception as e:
-        db.rollback()
-
         logger.exception("Failed to create a job: %s", str(e))
         raise HTTPException(status_code=500, detail=constants.GENERIC_ERROR_MESSAGE)
 
 
+def _schedule_created_jobs(job_ids):
+    """
+    Schedule freshly created jobs in one pass.
+
+    Args:
+        job_ids (List[int]): The IDs of the jobs to schedule.
+
+    Returns:
+        tuple: The scheduled jobs in JSON format and a mapping of the ID of
+        every job that couldn't be scheduled to the error.
+    """
+    with get_database_connection() as db:
+        jobs = db.query(Job).filter(Job.id.in_(job_ids)).order_by(Job.id).all()
+        errors = job_helper.create_job_schedules(jobs, db)
+        return [job.to_json() for job in jobs], errors
+
+
+@router.post("/bulk")
+async def create_jobs_bulk(bulk: JobBulkCreate):
+    """
+    Create many jobs at once.
+
+    The batch is validated with a few set-based queries and all valid jobs
+    are inserted in a single transaction. Invalid jobs are reported without
+    aborting the valid ones.
+
+    Args:
+        bulk (JobBulkCreate): The jobs to create and whether to schedule them.
+
+    Returns:
+        dict: The created jobs and the errors of the rejected ones.
+
+    Raises:
+        HTTPException: If the batch could not be stored.
+    """
+    try:
+        logger.info("Request received to create %s jobs", len(bulk.jobs))
+
+        async with get_async_database_connection() as db:
+            errors = await db.run_sync(job_validation.validate_bulk_jobs, bulk.jobs)
+
+            db_jobs = [
+                Job(**job.dict())
+                for index, job in enumerate(bulk.jobs)
+                if index not in errors
+            ]
+
+            db.add_all(db_jobs)
+            await db.run_sync(table_versions.bump, table_versions.JOBS)
+            await db.commit()
+
+        created_jobs = [db_job.to_json() for db_job in db_jobs]
+        job_errors = [
+            {"index": index, "name": bulk.jobs[index].name, "detail": detail}
+            for index, detail in sorted(errors.items())
+        ]
+
+        if bulk.schedule and db_jobs:
+            # The scheduler and its job store are blocking, keep them off the event loop
+            created_jobs, schedule_errors = await run_in_threadpool(
+                _schedule_created_jobs, [db_job.id for db_job in db_jobs]
+            )
+            job_errors.extend(
+                {"id": job["id"], "name": job["name"], "detail": schedule_errors[job["id"]]}
+                for job in created_jobs
+                if job["id"] in schedule_errors
+            )
+
+        logger.info(
+            "%s jobs created successfully, %s rejected", len(db_jobs), len(errors)
+        )
+
+        return {"created": created_jobs, "errors": job_errors}
+
+    except Exception as e:
+        logger.exception("Failed to create jobs in bulk: %s", str(e))
+        raise HTTPException(status_code=500, detail=constants.GENERIC_ERROR_MESSAGE)
+
+
 @router.put("/{job_id}")
 async def update_job(job_id: int, updated_job: JobUpdate):
     """
@@ -118,50 +246,48 @@ async def update_job(job_id: int, updated_job: JobUpdate):
         HTTPException: If the job could not be found.
     """
     try:
-        with get_database_connection() as db:
+        async with get_async_database_connection() as db:
             logger.info(
                 "Request received to update a job[%s]: %s",
                 str(job_id),
                 str(updated_job),
             )
-            job_validation.validate_existing_job_name(db, updated_job)
+            await db.run_sync(job_validation.validate_existing_job_name, updated_job)
 
             if updated_job.event_mapping_id == None:
                 job_validation.validate_execution_time(updated_job.execution_time)
 
             else:
-                job_validation.validate_event_mapping(db, updated_job.event_mapping_id)
+                await db.run_sync(
+                    job_validation.validate_event_mapping, updated_job.event_mapping_id
+                )
 
             execution_type = (
-                db.query(ExecutionType)
-                .filter(ExecutionType.id == updated_job.execution_type_id)
-                .first()
-                .to_json()["name"]
-            )
+                await db.run_sync(
+                    reference_cache.execution_types.get, updated_job.execution_type_id
+                )
+            )["name"]
             job_validation.validate_event_mapping_required(
                 execution_type, updated_job.event_mapping_id
             )
 
-            job = db.query(Job).filter(Job.id == job_id).first()
+            job = await db.get(Job, job_id)
 
             if not job:
                 raise HTTPException(status_code=404, detail=constants.JOB_NOT_FOUND)
             for attr, value in updated_job.dict(exclude_unset=True).items():
                 setattr(job, attr, value)
-            db.commit()
-            db.refresh(job)
+            await db.run_sync(table_versions.bump, table_versions.JOBS)
+            await db.commit()
+            await db.refresh(job)
 
             logger.info("Job updated successfully: %s", str(job.to_json()))
 
             return job.to_json()
     except HTTPException as e:
-        db.rollback()
-
         logger.exception("Failed to update a job: %s", str(e))
         raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
-        db.rollback()
-
         logger.exception("Failed to update a job: %s", str(e))
         raise HTTPException(status_code=500, detail=constants.GENERIC_ERROR_MESSAGE)
 
@@ -182,8 +308,8 @@ async def get_job(job_id: int):
     """
     try:
         logger.info(f"Fetching job {job_id}")
-        with get_database_connection() as db:
-            job = db.query(Job).filter(Job.id == job_id).first()
+        async with get_async_database_connection() as db:
+            job = await db.get(Job, job_id)
             if not job:
                 raise HTTPException(status_code=404, detail=constants.JOB_NOT_FOUND)
 
@@ -192,8 +318,6 @@ async def get_job(job_id: int):
             return job.to_json()
 
     except HTTPException as e:
-        db.rollback()
-
         logger.error(f"Failed to fetch job {job_id}: {str(e)}")
         raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
@@ -202,12 +326,32 @@ async def get_job(job_id: int):
 
 
 @router.get("/")
-async def get_jobs(status: Optional[str] = None):
+async def get_jobs(
+    request: Request,
+    response: Response,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(
+        constants.JOBS_PAGE_DEFAULT_LIMIT, ge=1, le=constants.JOBS_PAGE_MAX_LIMIT
+    ),
+):
     """
-    Get jobs based on status (optional).
+    Get a page of jobs based on status (optional).
+
+    Jobs are ordered by execution time, priority and ID. When more jobs are
+    available, the cursor of the next page is returned in the X-Next-Cursor
+    response header.
+
+    Supports conditional requests through the ETag and Last-Modified
+    headers, based on the version of the jobs table: a page is answered
+    with 304 when no job has been written since the client fetched it.
 
     Args:
+        request (Request): The incoming request, holding the validators.
+        response (Response): The outgoing response, used to set the cursor header.
         status (str, optional): Filter jobs by status. Defaults to None.
+        cursor (str, optional): The cursor returned with the previous page. Defaults to None.
+        limit (int, optional): The maximum number of jobs to return.
 
     Returns:
         list: List of jobs.
@@ -216,21 +360,42 @@ async def get_jobs(status: Optional[str] = None):
     try:
         logger.info("Fetching jobs")
 
-        with get_database_connection() as db:
+        async with get_async_database_connection() as db:
+            version = await db.run_sync(table_versions.get_version, table_versions.JOBS)
+            if version is not None:
+                if table_versions.is_not_modified(request, table_versions.JOBS, version):
+                    return table_versions.get_not_modified_response(
+                        table_versions.JOBS, version
+                    )
+                response.headers.update(
+                    table_versions.get_headers(table_versions.JOBS, version)
+                )
+
+            query = select(Job)
             if status is not None:
-                jobs = db.query(Job).filter_by(status=status).all()
-            else:
-                jobs = db.query(Job).all()
+                query = query.filter_by(status=status)
+            if cursor is not None:
+                query = query.where(pagination.job_keyset_filter(cursor))
+
+            # Fetch one extra row to know whether another page exists
+            query = query.order_by(*pagination.job_keyset_order()).limit(limit + 1)
+
+            jobs = (await db.scalars(query)).all()
 
             logger.info("Jobs fetched successfully")
 
-            jobs = sorted(jobs, key=lambda job: (job.execution_time, job.priority))
+            if len(jobs) > limit:
+                jobs = jobs[:limit]
+                response.headers["X-Next-Cursor"] = pagination.encode_job_cursor(
+                    jobs[-1]
+                )
 
             return [job.to_json() for job in jobs]
 
+    except HTTPException as e:
+        logger.error(f"Failed to fetch jobs: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
-        db.rollback()
-
         logger.exception(f"An error occurred while fetching jobs: {str(e)}")
         raise HTTPException(status_code=500, detail=constants.GENERIC_ERROR_MESSAGE)
 
@@ -251,26 +416,28 @@ async def delete_job(job_id: int):
     """
     try:
         logger.info(f"Deleting job with ID: {job_id}")
-        with get_database_connection() as db:
-            job = db.query(Job).filter(Job.id == job_id).first()
+        async with get_async_database_connection() as db:
+            job = await db.get(Job, job_id)
             if not job:
                 raise HTTPException(status_code=404, detail=constants.JOB_NOT_FOUND)
-            db.delete(job)
-            db.commit()
+            await db.delete(job)
+            await db.run_sync(table_versions.bump, table_versions.JOBS)
+            await db.commit()
             logger.info("Job deleted successfully")
             return {"detail": "Job deleted"}
     except Exception as e:
-        db.rollback()
-
         logger.exception(f"An error occurred while deleting the job: {str(e)}")
         raise HTTPException(status_code=500, detail=constants.GENERIC_ERROR_MESSAGE)
 
 
 @router.post("/schedule-job/{job_id}")
-async def schedule_job(job_id: int):
+def schedule_job(job_id: int):
     """
     Schedule a job.
 
+    Declared sync so that FastAPI runs it in its thread pool: the scheduler
+    and its job store are blocking, and must stay off the event loop.
+
     Args:
         job_id (int): The ID of the job to schedule.
 
@@ -308,10 +475,12 @@ async def schedule_job(job_id: int):
 
 
 @router.post("/stop-job/{job_id}")
-async def stop_job(job_id: int):
+def stop_job(job_id: int):
     """
     Stop a job.
 
+    Declared sync so that FastAPI runs it in its thread pool, see schedule_job.
+
     Args:
         job_id (int): The ID of the job to stop.
 
@@ -344,10 +513,12 @@ async def stop_job(job_id: int):
 
 
 @router.post("/update-schedule-job/{job_id}")
-async def update_schedule_job(job_id: int):
+def update_schedule_job(job_id: int):
     """
     Update a schedule a job.
 
+    Declared sync so that FastAPI runs it in its thread pool, see schedule_job.
+
     Args:
         job_id (int): The ID of the job to schedule.
 
@@ -389,12 +560,26 @@ async def update_schedule_job(job_id: int):
         raise HTTPException(status_code=500, detail=constants.GENERIC_ERROR_MESSAGE)
 
 
-@router.post("/event-notification/{event_name}")
+@router.post("/event-notification/{event_name}", status_code=202)
 async def handle_event_notification(event_name: str):
-    with get_database_connection() as db:
-        # Retrieve the job associated with the event_id
-        event_mapping = (
-            db.query(EventMapping).filter(EventMapping.name == event_name).first()
+    """
+    Accept an event notification and queue the jobs bound to it.
+
+    The jobs are executed in the background by the event dispatcher, the
+    request returns as soon as the event is queued.
+
+    Args:
+        event_name (str): The name of the event mapping that occurred.
+
+    Returns:
+        dict: A message indicating the event has been queued.
+
+    Raises:
+        HTTPException: If the event or its jobs are unknown, or the dispatcher is saturated.
+    """
+    async with get_async_database_connection() as db:
+        event_mapping = await db.run_sync(
+            reference_cache.event_mappings.get_by_name, event_name
         )
 
         if not event_mapping:
@@ -402,23 +587,21 @@ async def handle_event_notification(event_name: str):
                 status_code=404, detail="Event hasn't record in our system"
             )
 
-        result_event_mapping = event_mapping.to_json()
-
-        # Retrieve the job associated with the event_id
-        job = (
-            db.query(Job)
-            .filter(Job.event_mapping_id == result_event_mapping["id"])
-            .first()
+        has_job = await db.scalar(
+            select(Job.id).where(Job.event_mapping_id == event_mapping["id"]).limit(1)
         )
 
-        if not job:
+        if not has_job:
             raise HTTPException(
                 status_code=404, detail="No job has been associated by this event"
             )
 
-        result_job = job.to_json()
-
-        # Execute the job
-        execute_job(result_job["id"])
+    try:
+        event_dispatcher.enqueue_event(event_mapping["id"])
+    except event_dispatcher.EventQueueFull as e:
+        logger.error(str(e))
+        raise HTTPException(
+            status_code=503, detail="Too many events in flight, please retry later"
+        )
 
-        return {"detail": "Event notification received and job scheduled"}
+    return {"detail": "Event notification received and jobs queued"}
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from sqlalchemy import select
 
-from backend.config.db import get_database_connection
+from backend.config.db import get_async_database_connection
 from backend.schema.job_type import JobTypeCreate, JobTypeUpdate
 from backend.models.job import JobType
-from backend.helper import log, constants
+from backend.helper import log, constants, reference_cache, table_versions
 
 router = APIRouter()
 logger = log.setup_logging()
@@ -26,25 +27,39 @@ async def create_job_type(job_type: JobTypeCreate):
     if job_type.job_type == "SCRIPT" and job_type.script == None:
         raise HTTPException(status_code=400, detail="Script can't be blank here")
 
-    with get_database_connection() as db:
+    async with get_async_database_connection() as db:
         db_job_type = JobType(**job_type.dict())
         db.add(db_job_type)
-        db.commit()
-        db.refresh(db_job_type)
+        await db.run_sync(table_versions.bump, table_versions.JOB_TYPES)
+        await db.commit()
+        reference_cache.job_types.invalidate()
+        await db.refresh(db_job_type)
         return db_job_type.to_json()
 
 
 @router.get("/")
-async def get_job_types():
+async def get_job_types(request: Request):
     """
     Get all job types.
 
+    Supports conditional requests through the ETag and Last-Modified
+    headers, an unchanged list is answered with 304.
+
+    Args:
+        request (Request): The incoming request, holding the validators.
+
     Returns:
         list: List of job types.
     """
-    with get_database_connection() as db:
-        job_types = db.query(JobType).all()
-        return [job_type.to_json() for job_type in job_types]
+    async with get_async_database_connection() as db:
+
+        async def load_job_types():
+            job_types = (await db.scalars(select(JobType))).all()
+            return [job_type.to_json() for job_type in job_types]
+
+        return await table_versions.get_list_response(
+            request, db, table_versions.JOB_TYPES, load_job_types
+        )
 
 
 @router.put("/{job_type_id}")
@@ -63,31 +78,29 @@ async def update_job_type(job_type_id: int, updated_job_type: JobTypeUpdate):
         HTTPException: If the job type could not be found.
     """
     try:
-        with get_database_connection() as db:
+        async with get_async_database_connection() as db:
             logger.info(
                 "Request received to update a job type [%s]: %s",
                 str(job_type_id),
                 str(updated_job_type),
             )
-            job_type = db.query(JobType).filter(JobType.id == job_type_id).first()
+            job_type = await db.get(JobType, job_type_id)
             if not job_type:
                 raise HTTPException(status_code=404, detail="Job Type not found")
             for attr, value in updated_job_type.dict(exclude_unset=True).items():
                 setattr(job_type, attr, value)
-            db.commit()
-            db.refresh(job_type)
+            await db.run_sync(table_versions.bump, table_versions.JOB_TYPES)
+            await db.commit()
+            reference_cache.job_types.invalidate()
+            await db.refresh(job_type)
 
             logger.info("Job type updated successfully: %s", str(job_type.to_json()))
 
             return job_type.to_json()
     except HTTPException as e:
-        db.rollback()
-
         logger.exception("Failed to update a job type: %s", str(e))
         raise HTTPException(status_code=e.status_code, detail=e.detail)
     except Exception as e:
-        db.rollback()
-
         logger.exception("Failed to update a job type: %s", str(e))
         raise HTTPException(status_code=500, detail=constants.GENERIC_ERROR_MESSAGE)
 
@@ -106,8 +119,8 @@ async def get_job_type(job_type_id: int):
     Raises:
         HTTPException: If the job type could not be found.
     """
-    with get_database_connection() as db:
-        job_type = db.query(JobType).filter(JobType.id == job_type_id).first()
+    async with get_async_database_connection() as db:
+        job_type = await db.get(JobType, job_type_id)
         if not job_type:
             raise HTTPException(status_code=404, detail="Job Type not found")
         return job_type.to_json()
@@ -127,10 +140,12 @@ async def delete_job_type(job_type_id: int):
     Raises:
         HTTPException: If the job type could not be found.
     """
-    with get_database_connection() as db:
-        job_type = db.query(JobType).filter(JobType.id == job_type_id).first()
+    async with get_async_database_connection() as db:
+        job_type = await db.get(JobType, job_type_id)
         if not job_type:
             raise HTTPException(status_code=404, detail="Job Type not found")
-        db.delete(job_type)
-        db.commit()
+        await db.delete(job_type)
+        await db.run_sync(table_versions.bump, table_versions.JOB_TYPES)
+        await db.commit()
+        reference_cache.job_types.invalidate()
         return {"detail": "Job Type deleted"}
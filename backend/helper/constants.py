@@ -1,2 +1,9 @@
 GENERIC_ERROR_MESSAGE = "Please try again! Developer has been looking into the issue."
-JOB_NOT_FOUND = "Job not found"
\ No newline at end of file
+JOB_NOT_FOUND = "Job not found"
+INVALID_CURSOR = "Invalid pagination cursor"
+JOBS_PAGE_DEFAULT_LIMIT = 100
+JOBS_PAGE_MAX_LIMIT = 1000
+JOBS_BULK_MAX_SIZE = 5000
+MISFIRE_SKIP = "skip"
+MISFIRE_COALESCE = "coalesce"
+MISFIRE_ALL = "all"
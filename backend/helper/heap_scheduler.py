@@ -0,0 +1,486 @@
+import heapq
+import os
+import time
+from array import array
+from collections import namedtuple
+from datetime import datetime, timezone
+from threading import Condition, Thread
+
+from apscheduler.events import (
+    EVENT_ALL,
+    EVENT_JOB_MISSED,
+    EVENT_JOB_SUBMITTED,
+    JobExecutionEvent,
+    JobSubmissionEvent,
+)
+from apscheduler.jobstores.base import ConflictingIdError, JobLookupError
+from apscheduler.schedulers import SchedulerAlreadyRunningError, SchedulerNotRunningError
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from backend.helper import log
+
+logger = log.setup_logging()
+
+# Maximum number of due entries taken from the heap per wakeup
+SCHEDULER_HEAP_BATCH_SIZE = int(os.getenv("SCHEDULER_HEAP_BATCH_SIZE", "1000"))
+
+# Heap keys are (run time in ms << SLOT_BITS) | slot, compared as plain ints
+SLOT_BITS = 32
+SLOT_MASK = (1 << SLOT_BITS) - 1
+
+# Run time of a free slot
+FREE = -1
+
+# Reported as the job store of the events, listeners written for APScheduler expect one
+JOBSTORE_ALIAS = "default"
+
+# Stale heap keys are only dropped by a rebuild once they are that many and half of the heap
+COMPACT_MIN_STALE = 10000
+
+HeapJob = namedtuple("HeapJob", ["id", "next_run_time", "args"])
+
+
+def _to_ms(run_time: datetime):
+    return int(run_time.timestamp() * 1000)
+
+
+def _from_ms(run_time_ms: int):
+    return datetime.fromtimestamp(run_time_ms / 1000, timezone.utc)
+
+
+class HeapScheduler:
+    """
+    In-memory scheduler keeping its entries in flat arrays and a heap of ints.
+
+    A drop-in for the subset of the APScheduler BackgroundScheduler API used
+    by job_helper, built for many pending one-shot jobs: an entry costs a
+    few array cells, a dict item and one int in the heap, instead of a Job
+    object with its trigger. Only date and interval triggers are supported,
+    and the arguments of a job must be two ints (the job ID and priority).
+
+    Replaced and removed entries leave their key in the heap, where it is
+    recognised as stale by its run time and skipped. The heap is rebuilt
+    once stale keys make up half of it.
+
+    Adding a job only wakes the scheduler thread up when it becomes the next
+    one due. Every wakeup takes up to batch_size due entries from the heap
+    under one lock acquisition and fires them outside of it. Runs later than
+    the misfire grace time of their job are reported with EVENT_JOB_MISSED
+    instead of being fired, coalesced to the latest one if the job coalesces.
+
+    Attributes:
+        batch_size (int): The maximum number of due entries taken per wakeup.
+    """
+
+    def __init__(self, batch_size=SCHEDULER_HEAP_BATCH_SIZE):
+        self.batch_size = batch_size
+
+        # One cell per slot, a slot holds one entry
+        self._run_at = array("q")
+        self._intervals = array("q")
+        self._job_ids = array("q")
+        self._priorities = array("q")
+        self._grace_times = array("f")
+        self._coalesce = array("b")
+        self._func_indexes = array("B")
+        self._ids = []
+        self._free_slots = array("q")
+
+        self._slots = {}
+        self._funcs = []
+        self._heap = []
+        # Keys added before the start are only appended, start() orders them at once
+        self._heap_ordered = False
+        self._stale = 0
+
+        self._listeners = []
+        self._condition = Condition()
+        self._thread = None
+        self._running = False
+        self._paused = False
+        self._stopping = False
+
+    @property
+    def running(self):
+        return self._running
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _get_func_index(self, func):
+        for index, known in enumerate(self._funcs):
+            if known is func:
+                return index
+        if len(self._funcs) > 255:
+            raise ValueError("The heap scheduler supports up to 256 different functions")
+        self._funcs.append(func)
+        return len(self._funcs) - 1
+
+    def _allocate_slot(self):
+        if self._free_slots:
+            return self._free_slots.pop()
+
+        slot = len(self._ids)
+        if slot > SLOT_MASK:
+            raise OverflowError("The heap scheduler is full")
+        self._run_at.append(FREE)
+        self._intervals.append(0)
+        self._job_ids.append(0)
+        self._priorities.append(0)
+        self._grace_times.append(0)
+        self._coalesce.append(0)
+        self._func_indexes.append(0)
+        self._ids.append(None)
+        return slot
+
+    def _free_slot(self, slot):
+        del self._slots[self._ids[slot]]
+        self._run_at[slot] = FREE
+        self._ids[slot] = None
+        self._free_slots.append(slot)
+
+    def _push(self, slot):
+        key = (self._run_at[slot] << SLOT_BITS) | slot
+        if not self._heap_ordered:
+            self._heap.append(key)
+            return
+
+        heapq.heappush(self._heap, key)
+        if self._heap[0] == key:
+            self._condition.notify()
+
+    def _compact(self):
+        if self._stale < COMPACT_MIN_STALE or self._stale * 2 < len(self._heap):
+            return
+
+        run_at = self._run_at
+        self._heap = [(run_at[slot] << SLOT_BITS) | slot for slot in self._slots.values()]
+        if self._heap_ordered:
+            heapq.heapify(self._heap)
+        self._stale = 0
+
+    def _get_job(self, slot):
+        return HeapJob(
+            self._ids[slot],
+            _from_ms(self._run_at[slot]),
+            (self._job_ids[slot], self._priorities[slot]),
+        )
+
+    def add_job(self, func, trigger, args, id, replace_existing=False,
+                misfire_grace_time=1, coalesce=True, **kwargs):
+        """
+        Add a job, or replace the entry with the same ID.
+
+        Args:
+            func (callable): Called with args when the job fires.
+            trigger (BaseTrigger): A DateTrigger or an IntervalTrigger.
+            args (list): The job ID and priority, both ints.
+            id (str): The ID of the entry.
+            replace_existing (bool): Replace the entry with the same ID if any.
+            misfire_grace_time (float): Seconds a run may be late before it's missed.
+            coalesce (bool): Whether only the latest of several missed runs is reported.
+            **kwargs: Other APScheduler options, ignored.
+
+        Returns:
+            HeapJob: The scheduled entry.
+
+        Raises:
+            ConflictingIdError: If an entry has the ID and replace_existing is False.
+            TypeError: If the trigger isn't supported.
+        """
+        if isinstance(trigger, DateTrigger):
+            run_at = _to_ms(trigger.run_date)
+            interval = 0
+        elif isinstance(trigger, IntervalTrigger):
+            run_at = _to_ms(trigger.get_next_fire_time(None, datetime.now(trigger.timezone)))
+            interval = int(trigger.interval_length * 1000)
+        else:
+            raise TypeError(f"The heap scheduler doesn't support {type(trigger).__name__}")
+
+        job_id, priority = args
+
+        with self._condition:
+            slot = self._slots.get(id)
+            if slot is None:
+                slot = self._allocate_slot()
+                self._slots[id] = slot
+                self._ids[slot] = id
+            elif not replace_existing:
+                raise ConflictingIdError(id)
+            else:
+                # The key of the replaced run time stays in the heap
+                self._stale += 1
+
+            self._run_at[slot] = run_at
+            self._intervals[slot] = interval
+            self._job_ids[slot] = job_id
+            self._priorities[slot] = priority
+            self._grace_times[slot] = misfire_grace_time
+            self._coalesce[slot] = coalesce
+            self._func_indexes[slot] = self._get_func_index(func)
+            self._push(slot)
+            self._compact()
+
+            return self._get_job(slot)
+
+    def remove_job(self, job_id, jobstore=None):
+        """
+        Remove an entry.
+
+        Args:
+            job_id (str): The ID of the entry.
+            jobstore (str): Ignored, there is a single store.
+
+        Raises:
+            JobLookupError: If there is no entry with the ID.
+        """
+        with self._condition:
+            slot = self._slots.get(job_id)
+            if slot is None:
+                raise JobLookupError(job_id)
+
+            self._free_slot(slot)
+            self._stale += 1
+            self._compact()
+
+    def get_job(self, job_id, jobstore=None):
+        """
+        Get an entry.
+
+        Args:
+            job_id (str): The ID of the entry.
+            jobstore (str): Ignored, there is a single store.
+
+        Returns:
+            HeapJob: The entry, None if there is no entry with the ID.
+        """
+        with self._condition:
+            slot = self._slots.get(job_id)
+            return self._get_job(slot) if slot is not None else None
+
+    def get_jobs(self, jobstore=None):
+        """
+        Get every entry.
+
+        Args:
+            jobstore (str): Ignored, there is a single store.
+
+        Returns:
+            list: The entries, ordered by next run time.
+        """
+        with self._condition:
+            jobs = [self._get_job(slot) for slot in self._slots.values()]
+        return sorted(jobs, key=lambda job: job.next_run_time)
+
+    def add_listener(self, callback, mask=EVENT_ALL):
+        """
+        Call a function on the events of the scheduler.
+
+        Only EVENT_JOB_SUBMITTED and EVENT_JOB_MISSED are emitted.
+
+        Args:
+            callback (callable): Called with the event.
+            mask (int): The events to call it on.
+        """
+        with self._condition:
+            self._listeners = self._listeners + [(callback, mask)]
+
+    def remove_listener(self, callback):
+        """
+        Stop calling a function added with add_listener.
+
+        Args:
+            callback (callable): The function.
+        """
+        with self._condition:
+            self._listeners = [
+                (listener, mask) for listener, mask in self._listeners if listener != callback
+            ]
+
+    def _dispatch_event(self, event):
+        for callback, mask in self._listeners:
+            if event.code & mask:
+                try:
+                    callback(event)
+                except Exception as e:
+                    logger.exception("Scheduler event listener failed: %s", str(e))
+
+    def start(self, paused=False):
+        """
+        Start firing the entries in a background thread.
+
+        Args:
+            paused (bool): Keep the entries but don't fire them until resume().
+
+        Raises:
+            SchedulerAlreadyRunningError: If the scheduler is already running.
+        """
+        with self._condition:
+            if self._running:
+                raise SchedulerAlreadyRunningError
+
+            if not self._heap_ordered:
+                heapq.heapify(self._heap)
+                self._heap_ordered = True
+
+            self._running = True
+            self._paused = paused
+            self._stopping = False
+            self._thread = Thread(target=self._run, name="heap-scheduler", daemon=True)
+            self._thread.start()
+
+    def shutdown(self, wait=True):
+        """
+        Stop firing the entries, they are kept.
+
+        Args:
+            wait (bool): Whether to wait for the fired batch to be handled.
+
+        Raises:
+            SchedulerNotRunningError: If the scheduler isn't running.
+        """
+        with self._condition:
+            if not self._running:
+                raise SchedulerNotRunningError
+
+            self._stopping = True
+            self._running = False
+            self._condition.notify()
+            thread = self._thread
+            self._thread = None
+
+        if wait:
+            thread.join()
+
+    def pause(self):
+        """
+        Stop firing entries until resume() is called.
+        """
+        with self._condition:
+            self._paused = True
+
+    def resume(self):
+        """
+        Fire the entries again after pause().
+        """
+        with self._condition:
+            self._paused = False
+            self._condition.notify()
+
+    def wakeup(self):
+        """
+        Look for due entries right away.
+        """
+        with self._condition:
+            self._condition.notify()
+
+    def _get_wait_seconds(self):
+        # Skip stale keys, so the thread sleeps until the next live entry
+        heap = self._heap
+        while heap and self._run_at[heap[0] & SLOT_MASK] != heap[0] >> SLOT_BITS:
+            heapq.heappop(heap)
+            self._stale -= 1
+
+        if self._paused or not heap:
+            return None
+        return (heap[0] >> SLOT_BITS) / 1000 - time.time()
+
+    def _take_due(self, now):
+        """
+        Take the due entries off the heap.
+
+        One-shot entries are freed, interval entries are pushed again with
+        their next run time after now.
+
+        Args:
+            now (float): The current time, in seconds since the epoch.
+
+        Returns:
+            list: (func, args, entry ID, run times in ms, grace time, coalesce)
+            for every due entry.
+        """
+        now_ms = int(now * 1000)
+        heap = self._heap
+        run_at = self._run_at
+        due = []
+
+        while heap and len(due) < self.batch_size:
+            key = heap[0]
+            slot = key & SLOT_MASK
+            key_run_at = key >> SLOT_BITS
+            if run_at[slot] != key_run_at:
+                heapq.heappop(heap)
+                self._stale -= 1
+                continue
+            if key_run_at > now_ms:
+                break
+
+            heapq.heappop(heap)
+
+            interval = self._intervals[slot]
+            if interval:
+                runs = (now_ms - key_run_at) // interval + 1
+                run_times = [key_run_at + interval * run for run in range(runs)]
+            else:
+                run_times = [key_run_at]
+
+            due.append(
+                (
+                    self._funcs[self._func_indexes[slot]],
+                    (self._job_ids[slot], self._priorities[slot]),
+                    self._ids[slot],
+                    run_times,
+                    self._grace_times[slot],
+                    self._coalesce[slot],
+                )
+            )
+
+            if interval:
+                run_at[slot] = run_times[-1] + interval
+                heapq.heappush(heap, (run_at[slot] << SLOT_BITS) | slot)
+            else:
+                self._free_slot(slot)
+
+        return due
+
+    def _fire(self, due, now):
+        for func, args, entry_id, run_times, grace_time, coalesce in due:
+            if coalesce:
+                run_times = run_times[-1:]
+
+            for run_time in run_times:
+                scheduled_run_time = _from_ms(run_time)
+
+                if now - run_time / 1000 > grace_time:
+                    self._dispatch_event(
+                        JobExecutionEvent(EVENT_JOB_MISSED, entry_id, JOBSTORE_ALIAS, scheduled_run_time)
+                    )
+                    continue
+
+                try:
+                    func(*args)
+                except Exception as e:
+                    logger.exception("Scheduled job %s failed to fire: %s", entry_id, str(e))
+                    continue
+
+                self._dispatch_event(
+                    JobSubmissionEvent(EVENT_JOB_SUBMITTED, entry_id, JOBSTORE_ALIAS, [scheduled_run_time])
+                )
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopping:
+                    wait_seconds = self._get_wait_seconds()
+                    if wait_seconds is not None and wait_seconds <= 0:
+                        break
+                    self._condition.wait(wait_seconds)
+
+                if self._stopping:
+                    return
+
+                now = time.time()
+                due = self._take_due(now)
+
+            self._fire(due, now)
@@ -0,0 +1,362 @@
+import asyncio
+import os
+import queue
+from datetime import datetime, timedelta
+from threading import Event, Lock, Thread
+from time import monotonic
+
+from sqlalchemy import delete, func, insert, select
+
+from backend.config.db import get_database_connection
+from backend.models.job import JobEvent
+from backend.helper import log, metrics
+
+logger = log.setup_logging()
+
+# Events buffered per subscriber, a subscriber falling further behind is asked to resync
+JOB_EVENTS_QUEUE_SIZE = int(os.getenv("JOB_EVENTS_QUEUE_SIZE", "1000"))
+
+# Published transitions are written to the job_events table at least this often
+JOB_EVENTS_FLUSH_INTERVAL_SECONDS = float(os.getenv("JOB_EVENTS_FLUSH_INTERVAL_SECONDS", "0.2"))
+# Processes with open streams read new transitions from the table this often
+JOB_EVENTS_POLL_SECONDS = float(os.getenv("JOB_EVENTS_POLL_SECONDS", "0.5"))
+# Seconds transitions are kept in the table, long enough for every process to read them
+JOB_EVENTS_RETENTION_SECONDS = float(os.getenv("JOB_EVENTS_RETENTION_SECONDS", "300"))
+# Transitions waiting to be written; when full, new ones are dropped rather than blocking
+JOB_EVENTS_OUTBOX_SIZE = 100000
+# Transitions read per poll
+JOB_EVENTS_POLL_BATCH_SIZE = 1000
+# Seconds after which a missing event ID is assumed to belong to a rolled back
+# insert. IDs can commit out of order, a newer one may be read before an older one.
+JOB_EVENTS_GAP_SECONDS = 5
+
+STATUS_EVENT = "status"
+# Sent instead of the dropped events when a subscriber fell behind
+RESYNC_EVENT = "resync"
+
+_STOP = object()
+
+_subscriptions = set()
+_subscriptions_lock = Lock()
+
+_outbox = queue.Queue(maxsize=JOB_EVENTS_OUTBOX_SIZE)
+_writer_thread = None
+_writer_lock = Lock()
+
+_poller_thread = None
+_poller_stopped = Event()
+
+
+class Subscription:
+    """
+    A live feed of job status transitions, consumed from an event loop.
+
+    Attributes:
+        statuses (set): Only transitions to these statuses are delivered, None for all.
+        job_type_ids (set): Only jobs of these job types are delivered, None for all.
+    """
+
+    def __init__(self, loop, statuses=None, job_type_ids=None):
+        self.statuses = set(statuses) if statuses else None
+        self.job_type_ids = set(job_type_ids) if job_type_ids else None
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=JOB_EVENTS_QUEUE_SIZE)
+        self._overflowed = False
+
+    def matches(self, event):
+        """
+        Check whether an event passes the filters of the subscription.
+
+        Args:
+            event (dict): The event.
+
+        Returns:
+            bool: True if the event should be delivered.
+        """
+        if self.statuses is not None and event["status"] not in self.statuses:
+            return False
+        if self.job_type_ids is not None and event["job_type_id"] not in self.job_type_ids:
+            return False
+        return True
+
+    def _deliver(self, event):
+        # Runs on the subscriber's event loop
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._overflowed = True
+
+    def notify(self, event):
+        """
+        Hand an event over to the subscriber's event loop, from any thread.
+
+        Args:
+            event (dict): The event.
+
+        Returns:
+            bool: False if the subscriber's event loop is gone.
+        """
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, event)
+        except RuntimeError:
+            return False
+        return True
+
+    async def get(self):
+        """
+        Wait for the next event.
+
+        Returns:
+            dict: The next event, or a resync event if events were dropped.
+        """
+        if self._overflowed:
+            self._overflowed = False
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            return {"type": RESYNC_EVENT}
+
+        return await self._queue.get()
+
+    def close(self):
+        """
+        Stop receiving events.
+        """
+        with _subscriptions_lock:
+            _subscriptions.discard(self)
+
+
+def subscribe(statuses=None, job_type_ids=None):
+    """
+    Subscribe the running event loop to job status transitions.
+
+    Args:
+        statuses (list, optional): Only deliver transitions to these statuses.
+        job_type_ids (list, optional): Only deliver jobs of these job types.
+
+    Returns:
+        Subscription: The subscription, to be closed by the caller.
+    """
+    subscription = Subscription(asyncio.get_running_loop(), statuses, job_type_ids)
+
+    with _subscriptions_lock:
+        _subscriptions.add(subscription)
+        _ensure_poller()
+
+    return subscription
+
+
+def publish(job_id, status, job_type_id=None):
+    """
+    Publish a job status transition to the subscribers of every process.
+
+    The transition is queued and written to the job_events table in
+    batches, the processes serving streams read it from there. Safe to
+    call from any thread, it never touches the database.
+
+    Args:
+        job_id (int): The ID of the job.
+        status (str): The new status of the job.
+        job_type_id (int, optional): The ID of the job's job type.
+    """
+    _ensure_writer()
+
+    row = {
+        "job_id": job_id,
+        "status": status,
+        "job_type_id": job_type_id,
+        "created_at": datetime.now(),
+    }
+
+    try:
+        _outbox.put_nowait(row)
+    except queue.Full:
+        logger.warning("Job event outbox is full, dropping %s transition of job %s", status, job_id)
+
+
+def _ensure_writer():
+    global _writer_thread
+
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = Thread(target=_write_events, name="job-event-writer", daemon=True)
+            _writer_thread.start()
+
+
+def _write_events():
+    """
+    Write queued transitions in batches, and delete the expired ones.
+    """
+    last_cleanup = monotonic()
+    stopping = False
+
+    while not stopping:
+        rows = []
+        try:
+            row = _outbox.get(timeout=JOB_EVENTS_FLUSH_INTERVAL_SECONDS)
+            # Take everything queued in the meantime along
+            while True:
+                if row is _STOP:
+                    stopping = True
+                    break
+                rows.append(row)
+                row = _outbox.get_nowait()
+        except queue.Empty:
+            pass
+
+        cleanup = monotonic() - last_cleanup >= JOB_EVENTS_RETENTION_SECONDS / 10
+        if not rows and not cleanup:
+            continue
+
+        try:
+            with get_database_connection() as db:
+                if rows:
+                    db.execute(insert(JobEvent), rows)
+
+                if cleanup:
+                    db.execute(
+                        delete(JobEvent).where(
+                            JobEvent.created_at
+                            < datetime.now() - timedelta(seconds=JOB_EVENTS_RETENTION_SECONDS)
+                        )
+                    )
+                    last_cleanup = monotonic()
+        except Exception as e:
+            logger.exception("Failed to write %s job events: %s", len(rows), str(e))
+
+
+def _ensure_poller():
+    # Called with _subscriptions_lock held
+    global _poller_thread
+
+    if _poller_thread is None or not _poller_thread.is_alive():
+        _poller_stopped.clear()
+        _poller_thread = Thread(target=_poll_events, name="job-event-poller", daemon=True)
+        _poller_thread.start()
+
+
+def _deliver(row):
+    """
+    Hand a transition read from the job_events table to the local subscribers.
+
+    Args:
+        row (Row): The event row.
+    """
+    with _subscriptions_lock:
+        subscriptions = list(_subscriptions)
+
+    event = {
+        "type": STATUS_EVENT,
+        "job_id": row.job_id,
+        "status": row.status,
+        "job_type_id": row.job_type_id,
+        "updated_at": row.created_at.isoformat(),
+    }
+
+    for subscription in subscriptions:
+        if subscription.matches(event) and not subscription.notify(event):
+            subscription.close()
+
+
+def _poll_events():
+    """
+    Read new transitions from the job_events table and deliver them, while
+    this process has subscribers.
+
+    Every event ID up to floor has been delivered or given up on. Events
+    above it that were already delivered are remembered, as an older ID
+    can still be committed after a newer one was read.
+    """
+    global _poller_thread
+
+    try:
+        with get_database_connection() as db:
+            floor = db.scalar(select(func.max(JobEvent.id))) or 0
+    except Exception as e:
+        logger.exception("Failed to start reading job events: %s", str(e))
+        floor = 0
+
+    delivered = set()
+    gap_since = None
+
+    while not _poller_stopped.wait(JOB_EVENTS_POLL_SECONDS):
+        with _subscriptions_lock:
+            if not _subscriptions:
+                _poller_thread = None
+                return
+
+        try:
+            with get_database_connection() as db:
+                rows = db.execute(
+                    select(
+                        JobEvent.id,
+                        JobEvent.job_id,
+                        JobEvent.status,
+                        JobEvent.job_type_id,
+                        JobEvent.created_at,
+                    )
+                    .where(JobEvent.id > floor)
+                    .order_by(JobEvent.id)
+                    .limit(JOB_EVENTS_POLL_BATCH_SIZE)
+                ).all()
+        except Exception as e:
+            logger.exception("Failed to read job events: %s", str(e))
+            continue
+
+        for row in rows:
+            if row.id not in delivered:
+                delivered.add(row.id)
+                _deliver(row)
+
+        # Move the floor up over the delivered IDs, and over gaps that stayed open too long
+        while delivered:
+            if floor + 1 in delivered:
+                floor += 1
+                delivered.discard(floor)
+                gap_since = None
+            elif gap_since is None:
+                gap_since = monotonic()
+                break
+            elif monotonic() - gap_since >= JOB_EVENTS_GAP_SECONDS:
+                floor = min(delivered) - 1
+                gap_since = None
+            else:
+                break
+
+
+def get_subscriber_count():
+    """
+    Count the open subscriptions.
+
+    Returns:
+        int: The number of subscribers in this process.
+    """
+    with _subscriptions_lock:
+        return len(_subscriptions)
+
+
+metrics.Gauge(
+    "job_event_subscribers",
+    "Number of open job status streams.",
+    get_subscriber_count,
+)
+
+
+def shutdown():
+    """
+    Write the queued transitions and stop reading new ones.
+    """
+    global _writer_thread, _poller_thread
+
+    with _writer_lock:
+        if _writer_thread is not None and _writer_thread.is_alive():
+            _outbox.put(_STOP)
+            _writer_thread.join()
+
+        _writer_thread = None
+
+    _poller_stopped.set()
+    with _subscriptions_lock:
+        poller = _poller_thread
+    if poller is not None:
+        poller.join()
+    _poller_thread = None
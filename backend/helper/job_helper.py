@@ -1,41 +1,304 @@
+import os
+
+from apscheduler.events import EVENT_JOB_MISSED
 from apscheduler.triggers.date import DateTrigger
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from datetime import datetime, time, timedelta
+from threading import Event, Lock, Thread
+from time import perf_counter
+from types import SimpleNamespace
+from sqlalchemy import and_, func, or_, select, update
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.base import BaseTrigger
 
-from backend.models.job import ExecutionType, EventMapping
-from backend.models.job import Job
-from backend.tasks import job_tasks
-from backend.helper import log
+from backend.config.db import engine, get_database_connection
+from backend.models.job import ExecutionType, Job, JobType
+from backend.tasks import dispatch_queue, misfire_replay, status_buffer
+from backend.helper import constants, job_events, log, metrics, reference_cache, table_versions
+from backend.helper.heap_scheduler import HeapScheduler
+from backend.helper.leader_election import LeaderElection
+
+APSCHEDULER_ENGINE = "apscheduler"
+HEAP_ENGINE = "heap"
+
+# "apscheduler" runs the schedules with APScheduler and the job store below,
+# "heap" with the in-memory HeapScheduler, built for millions of one-shot jobs.
+SCHEDULER_ENGINE = os.getenv("SCHEDULER_ENGINE", APSCHEDULER_ENGINE)
+# "sqlalchemy" keeps schedules in the application database so they survive
+# restarts, "memory" restores the old volatile behaviour (useful for tests).
+# Only used by the APScheduler engine.
+SCHEDULER_JOBSTORE = os.getenv("SCHEDULER_JOBSTORE", "sqlalchemy")
+SCHEDULER_JOBSTORE_TABLE = os.getenv("SCHEDULER_JOBSTORE_TABLE", "apscheduler_jobs")
+# Whether the schedules only live in this process, and are lost on restart
+SCHEDULER_IN_MEMORY = SCHEDULER_ENGINE == HEAP_ENGINE or SCHEDULER_JOBSTORE == "memory"
+# Only the process holding the scheduler lease runs jobs, the others only
+# write schedules to the shared job store. Requires the persistent job store.
+SCHEDULER_LEADER_ELECTION = not SCHEDULER_IN_MEMORY and os.getenv(
+    "SCHEDULER_LEADER_ELECTION", "true"
+).lower() in ("1", "true", "yes")
+
+# Policy applied to missed runs of jobs and job types that don't set one
+JOB_MISFIRE_POLICY = os.getenv("JOB_MISFIRE_POLICY", constants.MISFIRE_COALESCE)
+JOB_MISFIRE_GRACE_SECONDS = int(os.getenv("JOB_MISFIRE_GRACE_SECONDS", "3600"))
+# Runs starting later than this count as missed and go through the misfire policy
+SCHEDULER_ON_TIME_SECONDS = 1
+# Seconds between two polls of the shared job store by the leader, for the jobs
+# other replicas added. Kept below SCHEDULER_ON_TIME_SECONDS, so that they start on time.
+SCHEDULER_LEADER_POLL_SECONDS = min(
+    float(os.getenv("SCHEDULER_LEADER_POLL_SECONDS", "0.5")), SCHEDULER_ON_TIME_SECONDS / 2
+)
+# Rebuild the scheduler entries of pending jobs from the jobs table on startup. On by
+# default when they live in memory, since they are lost on every restart.
+SCHEDULER_REHYDRATE = os.getenv(
+    "SCHEDULER_REHYDRATE", str(SCHEDULER_IN_MEMORY)
+).lower() in ("1", "true", "yes")
+SCHEDULER_REHYDRATE_CHUNK_SIZE = int(os.getenv("SCHEDULER_REHYDRATE_CHUNK_SIZE", "1000"))
+
+# Jobs in these states still have a run ahead of them, as have recurring jobs that
+# weren't cancelled
+REHYDRATED_STATUSES = ("Scheduled", "Running")
 
-scheduler = BackgroundScheduler()
-scheduler.start()
 logger = log.setup_logging()
 
 
-def create_job_schedule(job: Job, db):
+def _create_jobstore():
     """
-    Create a schedule for a job based on its execution type.
+    Create the job store backing the scheduler.
+
+    Returns:
+        BaseJobStore: A SQLAlchemy job store sharing the application engine,
+        or an in-memory store when SCHEDULER_JOBSTORE is "memory".
+    """
+    if SCHEDULER_JOBSTORE == "memory":
+        return MemoryJobStore()
+
+    return SQLAlchemyJobStore(engine=engine, tablename=SCHEDULER_JOBSTORE_TABLE)
+
+
+def get_job_id(scheduler_job_id: str):
+    """
+    Get the job ID from a scheduler job ID.
 
     Args:
-        job (Job): The job to schedule.
-        db: The database connection.
+        scheduler_job_id (str): The scheduler job ID.
 
-    Raises:
-        Exception: If an invalid execution type is provided.
+    Returns:
+        int: The job ID, None if the scheduler job isn't a job of this application.
     """
-    execution_type = (
-        db.query(ExecutionType)
-        .filter(ExecutionType.id == job.execution_type_id)
-        .first()
-    )
+    prefix, _, job_id = scheduler_job_id.partition("-")
+    if prefix != "job" or not job_id.isdigit():
+        return None
+    return int(job_id)
 
-    event_mapping = (
-        db.query(EventMapping).filter(ExecutionType.id == job.event_mapping_id).first()
-    )
 
-    if execution_type.name == "TIME_SPECIFIC":
+def get_misfire_policy(job: Job, job_type):
+    """
+    Resolve how missed runs of a job are handled.
+
+    The job's own settings win over its job type's, which win over
+    JOB_MISFIRE_POLICY and JOB_MISFIRE_GRACE_SECONDS.
+
+    Args:
+        job (Job): The job.
+        job_type (dict): The job type in JSON format, None if the job has none.
+
+    Returns:
+        tuple: The misfire policy and the grace window in seconds.
+    """
+    job_type = job_type or {}
+
+    policy = job.misfire_policy or job_type.get("misfire_policy") or JOB_MISFIRE_POLICY
+
+    grace_seconds = job.misfire_grace_seconds
+    if grace_seconds is None:
+        grace_seconds = job_type.get("misfire_grace_seconds")
+    if grace_seconds is None:
+        grace_seconds = JOB_MISFIRE_GRACE_SECONDS
+
+    return policy, grace_seconds
+
+
+def _get_job_type(db, job: Job):
+    if job.job_type_id is None:
+        return None
+    return reference_cache.job_types.get(db, job.job_type_id)
+
+
+def _on_job_missed(event):
+    """
+    Apply the misfire policy to a run the scheduler missed.
+
+    The scheduler reports every missed run time, or only the latest one
+    for coalescing jobs. Runs within the grace window are handed to the
+    rate limited replay, so a restart after an outage doesn't flood the
+    execution engine.
+
+    Args:
+        event (JobExecutionEvent): The missed run.
+    """
+    job_id = get_job_id(event.job_id)
+    if job_id is None:
+        return
+
+    with get_database_connection() as db:
+        job = db.get(Job, job_id)
+        if job is None:
+            return
+        policy, grace_seconds = get_misfire_policy(job, _get_job_type(db, job))
+        # The session is closed after the block, the job can't be read from there
+        priority = job.priority
+
+    scheduled_run_time = event.scheduled_run_time
+    late = (datetime.now(scheduled_run_time.tzinfo) - scheduled_run_time).total_seconds()
+
+    if policy == constants.MISFIRE_SKIP or late > grace_seconds:
+        logger.info(
+            "Skipping run of job %s missed at %s (policy %s)", job_id, scheduled_run_time, policy
+        )
+        return
+
+    misfire_replay.enqueue_replay(job_id, scheduled_run_time, priority)
+
+
+if SCHEDULER_ENGINE == HEAP_ENGINE:
+    # Keeps its entries itself, there is no job store
+    jobstore = None
+    scheduler = HeapScheduler()
+else:
+    jobstore = _create_jobstore()
+    scheduler = BackgroundScheduler(jobstores={"default": jobstore})
+scheduler.add_listener(_on_job_missed, EVENT_JOB_MISSED)
+
+leader_election = LeaderElection(
+    "scheduler",
+    on_elected=scheduler.resume,
+    on_demoted=scheduler.pause,
+)
+_start_lock = Lock()
+_poller_stopped = Event()
+_poller_thread = None
+
+
+def _poll_job_store():
+    """
+    Make the leader look for due jobs in the shared job store every
+    SCHEDULER_LEADER_POLL_SECONDS.
+
+    Jobs added through another replica are written to the job store
+    without waking the leader up, they would otherwise be noticed at the
+    next wakeup the leader planned itself, too late to run on time.
+    """
+    while not _poller_stopped.wait(SCHEDULER_LEADER_POLL_SECONDS):
+        if leader_election.is_leader:
+            scheduler.wakeup()
+
+
+def start():
+    """
+    Start the scheduler and, if enabled, campaign for its leadership.
+
+    When SCHEDULER_REHYDRATE is enabled, the entries of pending jobs are
+    rebuilt from the jobs table first, see rehydrate_schedules.
+
+    Importing this module doesn't start anything, the application calls
+    this once on startup. Calling it again is a no-op.
+    """
+    with _start_lock:
+        if scheduler.running:
+            return
+
+        # Registered before the start, the entries are added to the job store at once
+        if SCHEDULER_REHYDRATE:
+            rehydrate_schedules()
+
+        # A paused scheduler still writes to the job store but never runs jobs
+        scheduler.start(paused=SCHEDULER_LEADER_ELECTION)
+        if SCHEDULER_LEADER_ELECTION:
+            leader_election.start()
+
+            global _poller_thread
+            _poller_stopped.clear()
+            _poller_thread = Thread(target=_poll_job_store, name="scheduler-poller", daemon=True)
+            _poller_thread.start()
+
+
+def is_scheduler_leader():
+    """
+    Check whether this process runs the scheduled jobs.
+
+    Returns:
+        bool: True if this process is the scheduler leader, or leader
+        election is disabled.
+    """
+    return not SCHEDULER_LEADER_ELECTION or leader_election.is_leader
+
+
+def get_pending_job_count():
+    """
+    Count the jobs waiting in the scheduler.
+
+    Returns:
+        int: The number of scheduled entries in the job store.
+    """
+    if isinstance(jobstore, SQLAlchemyJobStore):
+        # Count in SQL instead of unpickling every stored job
+        with jobstore.engine.connect() as connection:
+            return connection.execute(
+                select(func.count()).select_from(jobstore.jobs_t)
+            ).scalar()
+
+    if jobstore is None:
+        return len(scheduler)
+
+    return len(jobstore.get_all_jobs())
+
+
+metrics.Gauge(
+    "scheduler_pending_jobs",
+    "Number of jobs waiting in the scheduler.",
+    get_pending_job_count,
+)
+metrics.Gauge(
+    "scheduler_is_leader",
+    "1 if this process runs the scheduled jobs, 0 if it only serves the API.",
+    lambda: int(is_scheduler_leader()),
+)
+
+
+def get_scheduler_job_id(job: Job):
+    """
+    Get the scheduler job ID for a job.
+
+    The ID is derived from the job's primary key so that rescheduling a job
+    replaces its persisted entry instead of adding a duplicate one.
+
+    Args:
+        job (Job): The job to get the scheduler job ID for.
+
+    Returns:
+        str: The scheduler job ID.
+    """
+    return f"job-{job.id}"
+
+
+def _build_trigger(job: Job, execution_type_name: str) -> BaseTrigger:
+    """
+    Build the scheduler trigger for a job based on its execution type.
+
+    Args:
+        job (Job): The job to build the trigger for.
+        execution_type_name (str): The name of the job's execution type.
+
+    Returns:
+        BaseTrigger: The trigger to schedule the job with.
+
+    Raises:
+        Exception: If an invalid execution type is provided.
+    """
+    if execution_type_name == "TIME_SPECIFIC":
         if job.recurring:
             # Specify the time at which the job should run every day
             execution_time = time(
@@ -51,47 +314,115 @@ def create_job_schedule(job: Job, db):
             execution_datetime = datetime.combine(current_date, execution_time)
 
             # Create an IntervalTrigger with a daily interval
-            trigger = IntervalTrigger(days=1, start_date=execution_datetime)
-
-            # Add the job with the recurring trigger
-            job_scheduler_response = scheduler.add_job(
-                job_tasks.execute_job,
-                args=[job.id],
-                trigger=trigger,
-                priority=job.priority,
-            )
+            return IntervalTrigger(days=1, start_date=execution_datetime)
 
-            logger.info("Job has been scheduled: " + str(job_scheduler_response))
-            job.job_scheduler_id = job_scheduler_response.id
-        else:
-            trigger = DateTrigger(run_date=job.execution_time)
-            job_scheduler_response = scheduler.add_job(
-                job_tasks.execute_job,
-                args=[job.id],
-                trigger=trigger,
-                priority=job.priority,
-            )
-            logger.info("Job has been scheduled: " + str(job_scheduler_response))
-            job.job_scheduler_id = job_scheduler_response.id
+        return DateTrigger(run_date=job.execution_time)
 
-    elif execution_type.name == "EVENT_BASED":
-        # Replace 60*60 with the desired delay in seconds
+    elif execution_type_name == "EVENT_BASED":
         future_datetime = datetime.now() + timedelta(weeks=100)
 
-        trigger = DateTrigger(run_date=future_datetime)
+        job.execution_time = future_datetime
 
-        job_scheduler_response = scheduler.add_job(
-            job_tasks.execute_job, trigger=trigger, args=[job.id], priority=job.priority
-        )
+        return DateTrigger(run_date=future_datetime)
 
-        logger.info("Job has been scheduled: " + str(job_scheduler_response))
+    raise Exception(f"Invalid execution type: {execution_type_name}")
 
-        job.job_scheduler_id = job_scheduler_response.id
 
-        job.execution_time = future_datetime
+def _schedule(job: Job, trigger: BaseTrigger, misfire_policy: str):
+    return scheduler.add_job(
+        dispatch_queue.dispatch,
+        trigger=trigger,
+        args=[job.id, job.priority],
+        id=get_scheduler_job_id(job),
+        replace_existing=True,
+        priority=job.priority,
+        misfire_grace_time=SCHEDULER_ON_TIME_SECONDS,
+        coalesce=misfire_policy != constants.MISFIRE_ALL,
+    )
+
+
+def _add_scheduler_job(job: Job, trigger: BaseTrigger, misfire_policy: str):
+    """
+    Add or replace the scheduler entry of a job.
+
+    The scheduler only puts fired jobs into the dispatch queue, which
+    orders them by priority. Runs that can't start on time are reported
+    as missed and handled by _on_job_missed. Coalescing makes the
+    scheduler report only the latest of several missed runs.
+
+    Args:
+        job (Job): The job to schedule.
+        trigger (BaseTrigger): The trigger to schedule the job with.
+        misfire_policy (str): The misfire policy of the job.
+    """
+    job_scheduler_response = _schedule(job, trigger, misfire_policy)
+
+    logger.info("Job has been scheduled: " + str(job_scheduler_response))
+
+    job.job_scheduler_id = job_scheduler_response.id
+
+
+def create_job_schedule(job: Job, db):
+    """
+    Create a schedule for a job based on its execution type.
+
+    Args:
+        job (Job): The job to schedule.
+        db: The database connection.
+
+    Raises:
+        Exception: If an invalid execution type is provided.
+    """
+    execution_type = reference_cache.execution_types.get(db, job.execution_type_id)
+    misfire_policy, _ = get_misfire_policy(job, _get_job_type(db, job))
+
+    trigger = _build_trigger(job, execution_type["name"])
+
+    _add_scheduler_job(job, trigger, misfire_policy)
+
+    table_versions.bump(db, table_versions.JOBS)
+    db.commit()
+
+    job_events.publish(job.id, job.status, job.job_type_id)
+
+
+def create_job_schedules(jobs, db):
+    """
+    Create the schedules of many jobs in one pass.
+
+    Execution types are resolved from the reference cache and the job rows
+    are committed once at the end.
+
+    Args:
+        jobs (List[Job]): The jobs to schedule.
+        db: The database connection.
+
+    Returns:
+        dict: Mapping of the ID of every job that couldn't be scheduled to the error.
+    """
+    errors = {}
+    for job in jobs:
+        try:
+            execution_type = reference_cache.execution_types.get(db, job.execution_type_id)
+
+            misfire_policy, _ = get_misfire_policy(job, _get_job_type(db, job))
+
+            trigger = _build_trigger(job, execution_type and execution_type["name"])
 
+            _add_scheduler_job(job, trigger, misfire_policy)
+        except Exception as e:
+            logger.exception(f"An error occurred while scheduling job ID {job.id}: {str(e)}")
+            errors[job.id] = str(e)
+
+    table_versions.bump(db, table_versions.JOBS)
     db.commit()
 
+    for job in jobs:
+        if job.id not in errors:
+            job_events.publish(job.id, job.status, job.job_type_id)
+
+    return errors
+
 
 def stop_job_scheduler(job: Job, db):
     """
@@ -104,11 +435,15 @@ def stop_job_scheduler(job: Job, db):
     try:
         logger.info(f"Stopping job scheduler for job ID: {job.id}")
 
-        scheduler.remove_job(job.job_scheduler_id)
+        try:
+            scheduler.remove_job(job.job_scheduler_id)
+        except JobLookupError:
+            # The entry has already fired or was removed, only the job row is left
+            logger.info(f"No scheduler entry found for job ID: {job.id}")
 
-        job.status = "Cancelled"
-        job.updated_at = datetime.now()
-        db.commit()
+        # Durable so that the stop is confirmed, and ordered after any buffered status
+        status_buffer.write_status(job.id, "Cancelled", durable=True)
+        job_events.publish(job.id, "Cancelled", job.job_type_id)
 
         logger.info("Job scheduler stopped successfully")
     except Exception as e:
@@ -119,6 +454,9 @@ def update_job_schedule(job: Job, db):
     """
     Update a scheduled for a job based on its execution type.
 
+    The scheduler entry is replaced in place, so a job whose entry has
+    already fired or was lost gets scheduled again under the same ID.
+
     Args:
         job (Job): The job to schedule.
         db: The database connection.
@@ -126,58 +464,176 @@ def update_job_schedule(job: Job, db):
     Raises:
         Exception: If an invalid execution type is provided.
     """
-    execution_type = (
-        db.query(ExecutionType)
-        .filter(ExecutionType.id == job.execution_type_id)
-        .first()
-    )
+    execution_type = reference_cache.execution_types.get(db, job.execution_type_id)
+    misfire_policy, _ = get_misfire_policy(job, _get_job_type(db, job))
 
-    event_mapping = (
-        db.query(EventMapping).filter(ExecutionType.id == job.event_mapping_id).first()
-    )
+    trigger = _build_trigger(job, execution_type["name"])
 
-    if execution_type.name == "TIME_SPECIFIC":
-        if job.recurring:
-            # Specify the time at which the job should run every day
-            execution_time = time(
-                hour=job.execution_time.hour,
-                minute=job.execution_time.minute,
-                second=job.execution_time.second,
-            )
+    _add_scheduler_job(job, trigger, misfire_policy)
 
-            # Get the current date
-            current_date = datetime.now().date()
+    table_versions.bump(db, table_versions.JOBS)
+    db.commit()
 
-            # Combine the current date and execution time to create a datetime object
-            execution_datetime = datetime.combine(current_date, execution_time)
+    job_events.publish(job.id, job.status, job.job_type_id)
 
-            # Create an IntervalTrigger with a daily interval
-            trigger = IntervalTrigger(days=1, start_date=execution_datetime)
 
-            # Add the job with the recurring trigger
-            job_scheduler_response = scheduler.modify_job(
-                job.job_scheduler_id, trigger=trigger
-            )
+def _get_stored_scheduler_job_ids(scheduler_job_ids):
+    """
+    Get which of the given scheduler job IDs already have an entry.
 
-            logger.info("Job has been scheduled: " + str(job_scheduler_response))
-            job.job_scheduler_id = job_scheduler_response.id
-        else:
-            trigger = DateTrigger(run_date=job.execution_time)
-            job_scheduler_response = scheduler.modify_job(
-                job.job_scheduler_id, trigger=trigger
+    Args:
+        scheduler_job_ids (list): The scheduler job IDs to look up.
+
+    Returns:
+        set: The scheduler job IDs found in the job store.
+    """
+    if isinstance(jobstore, SQLAlchemyJobStore):
+        # One query per chunk instead of unpickling every stored job
+        with jobstore.engine.connect() as connection:
+            return set(
+                connection.execute(
+                    select(jobstore.jobs_t.c.id).where(jobstore.jobs_t.c.id.in_(scheduler_job_ids))
+                ).scalars()
             )
-            logger.info("Job has been scheduled: " + str(job_scheduler_response))
-            job.job_scheduler_id = job_scheduler_response.id
 
-    elif execution_type.name == "EVENT_BASED":
-        future_datetime = time.time() + 60 * 60
+    # Not BackgroundScheduler.get_job, which scans the entries queued before the start
+    lookup_job = scheduler.get_job if jobstore is None else jobstore.lookup_job
+    return {
+        scheduler_job_id
+        for scheduler_job_id in scheduler_job_ids
+        if lookup_job(scheduler_job_id) is not None
+    }
+
+
+def rehydrate_schedules(chunk_size: int = SCHEDULER_REHYDRATE_CHUNK_SIZE):
+    """
+    Rebuild the scheduler entries of pending jobs from the jobs table.
+
+    Scheduled and Running jobs, and recurring jobs that weren't cancelled,
+    are read in chunks ordered by ID, each with one query joining their
+    execution type and job type, so memory stays bounded whatever the size
+    of the table. Jobs that already have an entry are left alone. The
+    job_scheduler_id of the jobs is reconciled with one bulk update per
+    chunk.
+
+    Run before the scheduler starts, the entries are only queued and added
+    to the job store when it starts. Runs whose time has passed are then
+    reported as missed and go through the misfire policy.
 
-        job_scheduler_response = scheduler.modify_job(
-            job.job_scheduler_id, "date", run_date=future_datetime, args=[job.id]
+    Args:
+        chunk_size (int): The number of jobs read and registered at once.
+
+    Returns:
+        dict: The number of jobs scheduled, reconciled and failed.
+    """
+    started = perf_counter()
+    persistent = isinstance(jobstore, SQLAlchemyJobStore)
+    if persistent:
+        # The job store only creates its table when the scheduler starts
+        jobstore.jobs_t.create(jobstore.engine, checkfirst=True)
+
+    query = (
+        select(
+            Job.id,
+            Job.status,
+            Job.execution_time,
+            Job.recurring,
+            Job.priority,
+            Job.job_scheduler_id,
+            Job.misfire_policy,
+            Job.misfire_grace_seconds,
+            ExecutionType.name.label("execution_type_name"),
+            JobType.misfire_policy.label("job_type_misfire_policy"),
+        )
+        .join(ExecutionType, Job.execution_type_id == ExecutionType.id)
+        .outerjoin(JobType, Job.job_type_id == JobType.id)
+        .where(
+            or_(
+                Job.status.in_(REHYDRATED_STATUSES),
+                and_(Job.recurring.is_(True), Job.status != "Cancelled"),
+            )
         )
+        .order_by(Job.id)
+        .limit(chunk_size)
+    )
 
-        logger.info("Job has been scheduled: " + str(job_scheduler_response))
+    counts = {"scheduled": 0, "reconciled": 0, "failed": 0}
+    last_id = 0
+    while True:
+        with get_database_connection() as db:
+            rows = db.execute(query.where(Job.id > last_id)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            jobs = [SimpleNamespace(**row._mapping) for row in rows]
+            stored = _get_stored_scheduler_job_ids([get_scheduler_job_id(job) for job in jobs])
+
+            updates = []
+            for job in jobs:
+                scheduler_job_id = get_scheduler_job_id(job)
+
+                if scheduler_job_id not in stored:
+                    if persistent and job.status == "Running" and not job.recurring:
+                        # Its entry has fired, it may still be running in another process
+                        continue
+
+                    try:
+                        misfire_policy, _ = get_misfire_policy(
+                            job, {"misfire_policy": job.job_type_misfire_policy}
+                        )
+                        if job.execution_type_name == "EVENT_BASED" and job.execution_time:
+                            # Keep the placeholder run time of the first scheduling
+                            trigger = DateTrigger(run_date=job.execution_time)
+                        else:
+                            trigger = _build_trigger(job, job.execution_type_name)
+
+                        _schedule(job, trigger, misfire_policy)
+                    except Exception as e:
+                        logger.exception(f"An error occurred while rehydrating job ID {job.id}: {str(e)}")
+                        counts["failed"] += 1
+                        continue
+
+                    counts["scheduled"] += 1
+
+                if job.job_scheduler_id != scheduler_job_id:
+                    updates.append(
+                        {
+                            "id": job.id,
+                            "job_scheduler_id": scheduler_job_id,
+                            "execution_time": job.execution_time,
+                        }
+                    )
+
+            if updates:
+                db.execute(update(Job), updates)
+                table_versions.bump(db, table_versions.JOBS)
+                db.commit()
+                counts["reconciled"] += len(updates)
+
+    logger.info(
+        "Rehydrated the scheduler in %.2fs: %d jobs scheduled, %d reconciled, %d failed",
+        perf_counter() - started,
+        counts["scheduled"],
+        counts["reconciled"],
+        counts["failed"],
+    )
+    return counts
 
-        job.job_scheduler_id = job_scheduler_response.id
 
-    db.commit()
+def shutdown():
+    """
+    Stop running scheduled jobs and hand the leadership over.
+    """
+    global _poller_thread
+
+    _poller_stopped.set()
+    if _poller_thread is not None:
+        _poller_thread.join()
+        _poller_thread = None
+
+    leader_election.stop()
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    misfire_replay.shutdown()
+    dispatch_queue.shutdown()
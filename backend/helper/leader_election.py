@@ -0,0 +1,229 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from threading import Event, Lock, RLock, Thread
+from time import monotonic
+
+from sqlalchemy.exc import IntegrityError
+
+from backend.config.db import LeaseSessionLocal, get_database_connection
+from backend.models.job import SchedulerLease
+from backend.helper import log
+
+logger = log.setup_logging()
+
+# Seconds a lease stays valid without being renewed, bounds the failover time
+SCHEDULER_LEADER_LEASE_SECONDS = float(os.getenv("SCHEDULER_LEADER_LEASE_SECONDS", "15"))
+# Seconds between two renewals by the leader, or two attempts by the followers
+SCHEDULER_LEADER_RENEW_SECONDS = float(os.getenv("SCHEDULER_LEADER_RENEW_SECONDS", "5"))
+# The leader steps down this long before its lease expires, covers clock drift between processes
+SCHEDULER_LEADER_MARGIN_SECONDS = float(os.getenv("SCHEDULER_LEADER_MARGIN_SECONDS", "3"))
+
+
+class LeaderElection:
+    """
+    Lease based leader election on a database row.
+
+    The leader renews its lease every renew_seconds. Followers take the
+    lease over once it has expired, so a dead leader is replaced within
+    lease_seconds + renew_seconds. Processes must have roughly synchronized
+    clocks, the expiry is compared against the local time.
+
+    A renewal that hangs, e.g. on a stalled database, doesn't raise in
+    time for the leader to notice that its lease is expiring. A watchdog
+    thread demotes the leader once margin_seconds are left on the lease
+    since its last successful renewal, before a follower may take over.
+
+    Attributes:
+        name (str): The name of the lease.
+        holder (str): Identifies this process in the lease row.
+        lease_seconds (float): How long a lease stays valid without renewal.
+        renew_seconds (float): The interval between renewals.
+        margin_seconds (float): How long before the expiry of its lease the
+            leader steps down without a renewal.
+        on_elected (callable): Called when this process becomes the leader.
+        on_demoted (callable): Called when this process loses the leadership.
+    """
+
+    def __init__(self, name, on_elected, on_demoted,
+                 lease_seconds=SCHEDULER_LEADER_LEASE_SECONDS,
+                 renew_seconds=SCHEDULER_LEADER_RENEW_SECONDS,
+                 margin_seconds=SCHEDULER_LEADER_MARGIN_SECONDS):
+        # At least two renewals must fit in the lease, one failed renewal doesn't demote the leader
+        if 2 * renew_seconds > lease_seconds - margin_seconds:
+            raise ValueError(
+                f"The {name} lease of {lease_seconds} s can't be renewed twice every "
+                f"{renew_seconds} s with a margin of {margin_seconds} s"
+            )
+
+        self.name = name
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self.renew_seconds = renew_seconds
+        self.margin_seconds = margin_seconds
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.is_leader = False
+        self._renewed_at = None
+        self._leader_lock = RLock()
+        self._stopped = Event()
+        self._lock = Lock()
+        self._thread = None
+        self._watchdog_thread = None
+
+    def try_acquire(self):
+        """
+        Acquire or renew the lease.
+
+        The lease is written through a connection of its own, not one of the
+        pool, so a busy application can't hold up the renewal.
+
+        Returns:
+            bool: True if this process holds the lease.
+        """
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.lease_seconds)
+
+        with get_database_connection(LeaseSessionLocal) as db:
+            # Renew our own lease, or take over an expired one
+            updated = (
+                db.query(SchedulerLease)
+                .filter(
+                    SchedulerLease.name == self.name,
+                    (SchedulerLease.holder == self.holder) | (SchedulerLease.expires_at < now),
+                )
+                .update(
+                    {SchedulerLease.holder: self.holder, SchedulerLease.expires_at: expires_at},
+                    synchronize_session=False,
+                )
+            )
+            if updated:
+                return True
+
+            if db.get(SchedulerLease, self.name) is not None:
+                return False
+
+        try:
+            with get_database_connection(LeaseSessionLocal) as db:
+                db.add(SchedulerLease(name=self.name, holder=self.holder, expires_at=expires_at))
+        except IntegrityError:
+            # Another process created the lease first
+            return False
+
+        return True
+
+    def release(self):
+        """
+        Give the lease up so that another process can take over right away.
+        """
+        with get_database_connection(LeaseSessionLocal) as db:
+            db.query(SchedulerLease).filter(
+                SchedulerLease.name == self.name, SchedulerLease.holder == self.holder
+            ).update({SchedulerLease.expires_at: datetime.utcnow()}, synchronize_session=False)
+
+    def _set_leader(self, is_leader):
+        with self._leader_lock:
+            if is_leader == self.is_leader:
+                return
+
+            self.is_leader = is_leader
+            if is_leader:
+                logger.info("Process %s is now the %s leader", self.holder, self.name)
+                self.on_elected()
+            else:
+                logger.info("Process %s is no longer the %s leader", self.holder, self.name)
+                self.on_demoted()
+
+    def _lease_left(self, now):
+        # Counted from the start of the last successful renewal, the expiry written then
+        return self._renewed_at + self.lease_seconds - now
+
+    def check_lease(self):
+        """
+        Demote this process if its lease wasn't renewed in time.
+
+        Returns:
+            bool: True if this process is still the leader.
+        """
+        with self._leader_lock:
+            if self.is_leader and self._lease_left(monotonic()) <= self.margin_seconds:
+                logger.warning(
+                    "The %s lease of %s wasn't renewed in time, stepping down",
+                    self.name,
+                    self.holder,
+                )
+                self._set_leader(False)
+
+            return self.is_leader
+
+    def run_once(self):
+        """
+        Run one election round and apply its outcome.
+
+        Returns:
+            bool: True if this process is the leader.
+        """
+        started = monotonic()
+        try:
+            acquired = self.try_acquire()
+        except Exception as e:
+            # A leader that can't renew must assume another process took over
+            logger.exception("Leader election for %s failed: %s", self.name, str(e))
+            acquired = False
+
+        with self._leader_lock:
+            if acquired:
+                self._renewed_at = started
+            # A renewal that took too long leaves too little of the lease to lead with
+            is_leader = acquired and self._lease_left(monotonic()) > self.margin_seconds
+            self._set_leader(is_leader)
+
+        return is_leader
+
+    def _run(self):
+        while not self._stopped.wait(self.renew_seconds):
+            self.run_once()
+
+    def _watch(self):
+        # Checked independently of the renewals, which may hang
+        while not self._stopped.wait(self.margin_seconds / 2):
+            self.check_lease()
+
+    def start(self):
+        """
+        Run a first election round and keep campaigning in the background.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            self._stopped.clear()
+            self.run_once()
+            self._thread = Thread(target=self._run, name=f"{self.name}-election", daemon=True)
+            self._thread.start()
+            self._watchdog_thread = Thread(
+                target=self._watch, name=f"{self.name}-watchdog", daemon=True
+            )
+            self._watchdog_thread.start()
+
+    def stop(self):
+        """
+        Stop campaigning and release the lease if this process holds it.
+        """
+        with self._lock:
+            if self._thread is None:
+                return
+
+            self._stopped.set()
+            self._thread.join()
+            self._watchdog_thread.join()
+            self._thread = None
+            self._watchdog_thread = None
+
+            if self.is_leader:
+                self._set_leader(False)
+                try:
+                    self.release()
+                except Exception as e:
+                    logger.exception("Failed to release the %s lease: %s", self.name, str(e))
@@ -0,0 +1,256 @@
+import threading
+from bisect import bisect_left
+
+# Default histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+_metrics = []
+_registry_lock = threading.Lock()
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+
+    escaped = (
+        '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _ShardedMetric:
+    """
+    Base class of metrics recorded into per-thread shards.
+
+    Every thread writes to its own shard without taking a lock; shards are
+    only summed up when the metrics are rendered.
+
+    Attributes:
+        name (str): The metric name.
+        description (str): The help text of the metric.
+        label_names (tuple): The names of the metric labels.
+    """
+
+    type_name = None
+
+    def __init__(self, name, description, label_names=()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._shards = []
+        self._local = threading.local()
+        self._shards_lock = threading.Lock()
+
+        with _registry_lock:
+            _metrics.append(self)
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _label_values(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _snapshot(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+
+        merged = {}
+        for shard in shards:
+            for key, values in list(shard.items()):
+                total = merged.setdefault(key, [0] * len(values))
+                for index, value in enumerate(list(values)):
+                    total[index] += value
+        return merged
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for label_values, values in sorted(self._snapshot().items()):
+            lines.extend(self._render_series(label_values, values))
+        return lines
+
+
+class Counter(_ShardedMetric):
+    """
+    A monotonically increasing counter.
+    """
+
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        """
+        Increment the counter.
+
+        Args:
+            amount (float): The amount to add.
+            **labels: The label values of the series.
+        """
+        shard = self._shard()
+        key = self._label_values(labels)
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = [0]
+        values[0] += amount
+
+    def _render_series(self, label_values, values):
+        labels = _format_labels(self.label_names, label_values)
+        return [f"{self.name}{labels} {_format_value(values[0])}"]
+
+
+class Histogram(_ShardedMetric):
+    """
+    A histogram with fixed buckets.
+
+    Attributes:
+        buckets (tuple): The upper bounds of the buckets.
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name, description, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """
+        Record an observation.
+
+        Args:
+            value (float): The observed value.
+            **labels: The label values of the series.
+        """
+        shard = self._shard()
+        key = self._label_values(labels)
+        values = shard.get(key)
+        if values is None:
+            # One slot per bucket, one for +Inf, then the sum
+            values = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def _render_series(self, label_values, values):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+            cumulative += count
+            labels = _format_labels(
+                self.label_names, label_values, ("le", _format_value(float(bound)))
+            )
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+
+        labels = _format_labels(self.label_names, label_values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(values[-1])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """
+    A gauge whose value is computed when the metrics are rendered.
+
+    Attributes:
+        name (str): The metric name.
+        description (str): The help text of the metric.
+        callback (callable): Returns the current value, or a mapping of
+            label values to values if the gauge has labels.
+        label_names (tuple): The names of the metric labels.
+    """
+
+    def __init__(self, name, description, callback, label_names=()):
+        self.name = name
+        self.description = description
+        self.callback = callback
+        self.label_names = tuple(label_names)
+
+        with _registry_lock:
+            _metrics.append(self)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} gauge",
+        ]
+        try:
+            if self.label_names:
+                for label_values, value in sorted(self.callback().items()):
+                    labels = _format_labels(self.label_names, label_values)
+                    lines.append(f"{self.name}{labels} {_format_value(value)}")
+            else:
+                lines.append(f"{self.name} {_format_value(self.callback())}")
+        except Exception:
+            # A failing gauge must not break the whole scrape
+            pass
+        return lines
+
+
+def render():
+    """
+    Render all registered metrics in the Prometheus text format.
+
+    Returns:
+        str: The metrics exposition.
+    """
+    with _registry_lock:
+        metrics = list(_metrics)
+
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+job_schedule_lag = Histogram(
+    "job_schedule_lag_seconds",
+    "Delay between the planned fire time of a job and the start of its execution.",
+    ("job_type",),
+)
+job_execution_duration = Histogram(
+    "job_execution_duration_seconds",
+    "Duration of job executions.",
+    ("job_type", "status"),
+)
+dispatch_queue_wait = Histogram(
+    "dispatch_queue_wait_seconds",
+    "Time fired jobs waited in the dispatch queue, per priority.",
+    ("priority",),
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Latency of API requests.",
+    ("method", "route"),
+)
+
+
+def record_execution(result):
+    """
+    Record the metrics of a finished job execution.
+
+    Args:
+        result (ExecutionResult): The result returned by execute_job.
+    """
+    job_type = result.job_type or "none"
+
+    if result.lag is not None:
+        job_schedule_lag.observe(max(result.lag, 0.0), job_type=job_type)
+
+    job_execution_duration.observe(
+        result.duration, job_type=job_type, status=result.status
+    )
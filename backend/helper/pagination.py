@@ -0,0 +1,92 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+from backend.models.job import Job
+from backend.helper import constants
+
+
+def encode_job_cursor(job: Job):
+    """
+    Encode the keyset position of a job into an opaque cursor.
+
+    Args:
+        job (Job): The last job of a page.
+
+    Returns:
+        str: The cursor pointing right after the job.
+    """
+    execution_time = job.execution_time.isoformat() if job.execution_time else None
+    payload = json.dumps([execution_time, job.priority, job.id])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_job_cursor(cursor: str):
+    """
+    Decode a cursor created by encode_job_cursor.
+
+    Args:
+        cursor (str): The cursor to decode.
+
+    Returns:
+        tuple: The (execution_time, priority, id) keyset position.
+
+    Raises:
+        HTTPException: If the cursor is malformed.
+    """
+    try:
+        execution_time, priority, job_id = json.loads(base64.urlsafe_b64decode(cursor))
+        if execution_time is not None:
+            execution_time = datetime.fromisoformat(execution_time)
+        return execution_time, int(priority), int(job_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail=constants.INVALID_CURSOR)
+
+
+def job_keyset_order():
+    """
+    Get the ordering used by the job listing.
+
+    Jobs without an execution time are listed last, which is also the
+    PostgreSQL default, so the ordering can be served from the
+    (status, execution_time, priority) index.
+
+    Returns:
+        tuple: The ORDER BY clauses.
+    """
+    return (
+        Job.execution_time.asc().nulls_last(),
+        Job.priority,
+        Job.id,
+    )
+
+
+def job_keyset_filter(cursor: str):
+    """
+    Build the filter selecting the jobs that come after a cursor.
+
+    Args:
+        cursor (str): The cursor returned with the previous page.
+
+    Returns:
+        ColumnElement: The WHERE clause for the next page.
+    """
+    execution_time, priority, job_id = decode_job_cursor(cursor)
+
+    after_priority = or_(
+        Job.priority > priority,
+        and_(Job.priority == priority, Job.id > job_id),
+    )
+
+    if execution_time is None:
+        # Already in the trailing jobs without an execution time
+        return and_(Job.execution_time.is_(None), after_priority)
+
+    return or_(
+        Job.execution_time > execution_time,
+        and_(Job.execution_time == execution_time, after_priority),
+        Job.execution_time.is_(None),
+    )
@@ -0,0 +1,94 @@
+import os
+from threading import Lock
+from time import monotonic
+from types import MappingProxyType
+
+from backend.models.job import EventMapping, ExecutionType, JobType
+
+# Writes through the API invalidate the cache right away, the TTL only
+# bounds staleness for writes made by other replicas.
+REFERENCE_CACHE_TTL_SECONDS = float(os.getenv("REFERENCE_CACHE_TTL_SECONDS", "60"))
+
+
+class ReferenceCache:
+    """
+    In-process cache of a small reference table, keyed by ID and by name.
+
+    The whole table is loaded at once and rows are kept as read-only
+    mappings of their JSON representation, so they can be shared between
+    threads and outlive the session that loaded them.
+
+    Attributes:
+        model: The model of the cached table.
+        ttl (float): Seconds after which the table is loaded again.
+    """
+
+    def __init__(self, model, ttl: float = REFERENCE_CACHE_TTL_SECONDS):
+        self.model = model
+        self.ttl = ttl
+        self._by_id = {}
+        self._by_name = {}
+        self._loaded_at = None
+        self._generation = 0
+        self._lock = Lock()
+
+    def _is_fresh(self):
+        return self._loaded_at is not None and monotonic() - self._loaded_at < self.ttl
+
+    def _ensure_loaded(self, db):
+        if self._is_fresh():
+            return
+
+        # The query runs outside of the lock: async sessions run it through
+        # run_sync on the event loop thread, where another request waiting
+        # for the lock would block the loop the query needs to complete.
+        generation = self._generation
+        rows = [MappingProxyType(row.to_json()) for row in db.query(self.model)]
+
+        with self._lock:
+            self._by_id = {row["id"]: row for row in rows}
+            self._by_name = {row["name"]: row for row in rows}
+            # Rows loaded before an invalidation are served once, not cached
+            if generation == self._generation:
+                self._loaded_at = monotonic()
+
+    def get(self, db, row_id):
+        """
+        Get a row by ID.
+
+        Args:
+            db: The database connection used if the table has to be loaded.
+            row_id (int): The ID of the row.
+
+        Returns:
+            Mapping: The row in JSON format, None if it doesn't exist.
+        """
+        self._ensure_loaded(db)
+        return self._by_id.get(row_id)
+
+    def get_by_name(self, db, name):
+        """
+        Get a row by name.
+
+        Args:
+            db: The database connection used if the table has to be loaded.
+            name (str): The name of the row.
+
+        Returns:
+            Mapping: The row in JSON format, None if it doesn't exist.
+        """
+        self._ensure_loaded(db)
+        return self._by_name.get(name)
+
+    def invalidate(self):
+        """
+        Drop the cached rows, the next lookup loads the table again.
+        """
+        with self._lock:
+            self._generation += 1
+            self._loaded_at = None
+
+
+execution_types = ReferenceCache(ExecutionType)
+event_mappings = ReferenceCache(EventMapping)
+job_types = ReferenceCache(JobType)
@@ -0,0 +1,295 @@
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from threading import Event, Lock, Thread
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from backend.config.db import get_database_connection
+from backend.models.job import TableVersion
+from backend.helper import log
+
+logger = log.setup_logging()
+
+# Keep the serialized reference lists in memory, keyed by the version of their table
+LIST_RESPONSE_CACHE = os.getenv("LIST_RESPONSE_CACHE", "true").lower() == "true"
+# Versions bumped by job status writes are incremented once per interval at most
+TABLE_VERSION_BUMP_INTERVAL_SECONDS = float(
+    os.getenv("TABLE_VERSION_BUMP_INTERVAL_SECONDS", "0.5")
+)
+
+JOBS = "jobs"
+JOB_TYPES = "job_types"
+EXECUTION_TYPES = "execution_types"
+EVENT_MAPPINGS = "event_mappings"
+
+TABLES = (JOBS, JOB_TYPES, EXECUTION_TYPES, EVENT_MAPPINGS)
+
+# Mapping of a table name to its last (version, serialized list)
+_list_responses = {}
+
+# Names of the tables whose version is bumped by the next round of the bumper
+_pending_bumps = set()
+_pending_bumps_lock = Lock()
+_bumper_thread = None
+_bumper_lock = Lock()
+_bumper_stopped = Event()
+
+
+def seed(engine):
+    """
+    Create the missing version counters.
+
+    Args:
+        engine: The database engine.
+    """
+    try:
+        with engine.begin() as connection:
+            existing = set(connection.scalars(select(TableVersion.name)))
+            missing = [name for name in TABLES if name not in existing]
+            if missing:
+                connection.execute(
+                    insert(TableVersion),
+                    [
+                        {"name": name, "version": 0, "updated_at": datetime.utcnow()}
+                        for name in missing
+                    ],
+                )
+    except IntegrityError:
+        # Another process seeded them first
+        logger.info("Table versions already seeded")
+
+
+def bump(db, *names):
+    """
+    Increment the version of tables, within the caller's transaction.
+
+    Must be called by every write to a table served with conditional GETs,
+    otherwise clients keep getting 304 responses for stale lists.
+
+    Args:
+        db: The database connection.
+        *names (str): The names of the written tables.
+    """
+    db.execute(
+        update(TableVersion)
+        .where(TableVersion.name.in_(names))
+        .values(version=TableVersion.version + 1, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def bump_later(*names):
+    """
+    Increment the version of tables soon, outside of the caller's transaction.
+
+    Used by the job status writes: bumping the single version row in
+    every one of their transactions would serialize them all on it. The
+    bumps requested within TABLE_VERSION_BUMP_INTERVAL_SECONDS are applied
+    at once, clients may get a 304 for that long after a write.
+
+    Args:
+        *names (str): The names of the written tables.
+    """
+    _ensure_bumper()
+
+    with _pending_bumps_lock:
+        _pending_bumps.update(names)
+
+
+def _ensure_bumper():
+    global _bumper_thread
+
+    with _bumper_lock:
+        if _bumper_thread is None or not _bumper_thread.is_alive():
+            _bumper_stopped.clear()
+            _bumper_thread = Thread(target=_bump_pending, name="table-version-bumper", daemon=True)
+            _bumper_thread.start()
+
+
+def _bump_pending():
+    """
+    Apply the requested bumps every TABLE_VERSION_BUMP_INTERVAL_SECONDS until shut down.
+    """
+    global _pending_bumps
+
+    stopping = False
+    while not stopping:
+        stopping = _bumper_stopped.wait(TABLE_VERSION_BUMP_INTERVAL_SECONDS)
+
+        with _pending_bumps_lock:
+            names, _pending_bumps = _pending_bumps, set()
+        if not names:
+            continue
+
+        try:
+            with get_database_connection() as db:
+                bump(db, *names)
+        except Exception as e:
+            logger.exception("Failed to bump the version of %s: %s", ", ".join(names), str(e))
+            with _pending_bumps_lock:
+                _pending_bumps.update(names)
+
+
+def shutdown():
+    """
+    Apply the pending bumps and stop the bumper.
+    """
+    global _bumper_thread
+
+    with _bumper_lock:
+        if _bumper_thread is not None and _bumper_thread.is_alive():
+            _bumper_stopped.set()
+            _bumper_thread.join()
+
+        _bumper_thread = None
+
+
+def get_version(db, name):
+    """
+    Get the version of a table.
+
+    Args:
+        db: The database connection.
+        name (str): The name of the table.
+
+    Returns:
+        Row: The version and the time of the last write, None if the table
+        has no version counter.
+    """
+    return db.execute(
+        select(TableVersion.version, TableVersion.updated_at).where(
+            TableVersion.name == name
+        )
+    ).first()
+
+
+def get_etag(name, version):
+    """
+    Build the entity tag of a list.
+
+    The time of the last write is part of the tag, so that counters
+    starting over on a new database don't match tags cached by clients.
+
+    Args:
+        name (str): The name of the table.
+        version (Row): The version returned by get_version.
+
+    Returns:
+        str: The weak entity tag.
+    """
+    written_at = int(version.updated_at.replace(tzinfo=timezone.utc).timestamp() * 1e6)
+    return f'W/"{name}-{version.version}-{written_at:x}"'
+
+
+def get_headers(name, version):
+    """
+    Get the validator headers of a list.
+
+    Args:
+        name (str): The name of the table.
+        version (Row): The version returned by get_version.
+
+    Returns:
+        dict: The ETag, Last-Modified and Cache-Control headers.
+    """
+    return {
+        "ETag": get_etag(name, version),
+        "Last-Modified": format_datetime(
+            version.updated_at.replace(tzinfo=timezone.utc), usegmt=True
+        ),
+        # Clients may keep the list but have to revalidate it every time
+        "Cache-Control": "no-cache",
+    }
+
+
+def is_not_modified(request: Request, name, version):
+    """
+    Check whether the client already holds the current list.
+
+    If-None-Match takes precedence over If-Modified-Since, whose one second
+    resolution can miss writes made within the same second.
+
+    Args:
+        request (Request): The incoming request.
+        name (str): The name of the table.
+        version (Row): The version returned by get_version.
+
+    Returns:
+        bool: True if a 304 response can be sent.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = get_etag(name, version)
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison, as required for If-None-Match
+        return "*" in tags or any(
+            tag.removeprefix("W/") == etag.removeprefix("W/") for tag in tags
+        )
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            modified_since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if modified_since.tzinfo is None:
+            modified_since = modified_since.replace(tzinfo=timezone.utc)
+
+        updated_at = version.updated_at.replace(tzinfo=timezone.utc, microsecond=0)
+        return updated_at <= modified_since
+
+    return False
+
+
+def get_not_modified_response(name, version):
+    """
+    Build a 304 response carrying the validators of a list.
+
+    Args:
+        name (str): The name of the table.
+        version (Row): The version returned by get_version.
+
+    Returns:
+        Response: The empty 304 response.
+    """
+    return Response(status_code=304, headers=get_headers(name, version))
+
+
+async def get_list_response(request: Request, db, name, load):
+    """
+    Serve a whole reference table with conditional GET support.
+
+    The serialized list is cached per table version when
+    LIST_RESPONSE_CACHE is enabled, so unchanged lists are neither queried
+    nor serialized again.
+
+    Args:
+        request (Request): The incoming request.
+        db: The async database connection.
+        name (str): The name of the table.
+        load (callable): Coroutine function loading the list in JSON format.
+
+    Returns:
+        Response: The list, or a 304 response.
+    """
+    version = await db.run_sync(get_version, name)
+    if version is None:
+        return JSONResponse(jsonable_encoder(await load()))
+
+    if is_not_modified(request, name, version):
+        return get_not_modified_response(name, version)
+
+    cached = _list_responses.get(name) if LIST_RESPONSE_CACHE else None
+    if cached is not None and cached[0] == tuple(version):
+        body = cached[1]
+    else:
+        body = JSONResponse(jsonable_encoder(await load())).body
+        if LIST_RESPONSE_CACHE:
+            _list_responses[name] = (tuple(version), body)
+
+    return Response(body, media_type="application/json", headers=get_headers(name, version))
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, func, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, Date, DateTime, Float, func, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -15,6 +15,12 @@ class JobType(Base):
         description (str): The description of the job type.
         job_type (str): The type of the job.
         script (str): The script associated with the job type.
+        misfire_policy (str): What to do with runs missed while the scheduler was down,
+            "skip", "coalesce" or "all". None uses the default policy.
+        misfire_grace_seconds (int): How late a missed run may still be replayed.
+        max_concurrency (int): Maximum number of its jobs executing at once per process, None for no limit.
+        rate_limit (float): Maximum number of its jobs started per second, None for no limit.
+        rate_burst (int): Number of jobs that may start at once within the rate limit.
     """
     __tablename__ = 'job_type'
 
@@ -23,6 +29,11 @@ class JobType(Base):
     description = Column(String)
     job_type = Column(String)
     script = Column(String)
+    misfire_policy = Column(String)
+    misfire_grace_seconds = Column(Integer)
+    max_concurrency = Column(Integer)
+    rate_limit = Column(Float)
+    rate_burst = Column(Integer)
 
     def to_json(self):
         """
@@ -36,7 +47,12 @@ class JobType(Base):
             "name": self.name,
             "description": self.description,
             "job_type": self.job_type,
-            "script": self.script
+            "script": self.script,
+            "misfire_policy": self.misfire_policy,
+            "misfire_grace_seconds": self.misfire_grace_seconds,
+            "max_concurrency": self.max_concurrency,
+            "rate_limit": self.rate_limit,
+            "rate_burst": self.rate_burst
         }
 
 
@@ -77,12 +93,18 @@ class EventMapping(Base):
         id (int): The ID of the event mapping.
         name (str): The name of the event mapping.
         description (str): The description of the event mapping.
+        max_concurrency (int): Maximum number of its jobs executing at once per process, None for no limit.
+        rate_limit (float): Maximum number of its jobs started per second, None for no limit.
+        rate_burst (int): Number of jobs that may start at once within the rate limit.
     """
     __tablename__ = 'event_mappings'
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String, unique=True, index=True)
     description = Column(String)
+    max_concurrency = Column(Integer)
+    rate_limit = Column(Float)
+    rate_burst = Column(Integer)
 
     def to_json(self):
         """
@@ -94,7 +116,10 @@ class EventMapping(Base):
         return {
             "id": self.id,
             "name": self.name,
-            "description": self.description
+            "description": self.description,
+            "max_concurrency": self.max_concurrency,
+            "rate_limit": self.rate_limit,
+            "rate_burst": self.rate_burst
         }
 
 
@@ -115,8 +140,16 @@ class Job(Base):
         status (str): The status of the job.
         job_type_id (int): The ID of the job type associated with the job.
         job_scheduler_id (str): The ID of the job scheduler associated with the job.
+        misfire_policy (str): What to do with runs missed while the scheduler was down,
+            "skip", "coalesce" or "all". None falls back to the job type's policy.
+        misfire_grace_seconds (int): How late a missed run may still be replayed.
     """
     __tablename__ = 'jobs'
+    __table_args__ = (
+        # Serves GET /jobs: filter by status, keyset ordered by execution time and priority
+        Index('ix_jobs_status_execution_time_priority',
+              'status', 'execution_time', 'priority'),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String, unique=True, index=True)
@@ -130,6 +163,8 @@ class Job(Base):
     status = Column(String, default="Scheduled")
     job_type_id = Column(Integer, ForeignKey('job_type.id'))
     job_scheduler_id = Column(String)
+    misfire_policy = Column(String)
+    misfire_grace_seconds = Column(Integer)
 
     execution_type = relationship("ExecutionType")
     event_mapping = relationship("EventMapping")
@@ -154,5 +189,190 @@ class Job(Base):
             "updated_at": self.updated_at,
             "status": self.status,
             "job_type_id": self.job_type_id,
-            "job_scheduler_id": self.job_scheduler_id
+            "job_scheduler_id": self.job_scheduler_id,
+            "misfire_policy": self.misfire_policy,
+            "misfire_grace_seconds": self.misfire_grace_seconds
+        }
+
+
+class JobRun(Base):
+    """
+    Model for a single execution of a job, the table is append-only.
+
+    Runs are not tied to the jobs table with a foreign key so that the
+    history outlives deleted jobs.
+
+    Attributes:
+        id (int): The ID of the run.
+        job_id (int): The ID of the executed job.
+        started_at (datetime): When the execution started.
+        finished_at (datetime): When the execution finished.
+        outcome (str): The final status of the job.
+        duration (float): How long the execution took, in seconds.
+        error (str): The error message if the execution raised.
+    """
+    __tablename__ = 'job_runs'
+    __table_args__ = (
+        Index('ix_job_runs_job_id_started_at', 'job_id', 'started_at'),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(Integer, nullable=False)
+    started_at = Column(DateTime, nullable=False, index=True)
+    finished_at = Column(DateTime, nullable=False)
+    outcome = Column(String, nullable=False)
+    duration = Column(Float, nullable=False)
+    error = Column(String)
+
+    def to_json(self):
+        """
+        Convert the JobRun object to a JSON representation.
+
+        Returns:
+            dict: JSON representation of the JobRun object.
+        """
+        return {
+            "id": self.id,
+            "job_id": self.job_id,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "outcome": self.outcome,
+            "duration": self.duration,
+            "error": self.error
+        }
+
+
+class JobRunSummary(Base):
+    """
+    Model for the daily aggregate of compacted job runs.
+
+    Attributes:
+        job_id (int): The ID of the executed job.
+        day (date): The day the runs started on.
+        runs (int): The number of runs.
+        failures (int): The number of runs that didn't complete.
+        total_duration (float): The summed duration of the runs, in seconds.
+        max_duration (float): The longest run, in seconds.
+    """
+    __tablename__ = 'job_run_summaries'
+
+    job_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    runs = Column(Integer, nullable=False, default=0)
+    failures = Column(Integer, nullable=False, default=0)
+    total_duration = Column(Float, nullable=False, default=0.0)
+    max_duration = Column(Float, nullable=False, default=0.0)
+
+    def to_json(self):
+        """
+        Convert the JobRunSummary object to a JSON representation.
+
+        Returns:
+            dict: JSON representation of the JobRunSummary object.
+        """
+        return {
+            "job_id": self.job_id,
+            "day": self.day,
+            "runs": self.runs,
+            "failures": self.failures,
+            "total_duration": self.total_duration,
+            "max_duration": self.max_duration
+        }
+
+
+class SchedulerLease(Base):
+    """
+    Model for the lease held by the process that runs the scheduler.
+
+    Attributes:
+        name (str): The name of the lease.
+        holder (str): The process holding the lease.
+        expires_at (datetime): When the lease expires unless renewed.
+    """
+    __tablename__ = 'scheduler_leases'
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    def to_json(self):
+        """
+        Convert the SchedulerLease object to a JSON representation.
+
+        Returns:
+            dict: JSON representation of the SchedulerLease object.
+        """
+        return {
+            "name": self.name,
+            "holder": self.holder,
+            "expires_at": self.expires_at
+        }
+
+
+class TableVersion(Base):
+    """
+    Model for the change counter of a table served with conditional GETs.
+
+    Attributes:
+        name (str): The name of the table.
+        version (int): Incremented by every write to the table.
+        updated_at (datetime): When the table was last written.
+    """
+    __tablename__ = 'table_versions'
+
+    name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=func.now())
+
+    def to_json(self):
+        """
+        Convert the TableVersion object to a JSON representation.
+
+        Returns:
+            dict: JSON representation of the TableVersion object.
+        """
+        return {
+            "name": self.name,
+            "version": self.version,
+            "updated_at": self.updated_at
+        }
+
+
+class JobEvent(Base):
+    """
+    Model for a job status transition, the table is append-only.
+
+    Every process writes the transitions it makes, and every process
+    serving job status streams reads them, so a stream receives the
+    transitions of all replicas and workers. Rows are only kept for a
+    short time.
+
+    Attributes:
+        id (int): The ID of the event, streams read events in this order.
+        job_id (int): The ID of the job.
+        status (str): The new status of the job.
+        job_type_id (int): The ID of the job's job type, None if it has none.
+        created_at (datetime): When the transition happened.
+    """
+    __tablename__ = 'job_events'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(Integer, nullable=False)
+    status = Column(String, nullable=False)
+    job_type_id = Column(Integer)
+    created_at = Column(DateTime, nullable=False, index=True)
+
+    def to_json(self):
+        """
+        Convert the JobEvent object to a JSON representation.
+
+        Returns:
+            dict: JSON representation of the JobEvent object.
+        """
+        return {
+            "id": self.id,
+            "job_id": self.job_id,
+            "status": self.status,
+            "job_type_id": self.job_type_id,
+            "created_at": self.created_at
         }
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Optional
 
 
 class EventMappingBase(BaseModel):
@@ -8,9 +9,15 @@ class EventMappingBase(BaseModel):
     Attributes:
         name (str): The name of the event mapping.
         description (str): The description of the event mapping.
+        max_concurrency (int): Maximum number of its jobs executing at once per process.
+        rate_limit (float): Maximum number of its jobs started per second.
+        rate_burst (int): Number of jobs that may start at once within the rate limit.
     """
     name: str
     description: str
+    max_concurrency: Optional[int] = Field(None, ge=1)
+    rate_limit: Optional[float] = Field(None, gt=0)
+    rate_burst: Optional[int] = Field(None, ge=1)
 
 
 class EventMappingCreate(EventMappingBase):
@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
+
+from backend.helper import constants
 
 
 class JobBase(BaseModel):
@@ -16,6 +18,8 @@ class JobBase(BaseModel):
         event_mapping_id (int): The ID of the event mapping associated with the job.
         job_type_id (int): The ID of the job type associated with the job.
         job_scheduler_id (str): The ID of the job scheduler associated with the job.
+        misfire_policy (str): How runs missed during downtime are handled, defaults to the job type's.
+        misfire_grace_seconds (int): How late a missed run may still be replayed.
     """
 
     name: str
@@ -26,6 +30,8 @@ class JobBase(BaseModel):
     event_mapping_id: Optional[int] = None
     job_type_id: Optional[int] = None
     job_scheduler_id: Optional[str] = None
+    misfire_policy: Optional[Literal["skip", "coalesce", "all"]] = None
+    misfire_grace_seconds: Optional[int] = Field(None, ge=0)
 
 
 class JobCreate(JobBase):
@@ -39,6 +45,19 @@ class JobCreate(JobBase):
     pass
 
 
+class JobBulkCreate(BaseModel):
+    """
+    Model for creating jobs in bulk.
+
+    Attributes:
+        jobs (List[JobCreate]): The jobs to create.
+        schedule (bool): Whether the created jobs should be scheduled right away.
+    """
+
+    jobs: List[JobCreate] = Field(..., min_items=1, max_items=constants.JOBS_BULK_MAX_SIZE)
+    schedule: bool = False
+
+
 class JobUpdate(JobBase):
     """
     Model for updating a job.
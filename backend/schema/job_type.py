@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
 
 
 class JobTypeBase(BaseModel):
@@ -9,12 +9,22 @@ class JobTypeBase(BaseModel):
     Attributes:
         name (str): The name of the job type.
         job_type (str): The type of the job.
+        misfire_policy (str): How runs missed during downtime are handled.
+        misfire_grace_seconds (int): How late a missed run may still be replayed.
+        max_concurrency (int): Maximum number of its jobs executing at once per process.
+        rate_limit (float): Maximum number of its jobs started per second.
+        rate_burst (int): Number of jobs that may start at once within the rate limit.
     """
 
     name: str
     job_type: str
     script: Optional[str] = None
     description: Optional[str] = None
+    misfire_policy: Optional[Literal["skip", "coalesce", "all"]] = None
+    misfire_grace_seconds: Optional[int] = Field(None, ge=0)
+    max_concurrency: Optional[int] = Field(None, ge=1)
+    rate_limit: Optional[float] = Field(None, gt=0)
+    rate_burst: Optional[int] = Field(None, ge=1)
 
 
 class JobTypeCreate(JobTypeBase):
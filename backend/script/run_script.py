@@ -1,6 +1,10 @@
+import errno
+import hashlib
 import os
+import stat
 import subprocess
-import sh
+import tempfile
+from threading import BoundedSemaphore
 
 from backend.models.job import JobType
 from backend.helper import log
@@ -8,41 +12,188 @@ from backend.helper import log
 
 logger = log.setup_logging()
 
+# Scripts are written once per content hash and reused by every run. The
+# directory must be private to the service user, it holds executed code.
+SCRIPT_CACHE_DIR = os.getenv(
+    "SCRIPT_CACHE_DIR",
+    os.path.join(
+        os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+        "job-executor",
+        "scripts",
+    ),
+)
+# Maximum number of scripts running at the same time in this process
+SCRIPT_MAX_CONCURRENCY = int(os.getenv("SCRIPT_MAX_CONCURRENCY", "8"))
+# Seconds after which a running script is killed, 0 disables the timeout
+SCRIPT_TIMEOUT_SECONDS = float(os.getenv("SCRIPT_TIMEOUT_SECONDS", "0"))
 
-def run_script(result_job_type: JobType):
-    # Specify the script content as a string
-    script = result_job_type['script']
+_subprocess_slots = BoundedSemaphore(SCRIPT_MAX_CONCURRENCY)
+
+
+def _check_private(info, path):
+    """
+    Check that a cache entry belongs to this user and nobody else can write it.
+
+    Args:
+        info (os.stat_result): The status of the entry, not following symlinks.
+        path (str): The path of the entry, for the error message.
+
+    Raises:
+        PermissionError: If the entry is owned by another user or writable by others.
+    """
+    if info.st_uid != os.geteuid() or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"{path} must be owned by this user and only writable by them")
+
+
+def _get_cache_dir():
+    """
+    Create the script cache directory if needed and check that it is private.
+
+    Returns:
+        str: The path of the directory.
+
+    Raises:
+        PermissionError: If the directory isn't a real directory accessible
+            to this user only.
+    """
+    os.makedirs(SCRIPT_CACHE_DIR, mode=0o700, exist_ok=True)
 
-    # Get the current directory
-    current_directory = os.getcwd()
+    info = os.lstat(SCRIPT_CACHE_DIR)
+    if not stat.S_ISDIR(info.st_mode) or info.st_mode & 0o077:
+        raise PermissionError(
+            f"The script cache {SCRIPT_CACHE_DIR} must be a directory with mode 0700"
+        )
+    _check_private(info, SCRIPT_CACHE_DIR)
 
-    # Specify the script file name
-    script_filename = 'script.sh'
+    return SCRIPT_CACHE_DIR
 
-    # Create the script file path
-    script_path = os.path.join(current_directory, script_filename)
 
+def _write_script(script_path: str, script: bytes):
+    """
+    Write a script file atomically.
+
+    It is written to a temporary file first and moved into place, so
+    concurrent runs never see a partially written script.
+
+    Args:
+        script_path (str): The path of the script file.
+        script (bytes): The script content.
+    """
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        dir=os.path.dirname(script_path), suffix=".tmp"
+    )
     try:
-        # Save the script content to the file
-        with open(script_path, 'w') as file:
+        with os.fdopen(file_descriptor, 'wb') as file:
             file.write(script)
+        os.chmod(temporary_path, 0o700)
+        os.replace(temporary_path, script_path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+    logger.info("Shell script has been created on path %s", str(script_path))
+
+
+def open_script(script: str):
+    """
+    Open the cached file holding a script, after checking its content.
+
+    The file is named after the hash of the script content and only
+    written the first time that content is seen. It is opened without
+    following symlinks and its content compared with the script, a file
+    that doesn't match is replaced. The script must be run through the
+    returned descriptor, not its path, so that the checked file is the
+    one executed.
+
+    Args:
+        script (str): The script content.
+
+    Returns:
+        int: A file descriptor of the script file, to be closed by the caller.
+
+    Raises:
+        PermissionError: If the cache directory or the file isn't private.
+    """
+    content = script.encode()
+    digest = hashlib.sha256(content).hexdigest()
+    script_path = os.path.join(_get_cache_dir(), f"{digest}.sh")
+
+    for attempt in range(2):
+        try:
+            file_descriptor = os.open(script_path, os.O_RDONLY | os.O_NOFOLLOW)
+        except FileNotFoundError:
+            _write_script(script_path, content)
+            continue
+        except OSError as e:
+            if e.errno != errno.ELOOP:
+                raise
+            # A symlink in place of the script, replaced like a wrong content
+            logger.warning("Shell script %s is a symlink, rewriting it", script_path)
+            _write_script(script_path, content)
+            continue
+
+        try:
+            info = os.fstat(file_descriptor)
+            _check_private(info, script_path)
+            with os.fdopen(os.dup(file_descriptor), 'rb') as file:
+                matches = stat.S_ISREG(info.st_mode) and file.read() == content
+        except BaseException:
+            os.close(file_descriptor)
+            raise
+
+        if matches:
+            return file_descriptor
+
+        os.close(file_descriptor)
+        logger.warning("Shell script %s doesn't match its hash, rewriting it", script_path)
+        _write_script(script_path, content)
+
+    raise RuntimeError(f"Shell script {script_path} keeps changing after being written")
+
+
+def run_script(result_job_type: JobType):
+    """
+    Run the script of a SCRIPT job type.
+
+    Every run gets its own temporary working directory, and at most
+    SCRIPT_MAX_CONCURRENCY scripts run at once.
+
+    Args:
+        result_job_type (JobType): The job type in JSON format.
+
+    Returns:
+        bool: True if the script exited successfully, False otherwise.
+    """
+    try:
+        script_descriptor = open_script(result_job_type['script'])
     except Exception as e:
         logger.error(
             "Error occurred while writing the script file: %s", str(e))
         return False
 
-    logger.info("Shell script has been created on path %s", str(script_path))
-
-    os.chmod(script_path, 0o755)
-
     try:
-        # Execute the Bash script
-        output = sh.bash(script_path)
+        with _subprocess_slots, tempfile.TemporaryDirectory(prefix="job-run-") as workspace:
+            # Execute the checked file through its descriptor, a path could
+            # have been swapped since it was checked
+            output = subprocess.run(
+                ["bash", f"/dev/fd/{script_descriptor}"],
+                pass_fds=(script_descriptor,),
+                cwd=workspace,
+                capture_output=True,
+                text=True,
+                timeout=SCRIPT_TIMEOUT_SECONDS or None,
+                check=True,
+            )
 
-        logger.info("Shell script output %s", str(output))
+        logger.info("Shell script output %s", str(output.stdout))
 
         return True
+    except subprocess.CalledProcessError as e:
+        logger.error("Shell script exited with %s: %s", e.returncode, str(e.stderr))
+        return False
     except Exception as e:
         # Handle any exceptions or errors
-        log.error("Error occurred:", str(e))
+        logger.error("Error occurred: %s", str(e))
         return False
+    finally:
+        os.close(script_descriptor)
@@ -0,0 +1,116 @@
+import os
+
+from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
+from dotenv import load_dotenv
+
+from backend.config.db import engine
+from backend.tasks import job_run_writer, job_tasks, status_buffer
+from backend.helper import job_events, log, table_versions
+
+load_dotenv()
+
+logger = log.setup_logging()
+
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+# Run tasks in the calling process instead of sending them to a broker (tests)
+CELERY_TASK_ALWAYS_EAGER = os.getenv("CELERY_TASK_ALWAYS_EAGER", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Queues are named "<prefix>.<job type>.<band>", e.g. "jobs.code.high"
+CELERY_QUEUE_PREFIX = os.getenv("CELERY_QUEUE_PREFIX", "jobs")
+# Jobs with a priority up to this value go to the "high" band, the others to "normal"
+CELERY_HIGH_PRIORITY_MAX = int(os.getenv("CELERY_HIGH_PRIORITY_MAX", "1"))
+
+HIGH_PRIORITY_BAND = "high"
+DEFAULT_PRIORITY_BAND = "normal"
+
+# Queue key used for jobs without a job type (e.g. event based jobs)
+DEFAULT_QUEUE_KEY = "default"
+
+EXECUTE_JOB_TASK = "backend.tasks.execute_job"
+
+app = Celery("job_executors", broker=CELERY_BROKER_URL)
+app.conf.update(
+    task_always_eager=CELERY_TASK_ALWAYS_EAGER,
+    task_default_queue=f"{CELERY_QUEUE_PREFIX}.{DEFAULT_QUEUE_KEY}.{DEFAULT_PRIORITY_BAND}",
+    # The final status is written to the jobs table, results are not needed
+    task_ignore_result=True,
+    # A job is only acknowledged once it ran, so a crashed worker doesn't lose it
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+)
+
+
+def get_job_queue(job_type, priority):
+    """
+    Get the queue a job is routed to.
+
+    Args:
+        job_type (str): The JobType.job_type of the job, None if the job has no job type.
+        priority (int): The priority of the job, lower is more urgent.
+
+    Returns:
+        str: The name of the queue.
+    """
+    band = (
+        HIGH_PRIORITY_BAND
+        if priority is not None and priority <= CELERY_HIGH_PRIORITY_MAX
+        else DEFAULT_PRIORITY_BAND
+    )
+    return f"{CELERY_QUEUE_PREFIX}.{(job_type or DEFAULT_QUEUE_KEY).lower()}.{band}"
+
+
+@app.task(name=EXECUTE_JOB_TASK)
+def execute_job(job_id: int):
+    """
+    Execute a job inside a Celery worker.
+
+    Args:
+        job_id (int): The ID of the job to execute.
+
+    Returns:
+        str: The final status of the job.
+    """
+    result = job_tasks.execute_job(job_id)
+
+    job_run_writer.record(result)
+
+    return result.status
+
+
+def enqueue_job(job_id: int, job_type, priority):
+    """
+    Send a job to the Celery workers.
+
+    Args:
+        job_id (int): The ID of the job to execute.
+        job_type (str): The JobType.job_type of the job, None if the job has no job type.
+        priority (int): The priority of the job.
+
+    Returns:
+        str: The name of the queue the job was sent to.
+    """
+    queue = get_job_queue(job_type, priority)
+
+    execute_job.apply_async(args=[job_id], queue=queue)
+
+    return queue
+
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    # Connections inherited from the parent process must not be reused by the child
+    engine.dispose(close=False)
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def _shutdown_worker_process(**kwargs):
+    # Flush what the worker buffered before it exits
+    status_buffer.shutdown()
+    job_run_writer.shutdown()
+    job_events.shutdown()
+    table_versions.shutdown()
@@ -0,0 +1,232 @@
+import os
+from collections import deque
+from threading import BoundedSemaphore, Condition, Lock, Thread
+from time import monotonic
+
+from backend.tasks import execution_engine
+from backend.helper import log, metrics
+
+logger = log.setup_logging()
+
+# Maximum number of dispatched jobs executing at the same time
+DISPATCH_CONCURRENCY = int(
+    os.getenv("DISPATCH_CONCURRENCY", str(execution_engine.THREAD_POOL_SIZE))
+)
+# Maximum number of fired jobs waiting for an execution slot, the scheduler blocks beyond
+DISPATCH_QUEUE_SIZE = int(os.getenv("DISPATCH_QUEUE_SIZE", "10000"))
+# Jobs waiting longer than this are dispatched first, whatever their priority
+DISPATCH_MAX_WAIT_SECONDS = float(os.getenv("DISPATCH_MAX_WAIT_SECONDS", "60"))
+
+# Priority of jobs fired without one, e.g. by entries scheduled before the dispatch queue existed
+DEFAULT_PRIORITY = 0
+
+
+class DispatchQueue:
+    """
+    Bounded priority queue between the scheduler and the execution engine.
+
+    Fired jobs wait in one FIFO per priority, and the most urgent priority
+    (the lowest number) is dispatched first, so a saturated engine runs
+    high priority jobs before low priority ones. A job that waited longer
+    than max_wait is dispatched before any other, so low priorities can't
+    starve.
+
+    Attributes:
+        max_size (int): The maximum number of waiting jobs.
+        max_wait (float): Seconds after which a waiting job is dispatched first.
+    """
+
+    def __init__(self, max_size, max_wait):
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._bands = {}
+        self._size = 0
+        self._condition = Condition()
+        self._stopping = False
+
+    def put(self, job_id, priority):
+        """
+        Add a fired job, blocking while the queue is full.
+
+        Args:
+            job_id (int): The ID of the job.
+            priority (int): The priority of the job.
+
+        Returns:
+            bool: False if the queue is stopped and the job was dropped.
+        """
+        with self._condition:
+            while self._size >= self.max_size and not self._stopping:
+                self._condition.wait()
+
+            if self._stopping:
+                return False
+
+            self._bands.setdefault(priority, deque()).append((monotonic(), job_id))
+            self._size += 1
+            self._condition.notify_all()
+
+            return True
+
+    def get(self):
+        """
+        Remove the next job to dispatch, blocking while the queue is empty.
+
+        Returns:
+            tuple: The job ID, its priority and how long it waited, None once
+            the queue is stopped.
+        """
+        with self._condition:
+            while not self._size and not self._stopping:
+                self._condition.wait()
+
+            if self._stopping:
+                return None
+
+            now = monotonic()
+            oldest = min(self._bands, key=lambda priority: self._bands[priority][0][0])
+            if now - self._bands[oldest][0][0] >= self.max_wait:
+                priority = oldest
+            else:
+                priority = min(self._bands)
+
+            band = self._bands[priority]
+            fired_at, job_id = band.popleft()
+            if not band:
+                del self._bands[priority]
+
+            self._size -= 1
+            self._condition.notify_all()
+
+            return job_id, priority, now - fired_at
+
+    @property
+    def stopped(self):
+        return self._stopping
+
+    def start(self):
+        """
+        Accept jobs again after stop().
+        """
+        with self._condition:
+            self._stopping = False
+
+    def depths(self):
+        """
+        Get the number of waiting jobs per priority.
+
+        Returns:
+            dict: Mapping of (priority,) to the number of waiting jobs.
+        """
+        with self._condition:
+            return {(str(priority),): len(band) for priority, band in self._bands.items()}
+
+    def stop(self):
+        """
+        Wake up every waiting caller and drop the waiting jobs.
+
+        Returns:
+            int: The number of dropped jobs.
+        """
+        with self._condition:
+            dropped = self._size
+            self._stopping = True
+            self._bands = {}
+            self._size = 0
+            self._condition.notify_all()
+            return dropped
+
+
+_queue = DispatchQueue(DISPATCH_QUEUE_SIZE, DISPATCH_MAX_WAIT_SECONDS)
+_slots = BoundedSemaphore(DISPATCH_CONCURRENCY)
+_dispatcher_thread = None
+_dispatcher_lock = Lock()
+
+metrics.Gauge(
+    "dispatch_queue_depth",
+    "Number of fired jobs waiting for an execution slot, per priority.",
+    _queue.depths,
+    ("priority",),
+)
+
+
+def dispatch(job_id: int, priority: int = DEFAULT_PRIORITY):
+    """
+    Queue a fired job for execution.
+
+    This is the function the scheduler fires.
+
+    Args:
+        job_id (int): The ID of the job to execute.
+        priority (int): The priority of the job, lower is more urgent.
+    """
+    _ensure_dispatcher()
+
+    if not _queue.put(job_id, priority if priority is not None else DEFAULT_PRIORITY):
+        logger.warning("Dispatch queue is stopped, dropping job %s", job_id)
+
+
+def _ensure_dispatcher():
+    global _dispatcher_thread
+
+    with _dispatcher_lock:
+        if _dispatcher_thread is None or not _dispatcher_thread.is_alive():
+            # Restarted after a shutdown, e.g. when the application is started again
+            _queue.start()
+            _dispatcher_thread = Thread(target=_dispatch_jobs, name="job-dispatcher", daemon=True)
+            _dispatcher_thread.start()
+
+
+def _release(future):
+    _slots.release()
+
+
+def _dispatch_jobs():
+    """
+    Hand queued jobs to the execution engine as execution slots free up.
+    """
+    while True:
+        # Wait for a free slot first, so the priority is decided as late as possible
+        while not _slots.acquire(timeout=1):
+            if _queue.stopped:
+                return
+
+        item = _queue.get()
+        if item is None:
+            _slots.release()
+            return
+
+        job_id, priority, waited = item
+        metrics.dispatch_queue_wait.observe(waited, priority=priority)
+
+        try:
+            future = execution_engine.submit_job(job_id)
+        except Exception as e:
+            _slots.release()
+            logger.exception("Failed to dispatch job %s: %s", job_id, str(e))
+            continue
+
+        if future is None:
+            # Ran inline, or was handed over to the Celery workers
+            _slots.release()
+        else:
+            future.add_done_callback(_release)
+
+
+def shutdown():
+    """
+    Stop the dispatcher, jobs still waiting for a slot are dropped.
+
+    The next dispatch starts it again.
+    """
+    global _dispatcher_thread
+
+    # Under the lock, so that a concurrent dispatch can't restart the queue before the join
+    with _dispatcher_lock:
+        dropped = _queue.stop()
+        if dropped:
+            logger.warning("Dropped %s jobs waiting in the dispatch queue", dropped)
+
+        if _dispatcher_thread is not None:
+            _dispatcher_thread.join()
+        _dispatcher_thread = None
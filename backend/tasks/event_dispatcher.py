@@ -0,0 +1,108 @@
+import os
+import queue
+from threading import Lock, Thread
+
+from backend.config.db import get_database_connection
+from backend.models.job import Job
+from backend.tasks import dispatch_queue
+from backend.helper import log
+
+logger = log.setup_logging()
+
+# Maximum number of events waiting to be fanned out
+EVENT_DISPATCH_QUEUE_SIZE = int(os.getenv("EVENT_DISPATCH_QUEUE_SIZE", "1000"))
+
+_STOP = object()
+
+_events = queue.Queue(maxsize=EVENT_DISPATCH_QUEUE_SIZE)
+_dispatcher_thread = None
+_dispatcher_lock = Lock()
+
+
+class EventQueueFull(Exception):
+    """
+    Raised when an event can't be queued because the dispatcher is saturated.
+    """
+
+
+def enqueue_event(event_mapping_id: int):
+    """
+    Queue an event for dispatch and return immediately.
+
+    Args:
+        event_mapping_id (int): The ID of the event mapping that occurred.
+
+    Raises:
+        EventQueueFull: If the dispatch queue is full.
+    """
+    _ensure_dispatcher()
+
+    try:
+        _events.put_nowait(event_mapping_id)
+    except queue.Full:
+        raise EventQueueFull(f"Event queue is full, dropping event {event_mapping_id}")
+
+
+def _ensure_dispatcher():
+    global _dispatcher_thread
+
+    with _dispatcher_lock:
+        if _dispatcher_thread is None or not _dispatcher_thread.is_alive():
+            _dispatcher_thread = Thread(
+                target=_dispatch_events, name="event-dispatcher", daemon=True
+            )
+            _dispatcher_thread.start()
+
+
+def _dispatch_events():
+    """
+    Consume queued events until the dispatcher is shut down.
+    """
+    while True:
+        event_mapping_id = _events.get()
+        if event_mapping_id is _STOP:
+            return
+
+        try:
+            fan_out(event_mapping_id)
+        except Exception as e:
+            logger.exception(
+                "An error occurred while dispatching event %s: %s",
+                event_mapping_id,
+                str(e),
+            )
+
+
+def fan_out(event_mapping_id: int):
+    """
+    Execute every job bound to an event mapping.
+
+    Jobs are put into the dispatch queue with their priority, so they share
+    the execution slots of the scheduled jobs and are ordered with them.
+
+    Args:
+        event_mapping_id (int): The ID of the event mapping that occurred.
+    """
+    with get_database_connection() as db:
+        jobs = db.query(Job.id, Job.priority).filter(
+            Job.event_mapping_id == event_mapping_id
+        ).all()
+
+    logger.info("Dispatching event %s to jobs %s", event_mapping_id, [job_id for job_id, _ in jobs])
+
+    for job_id, priority in jobs:
+        dispatch_queue.dispatch(job_id, priority)
+
+
+def shutdown():
+    """
+    Stop the dispatcher once the already queued events are dispatched.
+    """
+    global _dispatcher_thread
+
+    with _dispatcher_lock:
+        if _dispatcher_thread is not None and _dispatcher_thread.is_alive():
+            _events.put(_STOP)
+            _dispatcher_thread.join()
+
+        _dispatcher_thread = None
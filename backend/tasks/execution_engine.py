@@ -0,0 +1,304 @@
+import multiprocessing
+import multiprocessing.util
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from threading import Lock
+
+from backend.config.db import engine, get_database_connection
+from backend.models.job import Job
+from backend.tasks import execution_limits, job_run_writer, job_tasks, status_buffer
+from backend.helper import job_events, log, metrics, reference_cache, table_versions
+
+logger = log.setup_logging()
+
+INLINE_ENGINE = "inline"
+THREAD_ENGINE = "thread"
+PROCESS_ENGINE = "process"
+# Sends the job to Celery workers, see backend.tasks.celery_app
+CELERY_ENGINE = "celery"
+
+ENGINES = (INLINE_ENGINE, THREAD_ENGINE, PROCESS_ENGINE, CELERY_ENGINE)
+
+# Key used for jobs without a job type (e.g. event based jobs)
+DEFAULT_ENGINE_KEY = "default"
+
+THREAD_POOL_SIZE = int(os.getenv("EXECUTION_THREAD_POOL_SIZE", "10"))
+PROCESS_POOL_SIZE = int(os.getenv("EXECUTION_PROCESS_POOL_SIZE", str(os.cpu_count() or 1)))
+
+_thread_pool = None
+_process_pool = None
+_pool_lock = Lock()
+
+_limiter = execution_limits.ExecutionLimiter()
+
+
+def parse_engine_setting(setting: str):
+    """
+    Parse the execution engine setting.
+
+    Args:
+        setting (str): Comma separated "<job_type>=<engine>" pairs,
+            e.g. "CODE=process,SCRIPT=thread,default=thread".
+
+    Returns:
+        dict: Mapping of JobType.job_type (or "default") to engine name.
+
+    Raises:
+        ValueError: If an unknown engine is configured.
+    """
+    engines = {DEFAULT_ENGINE_KEY: THREAD_ENGINE}
+
+    for pair in filter(None, (item.strip() for item in setting.split(","))):
+        job_type, _, engine_name = pair.partition("=")
+        engine_name = engine_name.strip().lower()
+
+        if engine_name not in ENGINES:
+            raise ValueError(f"Invalid execution engine for {job_type}: {engine_name}")
+
+        engines[job_type.strip()] = engine_name
+
+    return engines
+
+
+EXECUTION_ENGINES = parse_engine_setting(
+    os.getenv("JOB_EXECUTION_ENGINES", "CODE=process,SCRIPT=thread,default=thread")
+)
+
+
+def _init_worker_process():
+    """
+    Initializer for process pool workers.
+
+    Workers are spawned and open their own connections, the pool is reset
+    anyway so no connection created while importing is shared.
+    Statuses are written right away, a worker has no shutdown hook to flush
+    a write-behind buffer. Only the published transitions and the table
+    version bumps, applied in the background, are flushed when the worker
+    exits.
+    """
+    engine.dispose(close=False)
+    status_buffer.disable_write_behind()
+    multiprocessing.util.Finalize(None, job_events.shutdown, exitpriority=10)
+    multiprocessing.util.Finalize(None, table_versions.shutdown, exitpriority=10)
+
+
+def _get_thread_pool():
+    global _thread_pool
+
+    with _pool_lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(
+                max_workers=THREAD_POOL_SIZE, thread_name_prefix="job-executor"
+            )
+
+        return _thread_pool
+
+
+def _get_process_pool():
+    global _process_pool
+
+    with _pool_lock:
+        if _process_pool is None:
+            # Workers are spawned, a fork would copy the locks and connections
+            # held by the scheduler, dispatcher and flusher threads at that time
+            _process_pool = ProcessPoolExecutor(
+                max_workers=PROCESS_POOL_SIZE,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker_process,
+            )
+
+        return _process_pool
+
+
+def _record_result(result):
+    """
+    Record the metrics and the run history of a finished job.
+
+    Args:
+        result (ExecutionResult): The result returned by execute_job.
+    """
+    metrics.record_execution(result)
+    job_run_writer.record(result)
+
+
+def _on_job_finished(future: Future, limits=None):
+    """
+    Record the result of a job that finished inside a pool, or log its error.
+
+    Runs in the parent process, so executions in process workers are
+    recorded as well.
+
+    Args:
+        future (Future): The future of the finished job.
+        limits (dict): The limits the job took a slot of, see get_job_limits.
+    """
+    if limits:
+        _limiter.release(limits)
+
+    if future.cancelled():
+        return
+
+    error = future.exception()
+    if error is not None:
+        logger.error("Job execution failed in the execution engine: %s", str(error))
+        return
+
+    _record_result(future.result())
+
+
+def get_job_engine(job_type):
+    """
+    Get the execution engine for a job type.
+
+    Args:
+        job_type (str): The JobType.job_type of the job, None if the job has no job type.
+
+    Returns:
+        str: The name of the execution engine.
+    """
+    return EXECUTION_ENGINES.get(job_type, EXECUTION_ENGINES[DEFAULT_ENGINE_KEY])
+
+
+def get_job_limits(db, job_type_id, event_mapping_id):
+    """
+    Get the concurrency and rate limits that apply to a job.
+
+    Args:
+        db: The database connection.
+        job_type_id (int): The ID of the job's job type, None if it has none.
+        event_mapping_id (int): The ID of the job's event mapping, None if it has none.
+
+    Returns:
+        dict: Mapping of the limit key to the job type or event mapping in
+        JSON format, for those that set a limit.
+    """
+    limits = {}
+    for key, cache, reference_id in (
+        ("job_type", reference_cache.job_types, job_type_id),
+        ("event_mapping", reference_cache.event_mappings, event_mapping_id),
+    ):
+        settings = cache.get(db, reference_id) if reference_id is not None else None
+        if settings and (settings.get("max_concurrency") or settings.get("rate_limit")):
+            limits[(key, reference_id)] = settings
+
+    return limits
+
+
+def submit_job(job_id: int):
+    """
+    Hand a job over to the execution engine configured for its job type.
+
+    Only the job ID is passed on, the worker loads the job itself. A job
+    over the concurrency or rate limit of its job type or event mapping is
+    not failed but submitted again once the limit allows it.
+
+    Args:
+        job_id (int): The ID of the job to execute.
+
+    Returns:
+        Future: The future of the submitted job, None if it ran inline, was
+            sent to the Celery workers or was deferred.
+    """
+    with get_database_connection() as db:
+        row = (
+            db.query(Job.job_type_id, Job.event_mapping_id, Job.priority)
+            .filter(Job.id == job_id)
+            .first()
+        )
+
+        job_type_id, event_mapping_id, priority = row if row is not None else (None, None, None)
+
+        job_type = (
+            reference_cache.job_types.get(db, job_type_id) if job_type_id is not None else None
+        )
+        limits = get_job_limits(db, job_type_id, event_mapping_id)
+
+    job_type = job_type["job_type"] if job_type else None
+
+    engine_name = get_job_engine(job_type)
+
+    if engine_name == CELERY_ENGINE:
+        # Completions happen on the workers, only the start rate can be limited here
+        limits = {
+            key: {**settings, "max_concurrency": None} for key, settings in limits.items()
+        }
+
+    if limits:
+        limit, delay = _limiter.try_acquire(limits)
+        if limit is not None:
+            logger.info("Job %s is over its %s limit, deferred by %.2fs", job_id, limit, delay)
+            execution_limits.job_deferrals.inc(limit=limit)
+            _deferred_jobs.defer(job_id, delay, priority)
+            return None
+
+    logger.info("Submitting job %s to the %s execution engine", job_id, engine_name)
+
+    if engine_name == CELERY_ENGINE:
+        # Imported on first use, loading Celery slows down the startup of
+        # processes that run jobs in their own pools
+        from backend.tasks import celery_app
+
+        queue = celery_app.enqueue_job(job_id, job_type, priority)
+        logger.info("Job %s has been sent to the %s queue", job_id, queue)
+        return None
+
+    if engine_name == INLINE_ENGINE:
+        try:
+            _record_result(job_tasks.execute_job(job_id))
+        finally:
+            _limiter.release(limits)
+        return None
+
+    try:
+        if engine_name == PROCESS_ENGINE:
+            future = _get_process_pool().submit(job_tasks.execute_job, job_id)
+        else:
+            future = _get_thread_pool().submit(job_tasks.execute_job, job_id)
+    except BaseException:
+        _limiter.release(limits)
+        raise
+
+    future.add_done_callback(lambda done: _on_job_finished(done, limits))
+
+    return future
+
+
+def _dispatch_deferred(job_id: int, priority: int):
+    """
+    Put a deferred job back into the dispatch queue once its delay has elapsed.
+
+    Args:
+        job_id (int): The ID of the job.
+        priority (int): The priority of the job.
+    """
+    # Imported here, the dispatch queue imports this module
+    from backend.tasks import dispatch_queue
+
+    dispatch_queue.dispatch(job_id, priority)
+
+
+_deferred_jobs = execution_limits.DeferredJobs(_dispatch_deferred)
+
+metrics.Gauge(
+    "job_deferred_pending",
+    "Number of jobs deferred by a limit and waiting to be submitted again.",
+    _deferred_jobs.pending,
+)
+
+
+def shutdown(wait: bool = True):
+    """
+    Shut down the execution pools.
+
+    Args:
+        wait (bool): Whether to wait for running jobs to finish.
+    """
+    global _thread_pool, _process_pool
+
+    with _pool_lock:
+        for pool in (_thread_pool, _process_pool):
+            if pool is not None:
+                pool.shutdown(wait=wait)
+
+        _thread_pool = None
+        _process_pool = None
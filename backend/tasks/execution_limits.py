@@ -0,0 +1,187 @@
+import heapq
+import os
+from collections import Counter
+from threading import Condition, Lock, Thread
+from time import monotonic
+
+from backend.helper import log, metrics
+
+logger = log.setup_logging()
+
+# Seconds before a job deferred by a concurrency limit is tried again
+LIMIT_RETRY_SECONDS = float(os.getenv("LIMIT_RETRY_SECONDS", "0.5"))
+
+CONCURRENCY_LIMIT = "concurrency"
+RATE_LIMIT = "rate"
+
+job_deferrals = metrics.Counter(
+    "job_deferrals_total",
+    "Job executions deferred by a concurrency or rate limit.",
+    ("limit",),
+)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at a fixed rate.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        burst (int): Maximum number of tokens.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = monotonic()
+
+    def _refill(self, now):
+        # A bucket created after the caller read the time must not lose tokens
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now):
+        """
+        Get how long until a token is available.
+
+        Args:
+            now (float): The current monotonic time.
+
+        Returns:
+            float: Seconds to wait, 0 if a token is available.
+        """
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class ExecutionLimiter:
+    """
+    Enforces the concurrency and rate limits of job types and event mappings.
+
+    Limits are read from the job type or event mapping in JSON format, so
+    changes apply as soon as the reference cache is refreshed. Counters are
+    kept per process.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._running = Counter()
+        self._buckets = {}
+
+    def _bucket(self, key, rate, burst):
+        bucket = self._buckets.get(key)
+        if bucket is None or bucket.rate != rate or bucket.burst != burst:
+            bucket = self._buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    def try_acquire(self, limits):
+        """
+        Take an execution slot and a token for every limit, or none at all.
+
+        Args:
+            limits (dict): Mapping of a limit key (e.g. ("job_type", 1)) to
+                the job type or event mapping in JSON format.
+
+        Returns:
+            tuple: The limit that was hit and the seconds to wait before
+            trying again, (None, 0) if the job may run.
+        """
+        now = monotonic()
+
+        with self._lock:
+            buckets = []
+            for key, settings in limits.items():
+                max_concurrency = settings.get("max_concurrency")
+                if max_concurrency and self._running[key] >= max_concurrency:
+                    return CONCURRENCY_LIMIT, LIMIT_RETRY_SECONDS
+
+                rate = settings.get("rate_limit")
+                if rate:
+                    bucket = self._bucket(key, rate, settings.get("rate_burst") or 1)
+                    wait_time = bucket.wait_time(now)
+                    if wait_time:
+                        return RATE_LIMIT, wait_time
+                    buckets.append(bucket)
+
+            for bucket in buckets:
+                bucket.take()
+            for key, settings in limits.items():
+                if settings.get("max_concurrency"):
+                    self._running[key] += 1
+
+        return None, 0.0
+
+    def release(self, limits):
+        """
+        Give back the execution slots taken by try_acquire.
+
+        Args:
+            limits (dict): The limits passed to try_acquire.
+        """
+        with self._lock:
+            for key, settings in limits.items():
+                if settings.get("max_concurrency") and self._running[key] > 0:
+                    self._running[key] -= 1
+
+
+class DeferredJobs:
+    """
+    Re-submits deferred jobs once their delay has elapsed.
+
+    Attributes:
+        submit (callable): Called with the job ID and priority when the delay has elapsed.
+    """
+
+    def __init__(self, submit):
+        self.submit = submit
+        self._heap = []
+        self._sequence = 0
+        self._condition = Condition()
+        self._thread = None
+
+    def defer(self, job_id, delay, priority):
+        """
+        Submit a job again after a delay.
+
+        Args:
+            job_id (int): The ID of the job.
+            delay (float): Seconds to wait.
+            priority (int): The priority of the job.
+        """
+        with self._condition:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name="job-deferrals", daemon=True)
+                self._thread.start()
+
+            self._sequence += 1
+            heapq.heappush(self._heap, (monotonic() + delay, self._sequence, job_id, priority))
+            self._condition.notify()
+
+    def pending(self):
+        """
+        Get the number of deferred jobs.
+
+        Returns:
+            int: The number of jobs waiting to be submitted again.
+        """
+        with self._condition:
+            return len(self._heap)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._heap or self._heap[0][0] > monotonic():
+                    self._condition.wait(
+                        self._heap[0][0] - monotonic() if self._heap else None
+                    )
+                _, _, job_id, priority = heapq.heappop(self._heap)
+
+            try:
+                self.submit(job_id, priority)
+            except Exception as e:
+                logger.exception("Failed to submit deferred job %s: %s", job_id, str(e))
@@ -0,0 +1,274 @@
+import os
+import queue
+from datetime import date, datetime, time, timedelta
+from threading import Lock, Thread
+from time import monotonic
+
+from sqlalchemy import case, func, insert, select
+
+from backend.config.db import get_database_connection
+from backend.models.job import JobRun, JobRunSummary
+from backend.helper import log
+from backend.helper.leader_election import LeaderElection
+
+logger = log.setup_logging()
+
+# Runs are inserted in batches of this size...
+JOB_RUN_BATCH_SIZE = int(os.getenv("JOB_RUN_BATCH_SIZE", "500"))
+# ...or at least every this many seconds
+JOB_RUN_FLUSH_INTERVAL_SECONDS = float(os.getenv("JOB_RUN_FLUSH_INTERVAL_SECONDS", "1"))
+# Runs waiting to be written; when full, new runs are dropped rather than blocking executions
+JOB_RUN_QUEUE_SIZE = int(os.getenv("JOB_RUN_QUEUE_SIZE", "100000"))
+# Days individual runs are kept before being compacted into daily summaries
+JOB_RUN_RETENTION_DAYS = int(os.getenv("JOB_RUN_RETENTION_DAYS", "7"))
+# Days daily summaries are kept, 0 keeps them forever
+JOB_RUN_SUMMARY_RETENTION_DAYS = int(os.getenv("JOB_RUN_SUMMARY_RETENTION_DAYS", "365"))
+JOB_RUN_MAINTENANCE_INTERVAL_SECONDS = float(
+    os.getenv("JOB_RUN_MAINTENANCE_INTERVAL_SECONDS", "3600")
+)
+# Runs summarized and deleted per transaction when compacting
+JOB_RUN_COMPACT_CHUNK_SIZE = 10000
+# Seconds the maintenance lease is held without renewal, renewed between chunks
+JOB_RUN_MAINTENANCE_LEASE_SECONDS = 300
+
+_STOP = object()
+
+_runs = queue.Queue(maxsize=JOB_RUN_QUEUE_SIZE)
+# Only its try_acquire and release are used, the lease is a lock between processes
+_maintenance_lease = LeaderElection(
+    "job-run-maintenance",
+    on_elected=lambda: None,
+    on_demoted=lambda: None,
+    lease_seconds=JOB_RUN_MAINTENANCE_LEASE_SECONDS,
+)
+_writer_thread = None
+_writer_lock = Lock()
+
+
+def record(result):
+    """
+    Queue the run of a job for writing, without touching the database.
+
+    Args:
+        result (ExecutionResult): The result returned by execute_job.
+    """
+    _ensure_writer()
+
+    row = {
+        "job_id": result.job_id,
+        "started_at": result.started_at,
+        "finished_at": result.started_at + timedelta(seconds=result.duration),
+        "outcome": result.status,
+        "duration": result.duration,
+        "error": result.error,
+    }
+
+    try:
+        _runs.put_nowait(row)
+    except queue.Full:
+        logger.warning("Job run queue is full, dropping run of job %s", result.job_id)
+
+
+def _ensure_writer():
+    global _writer_thread
+
+    with _writer_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = Thread(target=_write_runs, name="job-run-writer", daemon=True)
+            _writer_thread.start()
+
+
+def flush(rows):
+    """
+    Insert a batch of runs with a single executemany.
+
+    Args:
+        rows (list): The runs to insert, as column dictionaries.
+    """
+    if not rows:
+        return
+
+    with get_database_connection() as db:
+        db.execute(insert(JobRun), rows)
+
+
+def _write_runs():
+    """
+    Batch queued runs into the database until the writer is shut down.
+    """
+    batch = []
+    last_flush = monotonic()
+    last_maintenance = monotonic()
+    stopping = False
+
+    while not stopping:
+        timeout = max(JOB_RUN_FLUSH_INTERVAL_SECONDS - (monotonic() - last_flush), 0)
+        try:
+            row = _runs.get(timeout=timeout)
+            if row is _STOP:
+                stopping = True
+            else:
+                batch.append(row)
+        except queue.Empty:
+            pass
+
+        if stopping or len(batch) >= JOB_RUN_BATCH_SIZE or (
+            monotonic() - last_flush >= JOB_RUN_FLUSH_INTERVAL_SECONDS
+        ):
+            try:
+                flush(batch)
+            except Exception as e:
+                logger.exception("Failed to write %s job runs: %s", len(batch), str(e))
+            batch = []
+            last_flush = monotonic()
+
+        if monotonic() - last_maintenance >= JOB_RUN_MAINTENANCE_INTERVAL_SECONDS:
+            try:
+                compact()
+            except Exception as e:
+                logger.exception("Failed to compact job runs: %s", str(e))
+            last_maintenance = monotonic()
+
+
+def _as_date(value):
+    # date() returns a string on SQLite and a date on PostgreSQL
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def _compact_chunk(db, cutoff, after_id):
+    """
+    Roll the next chunk of runs older than the cutoff into daily summaries
+    and delete them, in the transaction of db.
+
+    Args:
+        db: The database connection.
+        cutoff (datetime): Runs started before it are compacted.
+        after_id (int): The last run ID compacted by the previous chunk.
+
+    Returns:
+        tuple: The last run ID of the chunk and the number of runs
+        compacted, None if no run is left to compact.
+    """
+    last_id = db.scalar(
+        select(func.max(JobRun.id)).where(
+            JobRun.id.in_(
+                select(JobRun.id)
+                .where(JobRun.started_at < cutoff, JobRun.id > after_id)
+                .order_by(JobRun.id)
+                .limit(JOB_RUN_COMPACT_CHUNK_SIZE)
+            )
+        )
+    )
+    if last_id is None:
+        return None
+
+    compacted = (JobRun.started_at < cutoff) & (JobRun.id > after_id) & (JobRun.id <= last_id)
+    day = func.date(JobRun.started_at)
+
+    aggregates = db.execute(
+        select(
+            JobRun.job_id,
+            day,
+            func.count(),
+            func.sum(case((JobRun.outcome == "Completed", 0), else_=1)),
+            func.sum(JobRun.duration),
+            func.max(JobRun.duration),
+        )
+        .where(compacted)
+        .group_by(JobRun.job_id, day)
+    ).all()
+
+    days = {_as_date(row[1]) for row in aggregates}
+    summaries = {
+        (summary.job_id, summary.day): summary
+        for summary in db.scalars(select(JobRunSummary).where(JobRunSummary.day.in_(days)))
+    }
+
+    for job_id, run_day, runs, failures, total_duration, max_duration in aggregates:
+        key = (job_id, _as_date(run_day))
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = JobRunSummary(
+                job_id=job_id, day=key[1], runs=0, failures=0,
+                total_duration=0.0, max_duration=0.0,
+            )
+            db.add(summary)
+
+        summary.runs += runs
+        summary.failures += failures
+        summary.total_duration += total_duration
+        summary.max_duration = max(summary.max_duration, max_duration)
+
+    db.query(JobRun).filter(compacted).delete(synchronize_session=False)
+
+    return last_id, sum(row[2] for row in aggregates)
+
+
+def compact(today: date = None):
+    """
+    Roll runs older than the retention into daily summaries and delete them.
+
+    Only one process compacts at a time, it holds a lease in the database
+    and the others skip their compaction. Runs are compacted in chunks of
+    JOB_RUN_COMPACT_CHUNK_SIZE, each chunk is summarized and deleted in its
+    own transaction so no run is ever counted twice. Summaries older than
+    their own retention are deleted as well.
+
+    Args:
+        today (date, optional): The current day. Defaults to today.
+
+    Returns:
+        int: The number of runs compacted.
+    """
+    today = today or datetime.now().date()
+    cutoff = datetime.combine(today - timedelta(days=JOB_RUN_RETENTION_DAYS), time.min)
+
+    if not _maintenance_lease.try_acquire():
+        logger.info("Job runs are being compacted by another process, skipping")
+        return 0
+
+    runs_compacted = 0
+    try:
+        last_id = 0
+        while True:
+            with get_database_connection() as db:
+                chunk = _compact_chunk(db, cutoff, last_id)
+            if chunk is None:
+                break
+
+            last_id, runs = chunk
+            runs_compacted += runs
+
+            # Renewed between chunks, so that a long compaction keeps it
+            if not _maintenance_lease.try_acquire():
+                logger.warning("Lost the job run maintenance lease, stopping the compaction")
+                return runs_compacted
+
+        if JOB_RUN_SUMMARY_RETENTION_DAYS:
+            with get_database_connection() as db:
+                db.query(JobRunSummary).filter(
+                    JobRunSummary.day < today - timedelta(days=JOB_RUN_SUMMARY_RETENTION_DAYS)
+                ).delete(synchronize_session=False)
+    finally:
+        try:
+            _maintenance_lease.release()
+        except Exception as e:
+            logger.exception("Failed to release the job run maintenance lease: %s", str(e))
+
+    logger.info("Compacted %s job runs older than %s", runs_compacted, cutoff)
+
+    return runs_compacted
+
+
+def shutdown():
+    """
+    Write the queued runs and stop the writer.
+    """
+    global _writer_thread
+
+    with _writer_lock:
+        if _writer_thread is not None and _writer_thread.is_alive():
+            _runs.put(_STOP)
+            _writer_thread.join()
+
+        _writer_thread = None
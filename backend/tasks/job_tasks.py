@@ -1,141 +1,251 @@
-from datetime import datetime
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from time import perf_counter
+from types import MappingProxyType
+from typing import Mapping, Optional
 from dotenv import load_dotenv
+from sqlalchemy.orm import joinedload
 
-from backend.helper import job_helper, log
+from backend.helper import job_events, log
 from backend.config.db import get_database_connection
 from backend.models.job import Job
-from backend.models.job import JobType
 from backend.script import run_script as script
-from backend.models.job import EventMapping
+from backend.tasks import status_buffer
 
 load_dotenv()
 
 logger = log.setup_logging()
 
 
+@dataclass(frozen=True)
+class JobExecutionContext:
+    """
+    Immutable snapshot of everything needed to execute a job.
+
+    Attributes:
+        job (Mapping): The job in JSON format.
+        job_type (Mapping): The job type in JSON format, None if the job has none.
+        event_mapping (Mapping): The event mapping in JSON format, None if the job has none.
+    """
+
+    job: Mapping
+    job_type: Optional[Mapping] = None
+    event_mapping: Optional[Mapping] = None
+
+
+@dataclass(frozen=True)
+class ExecutionResult:
+    """
+    Outcome of a job execution, small enough to cross process boundaries.
+
+    Attributes:
+        job_id (int): The ID of the executed job.
+        job_type (str): The name of the job type, None for event based jobs.
+        status (str): The final status of the job.
+        started_at (datetime): When the execution started.
+        duration (float): How long the execution took, in seconds.
+        lag (float): Seconds between the planned fire time and the start, None if unknown.
+        error (str): The error message if the execution raised.
+        job_type_id (int): The ID of the job type, None for event based jobs.
+    """
+
+    job_id: int
+    job_type: Optional[str]
+    status: str
+    started_at: datetime
+    duration: float
+    lag: Optional[float] = None
+    error: Optional[str] = None
+    job_type_id: Optional[int] = None
+
+
+def _freeze(row):
+    return MappingProxyType(row.to_json()) if row is not None else None
+
+
+def load_execution_context(db, job_id):
+    """
+    Load a job and its related rows with a single query.
+
+    Args:
+        db: The database connection.
+        job_id (int): The ID of the job to load.
+
+    Returns:
+        JobExecutionContext: The execution context, None if the job doesn't exist.
+    """
+    job = (
+        db.query(Job)
+        .options(joinedload(Job.job_type), joinedload(Job.event_mapping))
+        .filter(Job.id == job_id)
+        .first()
+    )
+
+    if not job:
+        return None
+
+    return JobExecutionContext(
+        job=_freeze(job),
+        job_type=_freeze(job.job_type),
+        event_mapping=_freeze(job.event_mapping),
+    )
+
+
+def _run_job(context: JobExecutionContext):
+    """
+    Run a job and compute its final status.
+
+    Args:
+        context (JobExecutionContext): The job to run.
+
+    Returns:
+        str: The final status of the job.
+    """
+    if context.job_type:
+        result_job_type = context.job_type
+        logger.info("Job type details: %s", str(dict(result_job_type)))
+
+        # Execute the job based on its execution_type and other configuration
+        if result_job_type["job_type"] == "CODE":
+            if result_job_type["name"] == "COUNT_TILL_10":
+                logger.info("Executing COUNT_TILL_10 job")
+
+                countTillTen = 0
+
+                while countTillTen < 10:
+                    countTillTen = countTillTen + 1
+
+                # Update the job status based on the API response
+                if countTillTen == 10:
+                    return "Completed"
+                return "Failed"
+            elif result_job_type["name"] == "COUNT_TILL_5":
+                logger.info("Executing COUNT_TILL_5 job")
+
+                countTillFive = 0
+
+                while countTillFive < 10:
+                    countTillFive = countTillFive + 1
+
+                # Update the job status based on the API response
+                if countTillFive == 5:
+                    return "Completed"
+                return "Failed"
+        elif result_job_type["job_type"] == "SCRIPT":
+            logger.info("Executing SCRIPT job")
+
+            if script.run_script(result_job_type):
+                return "Completed"
+
+            logger.error("SCRIPT job failed")
+            return "Failed"
+
+        # Unknown job type, the status is left untouched
+        return context.job["status"]
+
+    # Handle event-based execution
+    result_event_mapping = context.event_mapping
+    if result_event_mapping["name"] == "TRAIN_TICKET_CONFIRMATION":
+        logger.info("Executing event job: %s", result_event_mapping["name"])
+
+        # Perform the job-specific logic here when the event occurs
+        logger.info("Train ticket has been sent to the customer over mail")
+
+        return "Completed"
+    elif result_event_mapping["name"] == "FLIGHT_TICKET_CONFIRMATION":
+        logger.info("Executing event job: %s", result_event_mapping["name"])
+
+        # Perform the job-specific logic here when the event occurs
+        logger.info("Flight ticket has been sent to the customer over mail")
+
+        return "Completed"
+
+    # Handle the case when the event doesn't occur or handle the event not found scenario
+    return "Failed"
+
+
+def get_planned_fire_time(context: JobExecutionContext, now: datetime):
+    """
+    Get the time a scheduled job was planned to fire at.
+
+    Args:
+        context (JobExecutionContext): The job being executed.
+        now (datetime): The start of the execution.
+
+    Returns:
+        datetime: The planned fire time, None for event based jobs.
+    """
+    execution_time = context.job["execution_time"]
+    if context.event_mapping or execution_time is None:
+        return None
+
+    if context.job["recurring"]:
+        # The most recent daily occurrence of the execution time
+        planned = datetime.combine(now.date(), execution_time.time())
+        return planned if planned <= now else planned - timedelta(days=1)
+
+    return execution_time
+
+
 def execute_job(job_id):
-    with get_database_connection() as db:
-        """
-        Execute a job based on its configuration.
+    """
+    Execute a job based on its configuration.
+
+    The job and its related rows are loaded with one query, no connection
+    is held while the job runs, and the final status is written once
+    (buffered when STATUS_WRITE_BEHIND is enabled). The Running and final
+    transitions are published to the job status streams.
 
-        Args:
+    Args:
         job_id (int): The ID of the job to execute.
-        """
-        try:
-            job = db.query(Job).filter(Job.id == job_id).first()
-            if not job:
-                raise Exception("Job not found")
-
-            result_job = job.to_json()
-
-            job_type = (
-                db.query(JobType)
-                .filter(JobType.id == result_job["job_type_id"])
-                .first()
-            )
 
-            event_mapping = (
-                db.query(EventMapping)
-                .filter(EventMapping.id == result_job["event_mapping_id"])
-                .first()
+    Returns:
+        ExecutionResult: The outcome of the execution.
+    """
+    started_at = datetime.now()
+    started = perf_counter()
+
+    with get_database_connection() as db:
+        context = load_execution_context(db, job_id)
+
+    if context is None:
+        raise Exception("Job not found")
+
+    job_type_id = context.job["job_type_id"]
+    job_events.publish(job_id, "Running", job_type_id)
+
+    status = "Failed"
+    error = None
+    try:
+        if not context.job_type and not context.event_mapping:
+            raise Exception(
+                "Job Type or Event Mapping not found for job %s" % dict(context.job)
             )
 
-            if not job_type and not event_mapping:
-                raise Exception(
-                    "Job Type or Event Mapping not found for job %s", result_job
-                )
-
-            logger.info("Job details: %s", str(result_job))
-
-            if job_type:
-                result_job_type = job_type.to_json()
-                logger.info("Job type details: %s", str(result_job_type))
-
-                if result_job["recurring"]:
-                    result_job["excecution_time"] = result_job[
-                        "excecution_time"
-                    ] + datetime.timedelta(days=1)
-
-                    job_helper.create_job_schedule(result_job, db)
-
-                # Execute the job based on its execution_type and other configuration
-                if result_job_type["job_type"] == "CODE":
-                    if result_job_type["name"] == "COUNT_TILL_10":
-                        logger.info("Executing COUNT_TILL_10 job")
-
-                        countTillTen = 0
-
-                        while countTillTen < 10:
-                            countTillTen = countTillTen + 1
-
-                            job.status = "Running"
-
-                        # Update the job status based on the API response
-                        if countTillTen == 10:
-                            job.status = "Completed"
-                        else:
-                            job.status = "Failed"
-                    elif result_job_type["name"] == "COUNT_TILL_5":
-                        logger.info("Executing COUNT_TILL_5 job")
-
-                        countTillFive = 0
-
-                        while countTillFive < 10:
-                            countTillFive = countTillFive + 1
-
-                            job.status = "Running"
-
-                        # Update the job status based on the API response
-                        if countTillFive == 5:
-                            job.status = "Completed"
-                        else:
-                            job.status = "Failed"
-                elif result_job_type["job_type"] == "SCRIPT":
-                    logger.info("Executing SCRIPT job")
-
-                    if script.run_script(result_job_type):
-                        job.status = "Completed"
-                    else:
-                        logger.error("SCRIPT job failed")
-
-                        job.status = "Failed"
-            elif event_mapping:
-                # Handle event-based execution
-
-                result_event_mapping = event_mapping.to_json()
-                if result_event_mapping["name"] == "TRAIN_TICKET_CONFIRMATION":
-                    logger.info("Executing event job: %s", result_event_mapping["name"])
-
-                    # Perform the job-specific logic here when the event occurs
-                    logger.info("Train ticket has been sent to the customer over mail")
-
-                    # Update the job status
-                    job.status = "Completed"
-                    db.commit()
-                elif result_event_mapping["name"] == "FLIGHT_TICKET_CONFIRMATION":
-                    logger.info("Executing event job: %s", result_event_mapping["name"])
-
-                    # Perform the job-specific logic here when the event occurs
-                    logger.info("Flight ticket has been sent to the customer over mail")
-
-                    # Update the job status
-                    job.status = "Completed"
-                    db.commit()
-                else:
-                    # Handle the case when the event doesn't occur or handle the event not found scenario
-                    job.status = "Failed"
-                    db.commit()
-            else:
-                # Unknown execution_type
-                job.status = "Failed"
-
-            # Update job status and other relevant information
-            job.updated_at = datetime.now()
-            db.commit()
-            logger.info("Job execution completed successfully.")
-
-        except Exception as e:
-            db.rollback()
-            job.status = "Failed"
-            logger.exception("An error occurred during job execution: %s", str(e))
-            raise
+        logger.info("Job details: %s", str(dict(context.job)))
+
+        status = _run_job(context)
+
+        logger.info("Job execution completed successfully.")
+
+    except Exception as e:
+        logger.exception("An error occurred during job execution: %s", str(e))
+        error = str(e)
+
+    status_buffer.write_status(job_id, status)
+    job_events.publish(job_id, status, job_type_id)
+
+    planned_fire_time = get_planned_fire_time(context, started_at)
+
+    return ExecutionResult(
+        job_id=job_id,
+        job_type=context.job_type["name"] if context.job_type else None,
+        status=status,
+        started_at=started_at,
+        duration=perf_counter() - started,
+        lag=(started_at - planned_fire_time).total_seconds()
+        if planned_fire_time
+        else None,
+        error=error,
+        job_type_id=job_type_id,
+    )
@@ -0,0 +1,100 @@
+import os
+import queue
+from threading import Lock, Thread
+from time import monotonic, sleep
+
+from backend.tasks import dispatch_queue
+from backend.helper import log
+
+logger = log.setup_logging()
+
+# Maximum number of missed runs replayed per second
+MISFIRE_REPLAY_RATE = float(os.getenv("MISFIRE_REPLAY_RATE", "1"))
+# Maximum number of missed runs waiting to be replayed
+MISFIRE_REPLAY_QUEUE_SIZE = int(os.getenv("MISFIRE_REPLAY_QUEUE_SIZE", "10000"))
+
+_STOP = object()
+
+_replays = queue.Queue(maxsize=MISFIRE_REPLAY_QUEUE_SIZE)
+_replay_thread = None
+_replay_lock = Lock()
+
+
+def enqueue_replay(job_id: int, scheduled_run_time, priority: int):
+    """
+    Queue a missed run of a job for replay.
+
+    Args:
+        job_id (int): The ID of the job.
+        scheduled_run_time (datetime): The run time that was missed.
+        priority (int): The priority of the job.
+    """
+    _ensure_replayer()
+
+    try:
+        _replays.put_nowait((job_id, scheduled_run_time, priority))
+    except queue.Full:
+        logger.warning(
+            "Misfire replay queue is full, dropping run of job %s planned at %s",
+            job_id,
+            scheduled_run_time,
+        )
+
+
+def _ensure_replayer():
+    global _replay_thread
+
+    with _replay_lock:
+        if _replay_thread is None or not _replay_thread.is_alive():
+            _replay_thread = Thread(target=_replay, name="misfire-replay", daemon=True)
+            _replay_thread.start()
+
+
+def _replay():
+    """
+    Put queued missed runs into the dispatch queue at MISFIRE_REPLAY_RATE.
+
+    Replays then wait for an execution slot by priority, like fired jobs.
+    """
+    interval = 1 / MISFIRE_REPLAY_RATE
+    next_slot = monotonic()
+
+    while True:
+        item = _replays.get()
+        if item is _STOP:
+            return
+
+        delay = next_slot - monotonic()
+        if delay > 0:
+            sleep(delay)
+        next_slot = max(next_slot, monotonic()) + interval
+
+        job_id, scheduled_run_time, priority = item
+        logger.info("Replaying run of job %s missed at %s", job_id, scheduled_run_time)
+
+        try:
+            dispatch_queue.dispatch(job_id, priority)
+        except Exception as e:
+            logger.exception("Failed to replay job %s: %s", job_id, str(e))
+
+
+def shutdown():
+    """
+    Stop replaying, runs still waiting in the queue are dropped.
+    """
+    global _replay_thread
+
+    with _replay_lock:
+        if _replay_thread is None:
+            return
+
+        # Drop pending runs so that shutdown doesn't wait for the rate limit
+        try:
+            while True:
+                _replays.get_nowait()
+        except queue.Empty:
+            pass
+
+        _replays.put(_STOP)
+        _replay_thread.join()
+        _replay_thread = None
@@ -0,0 +1,240 @@
+import os
+from datetime import datetime
+from threading import Condition, Thread
+
+from sqlalchemy import bindparam, update
+
+from backend.config.db import get_database_connection
+from backend.models.job import Job
+from backend.helper import log, table_versions
+
+logger = log.setup_logging()
+
+# Buffer job status writes and flush them in batches instead of one commit each
+STATUS_WRITE_BEHIND = os.getenv("STATUS_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+# Buffered statuses are flushed at least this often...
+STATUS_FLUSH_INTERVAL_SECONDS = float(os.getenv("STATUS_FLUSH_INTERVAL_SECONDS", "0.5"))
+# ...or as soon as this many jobs have a pending status
+STATUS_FLUSH_BATCH_SIZE = int(os.getenv("STATUS_FLUSH_BATCH_SIZE", "500"))
+# Failed flushes are retried after the flush interval, doubled after every failure up to this
+STATUS_FLUSH_RETRY_MAX_SECONDS = float(os.getenv("STATUS_FLUSH_RETRY_MAX_SECONDS", "30"))
+
+
+class StatusBuffer:
+    """
+    Write-behind buffer of job status updates.
+
+    Only the latest status of every job is kept, so several transitions of
+    the same job between two flushes cost a single row update. Pending
+    statuses are written by a background thread with one batched UPDATE.
+
+    The statuses of a failed flush are buffered again, unless a newer
+    status of the same job was written meanwhile, and retried with an
+    exponential backoff. A durable write still flushes right away.
+
+    Attributes:
+        flush_interval (float): Maximum seconds a status stays buffered.
+        batch_size (int): Number of pending jobs that triggers a flush.
+        retry_max_delay (float): Maximum seconds between two retries.
+    """
+
+    def __init__(self, flush_interval, batch_size, retry_max_delay=STATUS_FLUSH_RETRY_MAX_SECONDS):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.retry_max_delay = retry_max_delay
+        self._pending = {}
+        self._condition = Condition()
+        # Generations let durable writers wait for the flush that covers their write
+        self._generation = 0
+        self._flushed_generation = 0
+        # Generations of the durable writers still waiting, and the errors
+        # of their failed flushes until they read them
+        self._durable_generations = set()
+        self._failed_generations = {}
+        self._flush_requested = False
+        self._stopping = False
+        self._thread = None
+
+    def write(self, job_id, status, durable=False):
+        """
+        Buffer the status of a job.
+
+        Args:
+            job_id (int): The ID of the job.
+            status (str): The new status of the job.
+            durable (bool): Wait until the status has been committed.
+
+        Raises:
+            Exception: If a durable write could not be committed.
+        """
+        with self._condition:
+            self._ensure_flusher()
+
+            self._pending[job_id] = {
+                "job_id": job_id,
+                "new_status": status,
+                "new_updated_at": datetime.now(),
+            }
+            self._generation += 1
+            generation = self._generation
+
+            if durable or len(self._pending) >= self.batch_size:
+                self._flush_requested = True
+                self._condition.notify_all()
+
+            if not durable:
+                return
+
+            self._durable_generations.add(generation)
+            while self._flushed_generation < generation:
+                self._condition.wait()
+
+            self._durable_generations.discard(generation)
+            error = self._failed_generations.pop(generation, None)
+
+        if error is not None:
+            raise error
+
+    def _ensure_flusher(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = Thread(target=self._run, name="job-status-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        failures = 0
+        while True:
+            with self._condition:
+                if failures:
+                    # Back off from the database, only a waiting durable writer gets a flush sooner
+                    delay = min(self.flush_interval * 2 ** (failures - 1), self.retry_max_delay)
+                    self._condition.wait_for(
+                        lambda: self._stopping or any(
+                            waiting > self._flushed_generation
+                            for waiting in self._durable_generations
+                        ),
+                        delay,
+                    )
+                elif not (self._flush_requested or self._stopping):
+                    self._condition.wait(self.flush_interval)
+
+                rows = list(self._pending.values())
+                generation = self._generation
+                self._pending = {}
+                self._flush_requested = False
+                stopping = self._stopping
+
+            error = None
+            if rows:
+                try:
+                    self._flush(rows)
+                except Exception as e:
+                    logger.exception("Failed to write the status of %s jobs: %s", len(rows), str(e))
+                    error = e
+
+            with self._condition:
+                if error is None:
+                    failures = 0
+                else:
+                    failures += 1
+                    if stopping:
+                        logger.error("Dropping the status of %s jobs on shutdown", len(rows))
+                    else:
+                        # Newer statuses written during the flush win over the failed ones
+                        for row in rows:
+                            self._pending.setdefault(row["job_id"], row)
+
+                # Failures are only kept for the durable writers waiting on
+                # this flush, each of them removes its own once it read it
+                if error is not None:
+                    for waiting in self._durable_generations:
+                        if self._flushed_generation < waiting <= generation:
+                            self._failed_generations[waiting] = error
+                self._flushed_generation = generation
+                self._condition.notify_all()
+
+            if stopping:
+                return
+
+    def _flush(self, rows):
+        """
+        Write pending statuses with one executemany UPDATE.
+
+        Jobs deleted in the meantime are skipped.
+
+        Args:
+            rows (list): The pending statuses.
+        """
+        jobs = Job.__table__
+        statement = (
+            update(jobs)
+            .where(jobs.c.id == bindparam("job_id"))
+            .values(status=bindparam("new_status"), updated_at=bindparam("new_updated_at"))
+        )
+
+        with get_database_connection() as db:
+            db.connection().execute(statement, rows)
+            table_versions.bump(db, table_versions.JOBS)
+
+    def shutdown(self):
+        """
+        Flush the pending statuses and stop the flusher.
+        """
+        with self._condition:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+            self._condition.notify_all()
+
+        thread.join()
+        self._thread = None
+
+
+_buffer = StatusBuffer(STATUS_FLUSH_INTERVAL_SECONDS, STATUS_FLUSH_BATCH_SIZE)
+
+
+def disable_write_behind():
+    """
+    Write statuses right away in this process.
+
+    Used by process pool workers, whose buffered statuses would be lost
+    when the worker exits.
+    """
+    global STATUS_WRITE_BEHIND
+
+    STATUS_WRITE_BEHIND = False
+
+
+def write_status(job_id, status, durable=False):
+    """
+    Write the status of a job.
+
+    With STATUS_WRITE_BEHIND disabled the status is written right away
+    with a single UPDATE. Otherwise it is buffered, unless durable is set,
+    in which case the call returns once the status has been committed.
+    The version of the jobs table is bumped shortly after, see
+    table_versions.bump_later.
+
+    Args:
+        job_id (int): The ID of the job.
+        status (str): The new status of the job.
+        durable (bool): Wait until the status has been committed.
+    """
+    if STATUS_WRITE_BEHIND:
+        _buffer.write(job_id, status, durable=durable)
+        return
+
+    with get_database_connection() as db:
+        db.query(Job).filter(Job.id == job_id).update(
+            {Job.status: status, Job.updated_at: datetime.now()},
+            synchronize_session=False,
+        )
+    table_versions.bump_later(table_versions.JOBS)
+
+
+def shutdown():
+    """
+    Flush the buffered statuses.
+    """
+    _buffer.shutdown()
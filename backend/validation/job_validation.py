@@ -2,6 +2,7 @@ from fastapi import HTTPException
 from datetime import datetime, timezone
 
 from backend.models.job import Job
+from backend.helper import reference_cache
 
 
 # Check if a job with the same name already exists
@@ -17,8 +18,15 @@ def validate_job_name(db, name):
 
 # Check if a job execution time is less than the current time
 def validate_execution_time(execution_time):
+    # Without a timezone the execution time can't be compared, nor scheduled unambiguously
+    if execution_time is not None and execution_time.utcoffset() is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Please give the execution time with its timezone",
+        )
+
     current_time = datetime.now(timezone.utc)
-    if execution_time <= current_time:
+    if execution_time is None or execution_time <= current_time:
         raise HTTPException(
             status_code=500,
             detail="Please select an execution time greater than the current time",
@@ -48,3 +56,70 @@ def validate_existing_job_name(db, job):
         raise HTTPException(
             status_code=500, detail="A job with the same name already exists"
         )
+
+
+def validate_bulk_jobs(db, jobs):
+    """
+    Validate a batch of jobs with a few set-based queries.
+
+    Execution types are resolved from the reference cache.
+
+    Runs the same checks as a single job creation, plus duplicate detection
+    inside the batch itself.
+
+    Args:
+        db: The database connection.
+        jobs (List[JobCreate]): The jobs to validate.
+
+    Returns:
+        dict: Mapping of the index of every invalid job to its error detail.
+    """
+    names = {job.name for job in jobs}
+    event_mapping_ids = {
+        job.event_mapping_id for job in jobs if job.event_mapping_id is not None
+    }
+
+    existing_names = {
+        name for (name,) in db.query(Job.name).filter(Job.name.in_(names))
+    }
+    used_event_mapping_ids = {
+        event_mapping_id
+        for (event_mapping_id,) in db.query(Job.event_mapping_id).filter(
+            Job.event_mapping_id.in_(event_mapping_ids)
+        )
+    }
+
+    errors = {}
+    for index, job in enumerate(jobs):
+        try:
+            if job.name in existing_names:
+                raise HTTPException(
+                    status_code=500, detail="A job with the same name already exists"
+                )
+
+            if job.event_mapping_id is None:
+                validate_execution_time(job.execution_time)
+            elif job.event_mapping_id in used_event_mapping_ids:
+                raise HTTPException(
+                    status_code=500, detail="A job with the same event already exists"
+                )
+
+            execution_type = reference_cache.execution_types.get(
+                db, job.execution_type_id
+            )
+            if execution_type is None:
+                raise HTTPException(status_code=404, detail="Execution Type not found")
+
+            validate_event_mapping_required(
+                execution_type["name"], job.event_mapping_id
+            )
+        except HTTPException as e:
+            errors[index] = e.detail
+            continue
+
+        # Later jobs of the batch may not reuse what this one claims
+        existing_names.add(job.name)
+        if job.event_mapping_id is not None:
+            used_event_mapping_ids.add(job.event_mapping_id)
+
+    return errors
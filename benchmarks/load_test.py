@@ -0,0 +1,707 @@
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKLOADS = ("create", "list", "schedule", "event", "execute")
+
+EVENT_NAME = "TRAIN_TICKET_CONFIRMATION"
+JOB_TYPE_NAME = "COUNT_TILL_10"
+
+# Largest page served by GET /jobs/, see constants.JOBS_PAGE_MAX_LIMIT
+PAGE_LIMIT = 1000
+BULK_SIZE = 1000
+
+# Most frequent errors reported per workload, and from the server log
+ERROR_SAMPLES = 5
+
+Response = namedtuple("Response", "status body headers latency")
+
+
+class Client:
+    """
+    Minimal JSON client keeping one keep-alive connection per thread.
+
+    Attributes:
+        host (str): The host of the API.
+        port (int): The port of the API.
+    """
+
+    def __init__(self, base_url):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or 80
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(
+                self.host, self.port, timeout=60
+            )
+        return connection
+
+    def request(self, method, path, body=None):
+        """
+        Send a request and decode its JSON response.
+
+        Args:
+            method (str): The HTTP method.
+            path (str): The path, including the query string.
+            body (dict, optional): The JSON body.
+
+        Returns:
+            Response: The status code (0 on connection errors), the decoded
+            body (None if empty), the headers and the latency in seconds.
+        """
+        payload = json.dumps(body) if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+
+        # A kept-alive connection may have been closed by the server while idle
+        for reused in (True, False):
+            reused = reused and getattr(self._local, "connection", None) is not None
+            started = time.perf_counter()
+            try:
+                connection = self._connection()
+                connection.request(method, path, body=payload, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (OSError, http.client.HTTPException):
+                # Drop the broken connection, the next request opens a new one
+                self._local.connection = None
+                if not reused:
+                    return Response(0, None, {}, time.perf_counter() - started)
+        latency = time.perf_counter() - started
+
+        return Response(
+            response.status, json.loads(data) if data else None, response.headers, latency
+        )
+
+
+def percentile(values, fraction):
+    """
+    Get a percentile with the nearest-rank method.
+
+    Args:
+        values (list): The sorted values.
+        fraction (float): The percentile, between 0 and 1.
+
+    Returns:
+        float: The percentile, None if there are no values.
+    """
+    if not values:
+        return None
+    rank = math.ceil(fraction * len(values))
+    return values[min(len(values), max(rank, 1)) - 1]
+
+
+def describe_error(response):
+    """
+    Describe a failed request.
+
+    Args:
+        response (Response): The response of the request.
+
+    Returns:
+        str: The status code and body of the response, shortened.
+    """
+    if response.status == 0:
+        return "Connection error"
+    return f"HTTP {response.status}: {json.dumps(response.body)}"[:200]
+
+
+def sample_errors(errors):
+    """
+    Count the errors and keep the most frequent ones.
+
+    Args:
+        errors (list): The error messages.
+
+    Returns:
+        list: Up to ERROR_SAMPLES dicts with an error message and its count.
+    """
+    return [
+        {"error": error, "count": count} for error, count in Counter(errors).most_common(ERROR_SAMPLES)
+    ]
+
+
+def summarize(latencies, errors, duration, peak_rss_mb=None):
+    """
+    Build the result of a workload.
+
+    Args:
+        latencies (list): Latencies of the successful operations, in seconds.
+        errors (list): The error messages of the failed operations.
+        duration (float): Wall time of the workload, in seconds.
+        peak_rss_mb (float, optional): Peak RSS of the server so far.
+
+    Returns:
+        dict: Throughput, latency percentiles in milliseconds, error count
+        and the most frequent errors.
+    """
+    latencies = sorted(latencies)
+
+    def to_ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "operations": len(latencies),
+        "errors": len(errors),
+        "error_samples": sample_errors(errors),
+        "duration_seconds": round(duration, 3),
+        "throughput_per_second": round(len(latencies) / duration, 2) if duration else None,
+        "latency_ms": {
+            "mean": to_ms(sum(latencies) / len(latencies)) if latencies else None,
+            "p50": to_ms(percentile(latencies, 0.50)),
+            "p90": to_ms(percentile(latencies, 0.90)),
+            "p99": to_ms(percentile(latencies, 0.99)),
+            "max": to_ms(latencies[-1] if latencies else None),
+        },
+        "server_peak_rss_mb": peak_rss_mb,
+    }
+
+
+def run_concurrently(concurrency, operations, expected_status=200):
+    """
+    Run operations on a thread pool.
+
+    Args:
+        concurrency (int): Number of operations in flight.
+        operations (list): Callables returning a Response.
+        expected_status (int): The status code of a successful operation.
+
+    Returns:
+        tuple: The latencies of the successful operations, the errors of the
+        failed ones and the wall time.
+    """
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda operation: operation(), operations))
+    duration = time.perf_counter() - started
+
+    latencies = [response.latency for response in results if response.status == expected_status]
+    errors = [describe_error(response) for response in results if response.status != expected_status]
+    return latencies, errors, duration
+
+
+def get_or_create(client, path, name, body):
+    """
+    Get a reference row by name, creating it if missing.
+
+    Args:
+        client (Client): The API client.
+        path (str): The collection path, e.g. "/job_types/".
+        name (str): The name of the row.
+        body (dict): The row to create.
+
+    Returns:
+        int: The ID of the row.
+    """
+    for row in client.request("GET", path).body or []:
+        if row["name"] == name:
+            return row["id"]
+
+    response = client.request("POST", path, {"name": name, **body})
+    if response.status != 200:
+        raise RuntimeError(f"Failed to create {name} through {path}: {response.status} {response.body}")
+    return response.body["id"]
+
+
+def seed_reference_data(client):
+    """
+    Create the execution types, event mapping and job type used by the workloads.
+
+    Args:
+        client (Client): The API client.
+
+    Returns:
+        dict: The IDs of the reference rows.
+    """
+    return {
+        "time_specific": get_or_create(
+            client, "/execution_types/", "TIME_SPECIFIC", {"description": "benchmark"}
+        ),
+        "event_based": get_or_create(
+            client, "/execution_types/", "EVENT_BASED", {"description": "benchmark"}
+        ),
+        "event_mapping": get_or_create(
+            client, "/event_mappings/", EVENT_NAME, {"description": "benchmark"}
+        ),
+        "job_type": get_or_create(
+            client, "/job_types/", JOB_TYPE_NAME, {"job_type": "CODE", "script": ""}
+        ),
+    }
+
+
+def time_specific_job(name, reference, execution_time):
+    """
+    Build a one-shot job running the benchmark job type.
+
+    Args:
+        name (str): The name of the job.
+        reference (dict): The IDs returned by seed_reference_data.
+        execution_time (datetime): When the job runs.
+
+    Returns:
+        dict: The job to create.
+    """
+    return {
+        "name": name,
+        "execution_type_id": reference["time_specific"],
+        "execution_time": execution_time.isoformat(),
+        "priority": 1,
+        "job_type_id": reference["job_type"],
+    }
+
+
+def bench_create(client, args, state):
+    """
+    Create jobs one request at a time, scheduled far enough not to fire.
+    """
+    execution_time = datetime.now(timezone.utc) + timedelta(days=1)
+    created = state["created_job_ids"]
+
+    def create(index):
+        def operation():
+            response = client.request(
+                "POST",
+                "/jobs/",
+                time_specific_job(f"{state['run_id']}-create-{index}", state["reference"], execution_time),
+            )
+            if response.status == 200:
+                created.append(response.body["id"])
+            return response
+
+        return operation
+
+    return run_concurrently(args.concurrency, [create(index) for index in range(args.requests)])
+
+
+def bench_list(client, args, state):
+    """
+    Fetch the first page of the job list.
+    """
+
+    def operation():
+        return client.request("GET", f"/jobs/?limit={args.page_size}")
+
+    return run_concurrently(args.concurrency, [operation] * args.requests)
+
+
+def bench_schedule(client, args, state):
+    """
+    Schedule the jobs created by the create workload.
+    """
+    if not state["created_job_ids"]:
+        bench_create(client, args, state)
+    job_ids = state["created_job_ids"]
+
+    def schedule(job_id):
+        def operation():
+            return client.request("POST", f"/jobs/schedule-job/{job_id}")
+
+        return operation
+
+    return run_concurrently(args.concurrency, [schedule(job_id) for job_id in job_ids[: args.requests]])
+
+
+def bench_event(client, args, state):
+    """
+    Send event notifications, each of them runs the event job in the background.
+    """
+    if not state.get("event_job_id"):
+        response = client.request(
+            "POST",
+            "/jobs/",
+            {
+                "name": f"{state['run_id']}-event",
+                "execution_type_id": state["reference"]["event_based"],
+                "priority": 1,
+                "event_mapping_id": state["reference"]["event_mapping"],
+            },
+        )
+        if response.status != 200:
+            raise RuntimeError(f"Failed to create the event job: {response.status} {response.body}")
+        state["event_job_id"] = response.body["id"]
+
+    def operation():
+        return client.request("POST", f"/jobs/event-notification/{EVENT_NAME}")
+
+    return run_concurrently(args.concurrency, [operation] * args.requests, expected_status=202)
+
+
+def fetch_finished_jobs(client, job_ids):
+    """
+    Get the finished jobs among the given ones.
+
+    Args:
+        client (Client): The API client.
+        job_ids (set): The IDs of the jobs to look for.
+
+    Returns:
+        dict: Mapping of the ID of every finished job to the job.
+    """
+    finished = {}
+    for status in ("Completed", "Failed"):
+        cursor = None
+        while True:
+            path = f"/jobs/?status={status}&limit={PAGE_LIMIT}"
+            if cursor:
+                path += f"&cursor={cursor}"
+
+            response = client.request("GET", path)
+            cursor = response.headers.get("X-Next-Cursor")
+
+            finished.update((job["id"], job) for job in response.body or [] if job["id"] in job_ids)
+            if not cursor:
+                break
+    return finished
+
+
+def bench_execute(client, args, state):
+    """
+    Schedule jobs to fire at the same instant and wait for all of them to finish.
+
+    Latency is the delay between the planned execution time of a job and
+    its final status write, throughput counts finished jobs per second
+    from the planned execution time.
+    """
+    execution_time = datetime.now(timezone.utc) + timedelta(seconds=args.execute_lead_seconds)
+    jobs = [
+        time_specific_job(f"{state['run_id']}-execute-{index}", state["reference"], execution_time)
+        for index in range(args.requests)
+    ]
+
+    job_ids = set()
+    for start in range(0, len(jobs), BULK_SIZE):
+        response = client.request(
+            "POST", "/jobs/bulk", {"jobs": jobs[start : start + BULK_SIZE], "schedule": True}
+        )
+        if response.status != 200:
+            raise RuntimeError(f"Failed to create the jobs to execute: {response.status} {response.body}")
+        job_ids.update(job["id"] for job in response.body["created"])
+
+    if datetime.now(timezone.utc) >= execution_time:
+        raise RuntimeError("Jobs were created after their execution time, raise --execute-lead-seconds")
+
+    deadline = time.monotonic() + args.execute_lead_seconds + args.execute_timeout
+    finished = {}
+    while len(finished) < len(job_ids) and time.monotonic() < deadline:
+        time.sleep(args.poll_interval)
+        finished = fetch_finished_jobs(client, job_ids)
+
+    latencies = []
+    errors = []
+    last_finished_at = execution_time
+    for job in finished.values():
+        # updated_at is written in the server's local time, the server runs on this host
+        finished_at = datetime.fromisoformat(job["updated_at"]).astimezone(timezone.utc)
+        last_finished_at = max(last_finished_at, finished_at)
+        if job["status"] == "Completed":
+            latencies.append(max(0.0, (finished_at - execution_time).total_seconds()))
+        else:
+            errors.append(f"Job {job['status']}, see the server log")
+    errors.extend(["Job not finished before --execute-timeout"] * (len(job_ids) - len(finished)))
+
+    duration = (last_finished_at - execution_time).total_seconds()
+    return latencies, errors, duration
+
+
+BENCHMARKS = {
+    "create": bench_create,
+    "list": bench_list,
+    "schedule": bench_schedule,
+    "event": bench_event,
+    "execute": bench_execute,
+}
+
+
+def read_peak_rss_mb(pid):
+    """
+    Get the peak resident set size of a process, on Linux.
+
+    Args:
+        pid (int): The ID of the process.
+
+    Returns:
+        float: The peak RSS in MiB, None if it can't be read.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def wait_until_ready(client, timeout, server=None):
+    """
+    Wait for the API to answer its health check.
+
+    Args:
+        client (Client): The API client.
+        timeout (float): Seconds to wait.
+        server (Popen, optional): The started server process.
+
+    Raises:
+        RuntimeError: If the API isn't up in time.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"The server exited with code {server.returncode}, see --server-log")
+        if client.request("GET", "/health").status == 200:
+            return
+        time.sleep(0.2)
+    raise RuntimeError(f"The server didn't start within {timeout} seconds")
+
+
+def start_server(args, database_url, log_file):
+    """
+    Start the API with uvicorn in a child process.
+
+    Args:
+        args (Namespace): The command line arguments.
+        database_url (str): The database the server uses.
+        log_file: Where the server output goes.
+
+    Returns:
+        Popen: The server process.
+    """
+    env = {**os.environ, "SQLALCHEMY_DATABASE_URL": database_url}
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning",
+        ],
+        cwd=REPO_ROOT,
+        env=env,
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def stop_server(server, timeout=30):
+    """
+    Stop the server, killing it if it doesn't exit in time.
+
+    Args:
+        server (Popen): The started server process.
+        timeout (float): Seconds to wait for a graceful shutdown.
+    """
+    server.terminate()
+    try:
+        server.wait(timeout)
+    except subprocess.TimeoutExpired:
+        print(f"The server didn't stop within {timeout} seconds, killing it", file=sys.stderr)
+        server.kill()
+        server.wait()
+
+
+def read_server_errors(log_file):
+    """
+    Get the most frequent errors logged by the server so far.
+
+    Args:
+        log_file: The file the server output goes to, opened for reading too.
+
+    Returns:
+        list: Up to ERROR_SAMPLES dicts with an error message and its count.
+    """
+    log_file.flush()
+    log_file.seek(0)
+    # Lines look like "<date> <time> - ERROR - <message>", the date is dropped
+    errors = [line.split(" - ", 2)[-1].strip() for line in log_file if " - ERROR - " in line]
+    log_file.seek(0, os.SEEK_END)
+    return sample_errors(errors)
+
+
+def write_report(path, report):
+    """
+    Write the report as JSON with sorted keys.
+
+    Args:
+        path (str): Where the report is written.
+        report (dict): The report.
+    """
+    with open(path, "w") as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+        output.write("\n")
+
+
+def get_commit():
+    """
+    Get the commit being benchmarked.
+
+    Returns:
+        str: The short hash of HEAD, None outside of a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    """
+    Parse the command line.
+
+    Args:
+        argv (list, optional): The arguments, defaults to sys.argv.
+
+    Returns:
+        Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Load test the job executor API and its execution pipeline."
+    )
+    parser.add_argument(
+        "--database-url",
+        help="Database of the started server, defaults to a fresh SQLite file.",
+    )
+    parser.add_argument(
+        "--url",
+        help="Benchmark an already running server instead of starting one. "
+        "Its peak RSS isn't reported.",
+    )
+    parser.add_argument("--port", type=int, default=8765, help="Port of the started server.")
+    parser.add_argument(
+        "--workloads",
+        default=",".join(WORKLOADS),
+        help=f"Comma separated workloads to run, in order. Default: {','.join(WORKLOADS)}.",
+    )
+    parser.add_argument("--concurrency", type=int, default=10, help="Requests in flight.")
+    parser.add_argument("--requests", type=int, default=500, help="Operations per workload.")
+    parser.add_argument("--page-size", type=int, default=100, help="Page size of the list workload.")
+    parser.add_argument(
+        "--execute-lead-seconds",
+        type=float,
+        default=5,
+        help="Delay between creating the jobs of the execute workload and their execution time.",
+    )
+    parser.add_argument(
+        "--execute-timeout",
+        type=float,
+        default=120,
+        help="Seconds to wait for the executed jobs to finish.",
+    )
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument(
+        "--output", default="load_test_results.json", help="Where the JSON results are written."
+    )
+    parser.add_argument(
+        "--server-log", help="Where the server output goes, a temporary file by default."
+    )
+    args = parser.parse_args(argv)
+
+    args.workloads = [name.strip() for name in args.workloads.split(",") if name.strip()]
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"Unknown workloads: {', '.join(sorted(unknown))}")
+
+    return args
+
+
+def main(argv=None):
+    """
+    Run the selected workloads and write their results.
+
+    The results are written before the server is stopped, also when a
+    workload raised, so a server that hangs on shutdown loses nothing.
+
+    Args:
+        argv (list, optional): The arguments, defaults to sys.argv.
+
+    Returns:
+        int: The exit code, 1 if any operation failed.
+    """
+    args = parse_args(argv)
+
+    server = None
+    tmp_dir = None
+    database_url = args.database_url
+    base_url = args.url or f"http://127.0.0.1:{args.port}"
+    client = Client(base_url)
+    results = {}
+
+    log_file = open(args.server_log, "w+") if args.server_log else tempfile.TemporaryFile("w+")
+    try:
+        if not args.url:
+            if database_url is None:
+                tmp_dir = tempfile.TemporaryDirectory(prefix="job-executors-load-")
+                database_url = f"sqlite:///{os.path.join(tmp_dir.name, 'load_test.db')}"
+            server = start_server(args, database_url, log_file)
+        wait_until_ready(client, 60, server)
+
+        state = {
+            "run_id": f"load-{uuid.uuid4().hex[:8]}",
+            "reference": seed_reference_data(client),
+            "created_job_ids": [],
+        }
+
+        for name in args.workloads:
+            print(f"Running {name} workload...", file=sys.stderr)
+            latencies, errors, duration = BENCHMARKS[name](client, args, state)
+            results[name] = summarize(
+                latencies, errors, duration, read_peak_rss_mb(server.pid) if server else None
+            )
+            print(json.dumps({name: results[name]}), file=sys.stderr)
+    finally:
+        server_errors = read_server_errors(log_file) if server else []
+        write_report(
+            args.output,
+            {
+                "commit": get_commit(),
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "database": urlsplit(database_url).scheme if database_url else None,
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+                "server_peak_rss_mb": read_peak_rss_mb(server.pid) if server else None,
+                "server_errors": server_errors,
+                "workloads": results,
+            },
+        )
+        print(f"Results written to {args.output}", file=sys.stderr)
+
+        if server is not None:
+            stop_server(server)
+        log_file.close()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+    failed = {name: result for name, result in results.items() if result["errors"]}
+    for name, result in failed.items():
+        print(f"The {name} workload had {result['errors']} errors:", file=sys.stderr)
+        for sample in result["error_samples"]:
+            print(f"  {sample['count']} x {sample['error']}", file=sys.stderr)
+    if failed and server_errors:
+        print("Most frequent server errors:", file=sys.stderr)
+        for sample in server_errors:
+            print(f"  {sample['count']} x {sample['error']}", file=sys.stderr)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
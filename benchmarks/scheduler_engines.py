@@ -0,0 +1,172 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEDULER_SCALE = os.path.join(REPO_ROOT, "benchmarks", "scheduler_scale.py")
+
+ENGINES = ("apscheduler", "heap")
+
+
+def run_engine(engine, args, output):
+    """
+    Run scheduler_scale.py for one engine in its own process.
+
+    The jobs are inserted into a fresh database and rehydrated on startup,
+    then measured at that level, so both engines hold the same jobs.
+
+    Args:
+        engine (str): The SCHEDULER_ENGINE to benchmark.
+        args (argparse.Namespace): The parsed command line.
+        output (str): Where scheduler_scale.py writes its results.
+
+    Returns:
+        dict: The results of scheduler_scale.py.
+
+    Raises:
+        RuntimeError: If the benchmark failed.
+    """
+    command = [
+        sys.executable,
+        SCHEDULER_SCALE,
+        "--engine", engine,
+        "--jobstore", "memory",
+        "--rehydrate", str(args.jobs),
+        "--levels", str(args.jobs),
+        "--recurring-fraction", str(args.recurring_fraction),
+        "--samples", str(args.samples),
+        "--jitter-jobs", str(args.jitter_jobs),
+        "--output", output,
+    ]
+    log_path = f"{os.path.splitext(output)[0]}.log"
+    with open(log_path, "w") as log:
+        returncode = subprocess.run(command, cwd=REPO_ROOT, stdout=log, stderr=log).returncode
+    if returncode != 0:
+        with open(log_path) as log:
+            raise RuntimeError(f"The {engine} benchmark failed:\n{log.read()[-2000:]}")
+
+    with open(output) as results:
+        return json.load(results)
+
+
+def summarize(results):
+    """
+    Keep the figures compared between the engines.
+
+    Args:
+        results (dict): The results of scheduler_scale.py.
+
+    Returns:
+        dict: Startup, memory, operation latency and fire lateness figures.
+    """
+    level = results["levels"][-1]
+    return {
+        "pending_jobs": level["pending_jobs"],
+        "rehydration_seconds": results["rehydration"]["seconds"],
+        "rss_mb": level["rss_mb"],
+        "memory_per_job_bytes": round(
+            (results["rehydration"]["rss_mb"] - results["baseline_rss_mb"]) * 1024 * 1024
+            / results["rehydration"]["jobs"]
+        ),
+        "add_latency_ms": level["add_latency_ms"],
+        "modify_latency_ms": level["modify_latency_ms"],
+        "remove_latency_ms": level["remove_latency_ms"],
+        "fire_lateness_ms": level["fire_lateness_ms"],
+    }
+
+
+def format_table(summaries):
+    """
+    Format the summaries as a Markdown table, one row per engine.
+
+    Args:
+        summaries (dict): The summary of every engine.
+
+    Returns:
+        str: The table.
+    """
+    lines = [
+        "| Engine | Rehydration | Memory per job | Update p50 / p99 | Fire lateness p50 / p99 / max |",
+        "| --- | --- | --- | --- | --- |",
+    ]
+    for engine, summary in summaries.items():
+        modify = summary["modify_latency_ms"]
+        lateness = summary["fire_lateness_ms"]
+        lines.append(
+            f"| {engine} | {summary['rehydration_seconds']} s "
+            f"| {summary['memory_per_job_bytes']} B "
+            f"| {modify['p50']} / {modify['p99']} ms "
+            f"| {lateness['p50']} / {lateness['p99']} / {lateness['max']} ms |"
+        )
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    """
+    Parse the command line.
+
+    Args:
+        argv (list, optional): The arguments, defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Compare the memory and fire time precision of the scheduler engines."
+    )
+    parser.add_argument("--jobs", type=int, default=1000000, help="Pending jobs held by each engine.")
+    parser.add_argument(
+        "--engines", nargs="+", choices=ENGINES, default=list(ENGINES), help="Engines to compare."
+    )
+    parser.add_argument(
+        "--recurring-fraction",
+        type=float,
+        default=0.0,
+        help="Share of the pending jobs scheduled with an IntervalTrigger, one-shot jobs only by default.",
+    )
+    parser.add_argument("--samples", type=int, default=200, help="Timed add, modify and remove calls.")
+    parser.add_argument("--jitter-jobs", type=int, default=500, help="Probe jobs fired to measure the lateness.")
+    parser.add_argument(
+        "--output", default="scheduler_engines_results.json", help="Where the JSON results are written."
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Benchmark every engine at the same number of pending jobs and compare them.
+
+    Args:
+        argv (list, optional): The arguments, defaults to sys.argv.
+    """
+    args = parse_args(argv)
+
+    summaries = {}
+    with tempfile.TemporaryDirectory(prefix="job-executors-engines-") as tmp_dir:
+        for engine in args.engines:
+            print(f"Benchmarking the {engine} engine with {args.jobs} pending jobs...", file=sys.stderr)
+            results = run_engine(engine, args, os.path.join(tmp_dir, f"{engine}.json"))
+            summaries[engine] = summarize(results)
+            commit = results["commit"]
+
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "jobs": args.jobs,
+        "recurring_fraction": args.recurring_fraction,
+        "engines": summaries,
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+        output.write("\n")
+
+    print(format_table(summaries))
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
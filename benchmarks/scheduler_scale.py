@@ -0,0 +1,484 @@
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INSERT_BATCH_SIZE = 10000
+
+
+def percentile(values, fraction):
+    """
+    Get a percentile with the nearest-rank method.
+
+    Args:
+        values (list): The sorted values.
+        fraction (float): The percentile, between 0 and 1.
+
+    Returns:
+        float: The percentile, None if there are no values.
+    """
+    if not values:
+        return None
+    rank = math.ceil(fraction * len(values))
+    return values[min(len(values), max(rank, 1)) - 1]
+
+
+def summarize_latencies(latencies):
+    """
+    Summarize latencies in milliseconds.
+
+    Args:
+        latencies (list): The latencies, in seconds.
+
+    Returns:
+        dict: Count, mean and percentiles in milliseconds.
+    """
+    latencies = sorted(latencies)
+
+    def to_ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        "count": len(latencies),
+        "mean": to_ms(sum(latencies) / len(latencies)) if latencies else None,
+        "p50": to_ms(percentile(latencies, 0.50)),
+        "p90": to_ms(percentile(latencies, 0.90)),
+        "p99": to_ms(percentile(latencies, 0.99)),
+        "max": to_ms(latencies[-1] if latencies else None),
+    }
+
+
+def read_rss_mb():
+    """
+    Get the resident set size of this process.
+
+    Returns:
+        float: The current RSS in MiB on Linux, the peak RSS elsewhere.
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+
+    return read_peak_rss_mb()
+
+
+def read_peak_rss_mb():
+    """
+    Get the peak resident set size of this process.
+
+    Returns:
+        float: The peak RSS in MiB.
+    """
+    import resource
+
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class JobFactory:
+    """
+    Inserts benchmark jobs straight into the jobs table.
+
+    Rows are inserted with executemany batches, the benchmark measures the
+    scheduler, not the API.
+
+    Attributes:
+        execution_type_id (int): The TIME_SPECIFIC execution type.
+        job_type_id (int): The job type run by the fired jobs.
+        recurring_fraction (float): Share of jobs scheduled with an IntervalTrigger.
+    """
+
+    def __init__(self, execution_type_id, job_type_id, recurring_fraction):
+        self.execution_type_id = execution_type_id
+        self.job_type_id = job_type_id
+        self.recurring_fraction = recurring_fraction
+
+    def insert(self, count, execution_time, spread_seconds=0.0, recurring=True):
+        """
+        Insert jobs.
+
+        Args:
+            count (int): Number of jobs.
+            execution_time (datetime): Execution time of the first job.
+            spread_seconds (float): Execution times are spread evenly over this window.
+            recurring (bool): Whether a share of the jobs is recurring.
+
+        Returns:
+            range: The IDs of the inserted jobs.
+        """
+        from sqlalchemy import func, insert, select
+
+        from backend.config.db import engine
+        from backend.models.job import Job
+
+        # Every IntervalTrigger job is recurring once every 1 / fraction jobs
+        every = round(1 / self.recurring_fraction) if recurring and self.recurring_fraction else 0
+
+        with engine.begin() as connection:
+            first_id = (connection.scalar(select(func.max(Job.id))) or 0) + 1
+
+            for start in range(0, count, INSERT_BATCH_SIZE):
+                rows = []
+                for index in range(start, min(count, start + INSERT_BATCH_SIZE)):
+                    rows.append(
+                        {
+                            "name": f"scheduler-bench-{first_id + index}",
+                            "execution_type_id": self.execution_type_id,
+                            "job_type_id": self.job_type_id,
+                            "execution_time": execution_time
+                            + timedelta(seconds=spread_seconds * index / max(count, 1)),
+                            "recurring": bool(every) and index % every == 0,
+                            "priority": 1,
+                            "status": "Scheduled",
+                        }
+                    )
+                connection.execute(insert(Job), rows)
+
+        return range(first_id, first_id + count)
+
+
+def load_jobs(db, job_ids):
+    """
+    Load a contiguous range of jobs.
+
+    Args:
+        db: The database connection.
+        job_ids (range): The IDs of the jobs.
+
+    Returns:
+        list: The jobs, ordered by ID.
+    """
+    from backend.models.job import Job
+
+    return db.query(Job).filter(Job.id.between(job_ids[0], job_ids[-1])).order_by(Job.id).all()
+
+
+def fill(job_ids, batch_size):
+    """
+    Schedule jobs in batches through job_helper.create_job_schedules.
+
+    Args:
+        job_ids (range): The jobs to schedule.
+        batch_size (int): Jobs scheduled per batch.
+
+    Returns:
+        float: The wall time in seconds.
+    """
+    from backend.config.db import get_database_connection
+    from backend.helper import job_helper
+
+    started = time.perf_counter()
+    for start in range(0, len(job_ids), batch_size):
+        with get_database_connection() as db:
+            jobs = load_jobs(db, job_ids[start : start + batch_size])
+            errors = job_helper.create_job_schedules(jobs, db)
+            if errors:
+                raise RuntimeError(f"{len(errors)} jobs couldn't be scheduled: {next(iter(errors.values()))}")
+    return time.perf_counter() - started
+
+
+def time_operation(job_ids, operation):
+    """
+    Time a job_helper operation on every given job, one job at a time.
+
+    Args:
+        job_ids (range): The jobs to operate on.
+        operation (callable): Called with the job and the session.
+
+    Returns:
+        list: The latency of every call, in seconds.
+    """
+    from backend.config.db import get_database_connection
+    from backend.models.job import Job
+
+    latencies = []
+    for job_id in job_ids:
+        with get_database_connection() as db:
+            job = db.get(Job, job_id)
+            started = time.perf_counter()
+            operation(job, db)
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def measure_jitter(factory, count, lead_seconds, spread_seconds, timeout):
+    """
+    Schedule jobs to fire soon and measure how late the scheduler submits them.
+
+    Args:
+        factory (JobFactory): Creates the probe jobs.
+        count (int): Number of probe jobs.
+        lead_seconds (float): Delay before the first probe job fires.
+        spread_seconds (float): Window over which the probe jobs fire.
+        timeout (float): Seconds to wait for the last probe job.
+
+    Returns:
+        dict: Lateness percentiles in milliseconds and the number of probe
+        jobs that didn't fire in time.
+    """
+    from apscheduler.events import EVENT_JOB_SUBMITTED
+
+    from backend.helper import job_helper
+
+    # Naive local times, as the scheduler reads the execution times of the jobs table
+    execution_time = datetime.now() + timedelta(seconds=lead_seconds)
+    job_ids = factory.insert(count, execution_time, spread_seconds, recurring=False)
+
+    lateness = []
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def on_submitted(event):
+        if job_helper.get_job_id(event.job_id) not in job_ids:
+            return
+        now = datetime.now(timezone.utc)
+        with lock:
+            lateness.extend((now - run_time).total_seconds() for run_time in event.scheduled_run_times)
+            if len(lateness) >= count:
+                done.set()
+
+    job_helper.scheduler.add_listener(on_submitted, EVENT_JOB_SUBMITTED)
+    try:
+        fill(job_ids, len(job_ids))
+        done.wait(lead_seconds + spread_seconds + timeout)
+    finally:
+        job_helper.scheduler.remove_listener(on_submitted)
+
+    with lock:
+        result = summarize_latencies(lateness)
+    result["missed"] = count - result["count"]
+    return result
+
+
+def get_commit():
+    """
+    Get the commit being benchmarked.
+
+    Returns:
+        str: The short hash of HEAD, None outside of a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    """
+    Parse the command line.
+
+    Args:
+        argv (list, optional): The arguments, defaults to sys.argv.
+
+    Returns:
+        Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Measure the scheduler as it fills up with pending jobs."
+    )
+    parser.add_argument(
+        "--levels",
+        default="10000,50000,100000,200000",
+        help="Comma separated numbers of pending jobs at which to measure.",
+    )
+    parser.add_argument(
+        "--database-url", help="Database used by job_helper, defaults to a fresh SQLite file."
+    )
+    parser.add_argument(
+        "--engine",
+        default=os.getenv("SCHEDULER_ENGINE", "apscheduler"),
+        help="SCHEDULER_ENGINE to benchmark, apscheduler or heap.",
+    )
+    parser.add_argument(
+        "--jobstore",
+        default=os.getenv("SCHEDULER_JOBSTORE", "memory"),
+        help="SCHEDULER_JOBSTORE to benchmark, memory or sqlalchemy.",
+    )
+    parser.add_argument(
+        "--rehydrate",
+        type=int,
+        default=0,
+        help="Jobs inserted before the scheduler starts, then rehydrated from the jobs table.",
+    )
+    parser.add_argument("--fill-batch-size", type=int, default=5000, help="Jobs scheduled per batch.")
+    parser.add_argument(
+        "--recurring-fraction",
+        type=float,
+        default=0.1,
+        help="Share of the pending jobs scheduled with an IntervalTrigger.",
+    )
+    parser.add_argument("--samples", type=int, default=200, help="Timed add, modify and remove calls per level.")
+    parser.add_argument("--jitter-jobs", type=int, default=200, help="Probe jobs fired per level.")
+    parser.add_argument("--jitter-lead-seconds", type=float, default=2)
+    parser.add_argument("--jitter-spread-seconds", type=float, default=2)
+    parser.add_argument("--jitter-timeout", type=float, default=30)
+    parser.add_argument(
+        "--output", default="scheduler_scale_results.json", help="Where the JSON results are written."
+    )
+    args = parser.parse_args(argv)
+
+    args.levels = sorted(int(level) for level in args.levels.split(",") if level.strip())
+    return args
+
+
+def main(argv=None):
+    """
+    Fill the scheduler level by level and measure it at every level.
+
+    Args:
+        argv (list, optional): The arguments, defaults to sys.argv.
+    """
+    args = parse_args(argv)
+
+    tmp_dir = None
+    if args.database_url is None:
+        tmp_dir = tempfile.TemporaryDirectory(prefix="job-executors-scheduler-")
+        args.database_url = f"sqlite:///{os.path.join(tmp_dir.name, 'scheduler_scale.db')}"
+
+    # Read by the application modules at import time
+    os.environ["SQLALCHEMY_DATABASE_URL"] = args.database_url
+    os.environ["SCHEDULER_ENGINE"] = args.engine
+    os.environ["SCHEDULER_JOBSTORE"] = args.jobstore
+    os.environ["SCHEDULER_REHYDRATE"] = str(bool(args.rehydrate))
+    sys.path.insert(0, REPO_ROOT)
+
+    from backend.config.db import get_database_connection, init_database
+    from backend.helper import job_events, job_helper, table_versions
+    from backend.models.job import ExecutionType, JobType
+    from backend.tasks import execution_engine, job_run_writer, status_buffer
+
+    init_database()
+
+    with get_database_connection() as db:
+        execution_type = ExecutionType(name="TIME_SPECIFIC", description="benchmark")
+        job_type = JobType(name="COUNT_TILL_10", job_type="CODE", script="")
+        db.add_all([execution_type, job_type])
+        db.flush()
+        factory = JobFactory(execution_type.id, job_type.id, args.recurring_fraction)
+
+    # Far enough for the pending jobs never to fire during the benchmark. Recurring
+    # jobs fire daily at the time of day of their execution time, an hour ago
+    # puts their next run almost a day away.
+    pending_time = datetime.now() + timedelta(days=30, hours=-1)
+
+    rehydrated_ids = range(0)
+    if args.rehydrate:
+        print(f"Inserting {args.rehydrate} jobs to rehydrate...", file=sys.stderr)
+        rehydrated_ids = factory.insert(args.rehydrate, pending_time)
+
+    gc.collect()
+    baseline_rss_mb = read_rss_mb()
+
+    started = time.perf_counter()
+    job_helper.start()
+    start_seconds = time.perf_counter() - started
+
+    rehydration = None
+    if args.rehydrate:
+        gc.collect()
+        rehydration = {
+            "jobs": args.rehydrate,
+            "seconds": round(start_seconds, 2),
+            "jobs_per_second": round(args.rehydrate / start_seconds, 1),
+            "rss_mb": round(read_rss_mb(), 1),
+            "peak_rss_mb": round(read_peak_rss_mb(), 1),
+        }
+        print(json.dumps({"rehydration": rehydration}), file=sys.stderr)
+
+    pending = args.rehydrate
+    results = []
+
+    try:
+        for level in args.levels:
+            if level < pending:
+                continue
+
+            fill_jobs_per_second = None
+            job_ids = rehydrated_ids
+            if level > pending:
+                print(f"Filling the scheduler up to {level} jobs...", file=sys.stderr)
+
+                job_ids = factory.insert(level - pending, pending_time)
+                fill_jobs_per_second = round(len(job_ids) / fill(job_ids, args.fill_batch_size), 1)
+                pending = level
+
+            gc.collect()
+            rss_mb = read_rss_mb()
+
+            # Remove and add the same number of jobs, so the level stays put
+            sample_ids = range(job_ids[0], job_ids[0] + min(args.samples, len(job_ids)))
+            modify = time_operation(sample_ids, job_helper.update_job_schedule)
+            remove = time_operation(sample_ids, job_helper.stop_job_scheduler)
+            add = time_operation(factory.insert(len(sample_ids), pending_time), job_helper.create_job_schedule)
+
+            jitter = measure_jitter(
+                factory,
+                args.jitter_jobs,
+                args.jitter_lead_seconds,
+                args.jitter_spread_seconds,
+                args.jitter_timeout,
+            )
+
+            result = {
+                "pending_jobs": job_helper.get_pending_job_count(),
+                "fill_jobs_per_second": fill_jobs_per_second,
+                "rss_mb": round(rss_mb, 1),
+                "memory_per_job_bytes": round((rss_mb - baseline_rss_mb) * 1024 * 1024 / level),
+                "add_latency_ms": summarize_latencies(add),
+                "modify_latency_ms": summarize_latencies(modify),
+                "remove_latency_ms": summarize_latencies(remove),
+                "fire_lateness_ms": jitter,
+            }
+            results.append(result)
+            print(json.dumps(result), file=sys.stderr)
+    finally:
+        # Let the probe jobs finish writing before the database is removed
+        job_helper.shutdown()
+        execution_engine.shutdown()
+        status_buffer.shutdown()
+        job_run_writer.shutdown()
+        job_events.shutdown()
+        table_versions.shutdown()
+        if tmp_dir is not None:
+            tmp_dir.cleanup()
+
+    report = {
+        "commit": get_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "database": args.database_url.split(":", 1)[0],
+        "engine": args.engine,
+        "jobstore": args.jobstore,
+        "recurring_fraction": args.recurring_fraction,
+        "baseline_rss_mb": round(baseline_rss_mb, 1),
+        "rehydration": rehydration,
+        "levels": results,
+    }
+
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+        output.write("\n")
+
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
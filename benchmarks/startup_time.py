@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Every scenario runs in a fresh interpreter and prints its duration in seconds
+IMPORT_SCRIPT = """
+import time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+LIFESPAN_SCRIPT = """
+import asyncio, time
+started = time.perf_counter()
+import main
+
+async def start():
+    async with main.app.router.lifespan_context(main.app):
+        print(time.perf_counter() - started)
+
+asyncio.run(start())
+"""
+
+SCENARIOS = {
+    "interpreter": "pass",
+    "import_db": IMPORT_SCRIPT.format(module="backend.config.db"),
+    "import_job_helper": IMPORT_SCRIPT.format(module="backend.helper.job_helper"),
+    "import_execution_engine": IMPORT_SCRIPT.format(module="backend.tasks.execution_engine"),
+    "import_main": IMPORT_SCRIPT.format(module="main"),
+    "lifespan_startup": LIFESPAN_SCRIPT,
+}
+
+
+def run_scenario(script, env):
+    """
+    Run a scenario in a fresh interpreter.
+
+    Args:
+        script (str): The Python code to run, printing its own duration if any.
+        env (dict): The environment of the interpreter.
+
+    Returns:
+        tuple: The wall time of the whole process and the duration printed by
+            the script (None if it printed nothing), in seconds.
+
+    Raises:
+        RuntimeError: If the script failed.
+    """
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", script], cwd=REPO_ROOT, env=env, capture_output=True, text=True
+    )
+    wall_seconds = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip())
+
+    output = completed.stdout.strip().splitlines()
+    return wall_seconds, float(output[-1]) if output else None
+
+
+def summarize(values):
+    """
+    Summarize durations in milliseconds.
+
+    Args:
+        values (list): The durations, in seconds.
+
+    Returns:
+        dict: Min, median and max in milliseconds, None without values.
+    """
+    if not values:
+        return None
+    return {
+        "min": round(min(values) * 1000, 1),
+        "median": round(statistics.median(values) * 1000, 1),
+        "max": round(max(values) * 1000, 1),
+    }
+
+
+def get_commit():
+    """
+    Get the commit being benchmarked.
+
+    Returns:
+        str: The short hash of HEAD, None outside of a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    """
+    Parse the command line.
+
+    Args:
+        argv (list, optional): The arguments, defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Measure how long the application modules take to import and start."
+    )
+    parser.add_argument("--runs", type=int, default=10, help="Runs per scenario.")
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=sorted(SCENARIOS),
+        default=list(SCENARIOS),
+        help="Scenarios to run, all by default.",
+    )
+    parser.add_argument("--output", help="Write the report to this file instead of stdout.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Run every scenario a number of times and report the durations.
+
+    Args:
+        argv (list, optional): The arguments, defaults to sys.argv.
+    """
+    args = parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="job-executors-startup-") as tmp_dir:
+        for name in args.scenarios:
+            print(f"Running {name}...", file=sys.stderr)
+            wall_times, durations = [], []
+            for run in range(args.runs):
+                # A fresh database per run, so the lifespan creates the tables
+                env = {
+                    **os.environ,
+                    "SQLALCHEMY_DATABASE_URL": f"sqlite:///{os.path.join(tmp_dir, f'{name}-{run}.db')}",
+                }
+                wall_seconds, duration = run_scenario(SCENARIOS[name], env)
+                wall_times.append(wall_seconds)
+                if duration is not None:
+                    durations.append(duration)
+
+            results[name] = {"process_ms": summarize(wall_times), "measured_ms": summarize(durations)}
+            print(json.dumps({name: results[name]}), file=sys.stderr)
+
+    report = {
+        "commit": get_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": args.runs,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as report_file:
+            report_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import * as constant from "../helper/constant.js";
+
+// Fetch every job of a status, following the X-Next-Cursor header page by page
+export async function jobsByStatus(status) {
+  const jobs = [];
+  let cursor = null;
+
+  do {
+    let url = `/jobs/?status=${encodeURIComponent(status)}&limit=${constant.jobsPageSize}`;
+    if (cursor) {
+      url += `&cursor=${encodeURIComponent(cursor)}`;
+    }
+
+    const response = await fetch(url);
+    if (!response.ok) {
+      throw new Error(`Failed to fetch the ${status} jobs`);
+    }
+
+    jobs.push(...(await response.json()));
+    cursor = response.headers.get("X-Next-Cursor");
+  } while (cursor);
+
+  return jobs;
+}
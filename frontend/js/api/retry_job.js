@@ -15,7 +15,7 @@ export function retryJob(job_id) {
     })
     .then((data) => {
       message.showSuccess(data.detail);
-      create_job_status_table.createTablesForStatuses();
+      create_job_status_table.refreshJob(job_id);
     })
     .catch((error) => {
       message.showError(error);
@@ -20,7 +20,7 @@ export function updateScheduleJob(job_id) {
     .then((data) => {
       editFormPopup.classList.add("hidden");
       message.showSuccess(data.detail);
-      create_job_status_table.createTablesForStatuses();
+      create_job_status_table.refreshJob(job_id);
     })
     .catch((error) => {
       message.showError(error);
@@ -2,3 +2,5 @@ export const isRetryButtonShown = ["Cancelled", "Failed"];
 export const isEditButtonShown = ["Cancelled", "Failed", "Scheduled"];
 export const isStopButtonShown = ["Failed", "Scheduled"];
 export const jobType = ["CODE", "SCRIPT"];
+// Largest page served by GET /jobs/, see constants.JOBS_PAGE_MAX_LIMIT
+export const jobsPageSize = 1000;
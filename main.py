@@ -1,4 +1,9 @@
+from contextlib import asynccontextmanager
+from time import perf_counter
+
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 
@@ -6,14 +11,66 @@ from backend.endpoints.job_endpoints import router as job_router
 from backend.endpoints.execution_type_endpoints import router as execution_type_router
 from backend.endpoints.event_mapping import router as event_mapping_router
 from backend.endpoints.job_type_endpoint import router as job_type_router
+from backend.config.db import async_engine, get_pool_stats, init_database
+from backend.helper import job_events, job_helper, metrics, table_versions
+from backend.tasks import event_dispatcher, execution_engine, job_run_writer, status_buffer
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the application and release its resources when it stops.
+
+    Importing the modules has no side effects, the database tables are
+    created and the scheduler is started here. On shutdown the event
+    dispatcher, the scheduler leadership and its dispatch queue, the
+    execution pools, the status buffer, the job run writer, the job event
+    writer, the table version bumper and the async connection pool are
+    released.
+    """
+    await run_in_threadpool(init_database)
+    await run_in_threadpool(job_helper.start)
+
+    yield
 
-app = FastAPI()
+    # Queued events are fanned out into the dispatch queue before it stops
+    event_dispatcher.shutdown()
+    job_helper.shutdown()
+    execution_engine.shutdown(wait=False)
+    status_buffer.shutdown()
+    job_run_writer.shutdown()
+    job_events.shutdown()
+    table_versions.shutdown()
+    await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Mount the static files directory
 app.mount("/frontend", StaticFiles(directory="./frontend"), name="frontend")
 templates = Jinja2Templates(directory="./frontend")
 
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """
+    Record the latency of every request per route.
+
+    The route template (e.g. /jobs/{job_id}) is used as label, not the raw
+    path, to keep the number of series bounded.
+    """
+    started = perf_counter()
+    response = await call_next(request)
+
+    route = request.scope.get("route")
+    metrics.http_request_duration.observe(
+        perf_counter() - started,
+        method=request.method,
+        route=route.path if route is not None else "<unmatched>",
+    )
+    return response
+
+
 @app.get("/")
 async def home(request: Request):
     """
@@ -38,6 +95,30 @@ def check_health():
     return {"status": "OK"}
 
 
+@app.get("/health/db")
+def check_database_pool():
+    """
+    Report the connection pool statistics of the sync and async engines.
+
+    Returns:
+        dict: Checkouts, wait times, overflow in use and invalidations per engine.
+    """
+    return get_pool_stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """
+    Expose the application metrics in the Prometheus text format.
+
+    Returns:
+        PlainTextResponse: The metrics exposition.
+    """
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 # Include the API routes from api/main.py
 app.include_router(job_router, prefix="/jobs", tags=["jobs"])
 app.include_router(
@@ -0,0 +1,32 @@
+import os
+import tempfile
+
+# The engines are created when backend.config.db is imported, so the test
+# database must be configured before any backend module is imported
+_database_dir = tempfile.mkdtemp(prefix="job-executor-tests-")
+os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{os.path.join(_database_dir, 'test.db')}"
+os.environ.pop("SQLALCHEMY_ASYNC_DATABASE_URL", None)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.config.db import init_database
+
+
+@pytest.fixture(scope="session")
+def database():
+    """
+    Create the tables of the test database once per session.
+    """
+    init_database()
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    """
+    A client of the application, started and stopped through its lifespan.
+    """
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
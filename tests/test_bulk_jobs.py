@@ -0,0 +1,87 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend.config.db import get_database_connection
+from backend.models.job import Job
+
+
+@pytest.fixture(scope="module")
+def execution_type_id(client):
+    response = client.post(
+        "/execution_types/", json={"name": "bulk-test-type", "description": "Bulk test"}
+    )
+    assert response.status_code == 200
+    yield response.json()["id"]
+
+    client.delete(f"/execution_types/{response.json()['id']}")
+
+
+@pytest.fixture
+def job(execution_type_id):
+    """
+    Build bulk items, the created jobs are deleted once the test is done.
+    """
+    prefix = f"bulk-test-{uuid.uuid4().hex[:8]}"
+
+    def job(index, execution_time, **fields):
+        return {
+            "name": f"{prefix}-{index}",
+            "execution_type_id": execution_type_id,
+            "execution_time": execution_time,
+            "priority": 0,
+            **fields,
+        }
+
+    yield job
+
+    with get_database_connection() as db:
+        db.query(Job).filter(Job.name.like(f"{prefix}-%")).delete(synchronize_session=False)
+
+
+def later(**delta):
+    return datetime.now(timezone.utc) + timedelta(hours=1, **delta)
+
+
+def test_invalid_items_are_reported_without_failing_the_batch(client, job):
+    items = [
+        job(0, later().isoformat()),
+        job(1, (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()),
+        job(2, later().replace(tzinfo=None).isoformat()),
+        job(3, later(minutes=1).isoformat()),
+        job(4, later().isoformat(), execution_type_id=-1),
+    ]
+
+    response = client.post("/jobs/bulk", json={"jobs": items})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [created["name"] for created in body["created"]] == [items[0]["name"], items[3]["name"]]
+    assert [error["index"] for error in body["errors"]] == [1, 2, 4]
+    assert "timezone" in body["errors"][1]["detail"]
+
+
+def test_duplicates_within_the_batch_are_rejected(client, job):
+    items = [job(0, later().isoformat()), job(0, later().isoformat())]
+
+    body = client.post("/jobs/bulk", json={"jobs": items}).json()
+
+    assert len(body["created"]) == 1
+    assert [error["index"] for error in body["errors"]] == [1]
+
+
+def test_batch_of_timezone_less_items_is_not_a_server_error(client, job):
+    items = [job(index, later().replace(tzinfo=None).isoformat()) for index in range(3)]
+
+    response = client.post("/jobs/bulk", json={"jobs": items})
+
+    assert response.status_code == 200
+    assert response.json()["created"] == []
+    assert len(response.json()["errors"]) == 3
+
+
+def test_timezone_less_job_is_a_bad_request(client, job):
+    response = client.post("/jobs/", json=job(0, later().replace(tzinfo=None).isoformat()))
+
+    assert response.status_code == 400
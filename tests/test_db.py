@@ -0,0 +1,51 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from backend.config import db
+
+
+@pytest.fixture
+def old_engine(tmp_path):
+    """
+    A database created before the columns of ADDED_COLUMNS existed.
+    """
+    engine = create_engine(f"sqlite:///{os.path.join(tmp_path, 'old.db')}")
+    with engine.begin() as connection:
+        for table_name in db.ADDED_COLUMNS:
+            connection.execute(text(f"CREATE TABLE {table_name} (id INTEGER PRIMARY KEY, name VARCHAR)"))
+        connection.execute(text("INSERT INTO jobs (id, name) VALUES (1, 'old job')"))
+    yield engine
+    engine.dispose()
+
+
+def columns(engine, table_name):
+    return {column["name"] for column in inspect(engine).get_columns(table_name)}
+
+
+def test_missing_columns_are_added(old_engine):
+    added = db.add_missing_columns(old_engine)
+
+    assert added == [
+        f"{table_name}.{column_name}"
+        for table_name, column_names in db.ADDED_COLUMNS.items()
+        for column_name in column_names
+    ]
+    for table_name, column_names in db.ADDED_COLUMNS.items():
+        assert set(column_names) <= columns(old_engine, table_name)
+
+    with old_engine.connect() as connection:
+        assert connection.execute(text("SELECT name, misfire_policy FROM jobs")).all() == [
+            ("old job", None)
+        ]
+
+
+def test_adding_columns_again_is_a_no_op(old_engine):
+    db.add_missing_columns(old_engine)
+
+    assert db.add_missing_columns(old_engine) == []
+
+
+def test_current_schema_has_every_added_column(database):
+    assert db.add_missing_columns(db.engine) == []
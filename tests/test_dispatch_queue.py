@@ -0,0 +1,194 @@
+import time
+from threading import Event, Thread
+
+import pytest
+
+from backend.config.db import get_database_connection
+from backend.models.job import EventMapping, Job
+from backend.tasks import dispatch_queue, event_dispatcher, misfire_replay
+from backend.tasks.dispatch_queue import DispatchQueue
+from backend.tasks.execution_limits import DeferredJobs
+
+
+def drain(queue):
+    return [queue.get()[:2] for _ in range(sum(queue.depths().values()))]
+
+
+def test_most_urgent_priority_is_dispatched_first():
+    queue = DispatchQueue(max_size=10, max_wait=60)
+
+    queue.put(1, 5)
+    queue.put(2, 0)
+    queue.put(3, 10)
+    queue.put(4, 0)
+
+    assert drain(queue) == [(2, 0), (4, 0), (1, 5), (3, 10)]
+
+
+def test_long_waiting_job_is_dispatched_before_more_urgent_ones():
+    queue = DispatchQueue(max_size=10, max_wait=0.05)
+
+    queue.put(1, 10)
+    time.sleep(0.1)
+    queue.put(2, 0)
+
+    job_id, priority, waited = queue.get()
+    assert (job_id, priority) == (1, 10)
+    assert waited >= 0.05
+    assert queue.get()[:2] == (2, 0)
+
+
+def test_depths_count_waiting_jobs_per_priority():
+    queue = DispatchQueue(max_size=10, max_wait=60)
+
+    queue.put(1, 0)
+    queue.put(2, 0)
+    queue.put(3, 5)
+
+    assert queue.depths() == {("0",): 2, ("5",): 1}
+
+
+def test_put_blocks_while_the_queue_is_full():
+    queue = DispatchQueue(max_size=1, max_wait=60)
+    queue.put(1, 0)
+
+    producer = Thread(target=queue.put, args=(2, 0))
+    producer.start()
+    producer.join(0.1)
+    assert producer.is_alive()
+
+    assert queue.get()[:2] == (1, 0)
+    producer.join(5)
+    assert not producer.is_alive()
+    assert queue.get()[:2] == (2, 0)
+
+
+def test_stop_drops_waiting_jobs_and_wakes_callers_up():
+    queue = DispatchQueue(max_size=1, max_wait=60)
+    queue.put(1, 0)
+    results = []
+    producer = Thread(target=lambda: results.append(queue.put(2, 0)))
+    producer.start()
+
+    assert queue.stop() == 1
+    producer.join(5)
+
+    assert results == [False]
+    assert queue.get() is None
+    assert not queue.put(3, 0)
+
+
+class Dispatched(list):
+    """
+    Jobs handed to the dispatch queue, with an event set on every dispatch.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.done = Event()
+
+    def dispatch(self, job_id, priority=dispatch_queue.DEFAULT_PRIORITY):
+        self.append((job_id, priority))
+        self.done.set()
+
+
+@pytest.fixture
+def dispatched(monkeypatch):
+    """
+    Record the dispatched jobs instead of executing them.
+    """
+    jobs = Dispatched()
+    monkeypatch.setattr(dispatch_queue, "dispatch", jobs.dispatch)
+    return jobs
+
+
+def test_deferred_jobs_are_submitted_again_with_their_priority():
+    submitted = []
+    done = Event()
+
+    def submit(job_id, priority):
+        submitted.append((job_id, priority))
+        if len(submitted) == 2:
+            done.set()
+
+    deferred = DeferredJobs(submit)
+    deferred.defer(1, 0.1, 5)
+    deferred.defer(2, 0.01, 0)
+
+    assert done.wait(5)
+    assert submitted == [(2, 0), (1, 5)]
+    assert deferred.pending() == 0
+
+
+def test_execution_engine_defers_jobs_into_the_dispatch_queue(dispatched):
+    from backend.tasks import execution_engine
+
+    execution_engine._deferred_jobs.submit(4, 2)
+
+    assert dispatched == [(4, 2)]
+
+
+def test_missed_runs_are_replayed_through_the_dispatch_queue(dispatched):
+    try:
+        misfire_replay.enqueue_replay(7, None, 3)
+        assert dispatched.done.wait(5)
+    finally:
+        misfire_replay.shutdown()
+
+    assert dispatched == [(7, 3)]
+
+
+def test_events_are_fanned_out_through_the_dispatch_queue(dispatched, database):
+    with get_database_connection() as db:
+        mapping = EventMapping(name="dispatch-test-event")
+        db.add(mapping)
+        db.flush()
+        rows = [
+            Job(name=f"dispatch-test-{priority}", event_mapping_id=mapping.id, priority=priority)
+            for priority in (2, 0)
+        ]
+        db.add_all(rows)
+        db.flush()
+        mapping_id = mapping.id
+        expected = sorted((job.id, job.priority) for job in rows)
+
+    try:
+        event_dispatcher.fan_out(mapping_id)
+    finally:
+        with get_database_connection() as db:
+            db.query(Job).filter(Job.event_mapping_id == mapping_id).delete()
+            db.query(EventMapping).filter(EventMapping.id == mapping_id).delete()
+
+    assert sorted(dispatched) == expected
+
+
+def test_stopped_queue_accepts_jobs_once_started_again():
+    queue = DispatchQueue(max_size=10, max_wait=60)
+    queue.stop()
+
+    queue.start()
+
+    assert queue.put(1, 0)
+    assert queue.get()[:2] == (1, 0)
+
+
+def test_dispatch_restarts_the_dispatcher_after_a_shutdown(monkeypatch):
+    from backend.tasks import execution_engine
+
+    submitted = []
+    done = Event()
+
+    def submit_job(job_id):
+        submitted.append(job_id)
+        done.set()
+
+    monkeypatch.setattr(execution_engine, "submit_job", submit_job)
+
+    dispatch_queue.shutdown()
+    try:
+        dispatch_queue.dispatch(5, 1)
+
+        assert done.wait(5)
+        assert submitted == [5]
+    finally:
+        dispatch_queue.shutdown()
@@ -0,0 +1,111 @@
+import pytest
+
+from backend.tasks.execution_limits import (
+    CONCURRENCY_LIMIT,
+    LIMIT_RETRY_SECONDS,
+    RATE_LIMIT,
+    ExecutionLimiter,
+    TokenBucket,
+)
+
+
+def test_bucket_starts_full():
+    bucket = TokenBucket(rate=1, burst=3)
+    now = bucket.updated
+
+    for _ in range(3):
+        assert bucket.wait_time(now) == 0
+        bucket.take()
+
+    assert bucket.wait_time(now) == pytest.approx(1)
+
+
+def test_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=4, burst=1)
+    now = bucket.updated
+    bucket.take()
+
+    assert bucket.wait_time(now + 0.125) == pytest.approx(0.125)
+    assert bucket.wait_time(now + 0.25) == 0
+
+
+def test_bucket_never_holds_more_than_its_burst():
+    bucket = TokenBucket(rate=10, burst=2)
+    now = bucket.updated
+
+    bucket.wait_time(now + 60)
+
+    assert bucket.tokens == 2
+
+
+def test_concurrency_limit_defers_until_a_slot_is_released():
+    limiter = ExecutionLimiter()
+    limits = {("job_type", 1): {"max_concurrency": 2}}
+
+    assert limiter.try_acquire(limits) == (None, 0.0)
+    assert limiter.try_acquire(limits) == (None, 0.0)
+    assert limiter.try_acquire(limits) == (CONCURRENCY_LIMIT, LIMIT_RETRY_SECONDS)
+
+    limiter.release(limits)
+
+    assert limiter.try_acquire(limits) == (None, 0.0)
+
+
+def test_rate_limit_defers_until_a_token_is_available():
+    limiter = ExecutionLimiter()
+    limits = {("event_mapping", 1): {"rate_limit": 2, "rate_burst": 2}}
+
+    assert limiter.try_acquire(limits) == (None, 0.0)
+    assert limiter.try_acquire(limits) == (None, 0.0)
+
+    limit, delay = limiter.try_acquire(limits)
+    assert limit == RATE_LIMIT
+    assert 0 < delay <= 0.5
+
+
+def test_limits_are_taken_all_or_nothing():
+    limiter = ExecutionLimiter()
+    job_type = {("job_type", 1): {"rate_limit": 1, "max_concurrency": 5}}
+    event_mapping = {("event_mapping", 1): {"max_concurrency": 1}}
+
+    assert limiter.try_acquire(event_mapping) == (None, 0.0)
+
+    # The event mapping is full, the job type must keep its token and slot
+    limit, _ = limiter.try_acquire({**job_type, **event_mapping})
+    assert limit == CONCURRENCY_LIMIT
+
+    assert limiter.try_acquire(job_type) == (None, 0.0)
+
+
+def test_limits_are_counted_per_key():
+    limiter = ExecutionLimiter()
+    settings = {"max_concurrency": 1}
+
+    assert limiter.try_acquire({("job_type", 1): settings}) == (None, 0.0)
+    assert limiter.try_acquire({("job_type", 2): settings}) == (None, 0.0)
+
+
+def test_changed_rate_replaces_the_bucket():
+    limiter = ExecutionLimiter()
+    key = ("job_type", 1)
+
+    assert limiter.try_acquire({key: {"rate_limit": 1}}) == (None, 0.0)
+    assert limiter.try_acquire({key: {"rate_limit": 1}})[0] == RATE_LIMIT
+
+    assert limiter.try_acquire({key: {"rate_limit": 100}}) == (None, 0.0)
+
+
+def test_release_without_slots_is_ignored():
+    limiter = ExecutionLimiter()
+    limits = {("job_type", 1): {"max_concurrency": 1}}
+
+    limiter.release(limits)
+
+    assert limiter.try_acquire(limits) == (None, 0.0)
+    assert limiter.try_acquire(limits)[0] == CONCURRENCY_LIMIT
+
+
+def test_bucket_created_after_the_time_was_read_is_full():
+    bucket = TokenBucket(rate=1, burst=1)
+
+    assert bucket.wait_time(bucket.updated - 0.01) == 0
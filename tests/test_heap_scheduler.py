@@ -0,0 +1,229 @@
+import time
+from datetime import datetime, timedelta, timezone
+from threading import Condition
+
+import pytest
+from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED
+from apscheduler.jobstores.base import ConflictingIdError, JobLookupError
+from apscheduler.schedulers import SchedulerAlreadyRunningError, SchedulerNotRunningError
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from backend.helper import heap_scheduler
+from backend.helper.heap_scheduler import HeapScheduler
+
+
+class Fired:
+    """
+    Records the (job ID, priority) of every fired entry.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self._condition = Condition()
+
+    def __call__(self, job_id, priority):
+        with self._condition:
+            self.calls.append((job_id, priority))
+            self._condition.notify_all()
+
+    def wait_for(self, count, timeout=5):
+        with self._condition:
+            return self._condition.wait_for(lambda: len(self.calls) >= count, timeout)
+
+
+def at(seconds):
+    return DateTrigger(datetime.now(timezone.utc) + timedelta(seconds=seconds))
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = HeapScheduler()
+    yield scheduler
+    if scheduler.running:
+        scheduler.shutdown()
+
+
+def test_entries_fire_in_run_time_order(scheduler):
+    fired = Fired()
+    for job_id, seconds in ((1, 0.15), (2, 0.05), (3, 0.1)):
+        scheduler.add_job(fired, at(seconds), args=[job_id, 0], id=str(job_id))
+
+    scheduler.start()
+
+    assert fired.wait_for(3)
+    assert fired.calls == [(2, 0), (3, 0), (1, 0)]
+    assert len(scheduler) == 0
+
+
+def test_earlier_entry_added_while_running_wakes_the_scheduler_up(scheduler):
+    fired = Fired()
+    scheduler.start()
+    scheduler.add_job(fired, at(60), args=[1, 0], id="late")
+
+    scheduler.add_job(fired, at(0.05), args=[2, 7], id="soon")
+
+    assert fired.wait_for(1, timeout=1)
+    assert fired.calls == [(2, 7)]
+
+
+def test_existing_id_is_only_replaced_when_asked(scheduler):
+    fired = Fired()
+    scheduler.add_job(fired, at(60), args=[1, 0], id="job")
+
+    with pytest.raises(ConflictingIdError):
+        scheduler.add_job(fired, at(0.05), args=[1, 0], id="job")
+
+    scheduler.add_job(fired, at(0.05), args=[1, 2], id="job", replace_existing=True)
+    scheduler.start()
+
+    assert fired.wait_for(1)
+    time.sleep(0.1)
+    assert fired.calls == [(1, 2)]
+    assert scheduler.get_job("job") is None
+
+
+def test_removed_entry_does_not_fire(scheduler):
+    fired = Fired()
+    scheduler.add_job(fired, at(0.05), args=[1, 0], id="removed")
+    scheduler.add_job(fired, at(0.1), args=[2, 0], id="kept")
+
+    scheduler.remove_job("removed")
+    scheduler.start()
+
+    assert fired.wait_for(1)
+    time.sleep(0.1)
+    assert fired.calls == [(2, 0)]
+
+    with pytest.raises(JobLookupError):
+        scheduler.remove_job("removed")
+
+
+def test_entries_can_be_looked_up(scheduler):
+    fired = Fired()
+    run_date = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    scheduler.add_job(fired, DateTrigger(run_date), args=[1, 5], id="later")
+    scheduler.add_job(fired, DateTrigger(run_date - timedelta(days=1)), args=[2, 0], id="sooner")
+
+    job = scheduler.get_job("later")
+    assert (job.id, job.next_run_time, job.args) == ("later", run_date, (1, 5))
+    assert [job.id for job in scheduler.get_jobs()] == ["sooner", "later"]
+    assert scheduler.get_job("unknown") is None
+    assert len(scheduler) == 2
+
+
+def test_late_run_is_missed_instead_of_fired(scheduler):
+    fired = Fired()
+    events = []
+    scheduler.add_listener(events.append, EVENT_JOB_MISSED | EVENT_JOB_SUBMITTED)
+    scheduler.add_job(fired, at(-5), args=[1, 0], id="late", misfire_grace_time=1)
+    scheduler.add_job(fired, at(-0.1), args=[2, 0], id="on-time", misfire_grace_time=1)
+
+    scheduler.start()
+
+    assert fired.wait_for(1)
+    time.sleep(0.05)
+    assert fired.calls == [(2, 0)]
+    assert [(event.code, event.job_id) for event in events] == [
+        (EVENT_JOB_MISSED, "late"),
+        (EVENT_JOB_SUBMITTED, "on-time"),
+    ]
+
+
+def test_failing_listener_does_not_stop_the_scheduler(scheduler):
+    fired = Fired()
+
+    def fail(event):
+        raise RuntimeError("listener failed")
+
+    scheduler.add_listener(fail)
+    scheduler.add_job(fired, at(0.01), args=[1, 0], id="first")
+    scheduler.add_job(fired, at(0.05), args=[2, 0], id="second")
+    scheduler.start()
+
+    assert fired.wait_for(2)
+
+
+def test_interval_entry_fires_again(scheduler):
+    fired = Fired()
+    scheduler.add_job(
+        fired, IntervalTrigger(seconds=0.05), args=[1, 0], id="recurring", misfire_grace_time=60
+    )
+
+    scheduler.start()
+
+    assert fired.wait_for(3)
+    assert scheduler.get_job("recurring") is not None
+
+
+@pytest.mark.parametrize("coalesce, minimum, maximum", [(True, 1, 1), (False, 4, 6)])
+def test_missed_interval_runs_are_coalesced(scheduler, coalesce, minimum, maximum):
+    fired = Fired()
+    scheduler.start(paused=True)
+    scheduler.add_job(
+        fired, IntervalTrigger(seconds=0.2), args=[1, 0], id="recurring",
+        misfire_grace_time=60, coalesce=coalesce,
+    )
+
+    time.sleep(1.1)
+    scheduler.resume()
+    fired.wait_for(1)
+    time.sleep(0.05)
+
+    assert minimum <= len(fired.calls) <= maximum
+
+
+def test_paused_scheduler_keeps_its_entries(scheduler):
+    fired = Fired()
+    scheduler.add_job(fired, at(0.01), args=[1, 0], id="job")
+
+    scheduler.start(paused=True)
+    time.sleep(0.1)
+    assert fired.calls == []
+
+    scheduler.resume()
+    assert fired.wait_for(1)
+
+
+def test_stale_keys_are_compacted(scheduler, monkeypatch):
+    monkeypatch.setattr(heap_scheduler, "COMPACT_MIN_STALE", 4)
+    fired = Fired()
+    scheduler.start()
+
+    for _ in range(50):
+        scheduler.add_job(fired, at(60), args=[1, 0], id="replaced", replace_existing=True)
+    for job_id in range(10):
+        scheduler.add_job(fired, at(60), args=[job_id, 0], id=f"removed-{job_id}")
+        scheduler.remove_job(f"removed-{job_id}")
+    scheduler.add_job(fired, at(0.05), args=[2, 0], id="due")
+
+    assert len(scheduler._heap) <= 2 * len(scheduler) + heap_scheduler.COMPACT_MIN_STALE
+    assert fired.wait_for(1)
+    assert fired.calls == [(2, 0)]
+    assert scheduler.get_job("replaced") is not None
+
+
+def test_freed_slots_are_reused(scheduler):
+    fired = Fired()
+    for job_id in range(3):
+        scheduler.add_job(fired, at(60), args=[job_id, 0], id=str(job_id))
+        scheduler.remove_job(str(job_id))
+
+    scheduler.add_job(fired, at(60), args=[9, 0], id="reused")
+
+    assert len(scheduler._ids) == 1
+
+
+def test_only_date_and_interval_triggers_are_supported(scheduler):
+    with pytest.raises(TypeError):
+        scheduler.add_job(Fired(), CronTrigger(second="*"), args=[1, 0], id="cron")
+
+
+def test_start_and_shutdown_are_checked(scheduler):
+    with pytest.raises(SchedulerNotRunningError):
+        scheduler.shutdown()
+
+    scheduler.start()
+    with pytest.raises(SchedulerAlreadyRunningError):
+        scheduler.start()
@@ -0,0 +1,194 @@
+import threading
+import time
+import uuid
+
+import pytest
+
+from backend.helper.leader_election import LeaderElection
+
+
+class Candidate(LeaderElection):
+    """
+    Election keeping track of its elections and demotions.
+    """
+
+    def __init__(self, name, lease_seconds=15, renew_seconds=5, margin_seconds=3):
+        super().__init__(
+            name,
+            on_elected=lambda: self.changes.append("elected"),
+            on_demoted=lambda: self.changes.append("demoted"),
+            lease_seconds=lease_seconds,
+            renew_seconds=renew_seconds,
+            margin_seconds=margin_seconds,
+        )
+        self.changes = []
+
+
+def wait_until(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def lease_name(database):
+    return f"test-{uuid.uuid4().hex}"
+
+
+def test_first_candidate_takes_the_lease(lease_name):
+    first, second = Candidate(lease_name), Candidate(lease_name)
+
+    assert first.try_acquire()
+    assert not second.try_acquire()
+
+
+def test_leader_renews_its_lease(lease_name):
+    leader, follower = Candidate(lease_name), Candidate(lease_name)
+
+    assert leader.try_acquire()
+    assert leader.try_acquire()
+    assert not follower.try_acquire()
+
+
+def test_expired_lease_is_taken_over(lease_name):
+    leader, follower = Candidate(lease_name, lease_seconds=0.1, renew_seconds=0.03, margin_seconds=0.02), Candidate(lease_name)
+
+    assert leader.try_acquire()
+    time.sleep(0.2)
+
+    assert follower.try_acquire()
+    assert not leader.try_acquire()
+
+
+def test_released_lease_is_taken_over_right_away(lease_name):
+    leader, follower = Candidate(lease_name), Candidate(lease_name)
+
+    assert leader.try_acquire()
+    leader.release()
+
+    assert follower.try_acquire()
+
+
+def test_release_by_a_follower_keeps_the_lease(lease_name):
+    leader, follower = Candidate(lease_name), Candidate(lease_name)
+
+    assert leader.try_acquire()
+    follower.release()
+
+    assert not follower.try_acquire()
+
+
+def test_callbacks_follow_the_leadership(lease_name):
+    leader, follower = Candidate(lease_name, lease_seconds=0.1, renew_seconds=0.03, margin_seconds=0.02), Candidate(lease_name)
+
+    assert leader.run_once()
+    assert leader.run_once()
+    assert not follower.run_once()
+
+    time.sleep(0.2)
+    assert follower.run_once()
+    assert not leader.run_once()
+
+    assert leader.changes == ["elected", "demoted"]
+    assert follower.changes == ["elected"]
+
+
+def test_failed_round_demotes_the_leader(lease_name):
+    leader = Candidate(lease_name)
+    assert leader.run_once()
+
+    def fail():
+        raise RuntimeError("database is down")
+
+    leader.try_acquire = fail
+
+    assert not leader.run_once()
+    assert leader.changes == ["elected", "demoted"]
+
+
+def test_stop_releases_the_lease(lease_name):
+    leader, follower = Candidate(lease_name), Candidate(lease_name)
+
+    leader.start()
+    assert leader.is_leader
+    leader.stop()
+
+    assert leader.changes == ["elected", "demoted"]
+    assert follower.try_acquire()
+
+
+def test_lease_must_fit_two_renewals(lease_name):
+    with pytest.raises(ValueError):
+        Candidate(lease_name, lease_seconds=10, renew_seconds=5, margin_seconds=3)
+
+
+def test_leader_steps_down_when_a_renewal_hangs_past_its_lease(lease_name):
+    leader = Candidate(lease_name, lease_seconds=0.4, renew_seconds=0.05, margin_seconds=0.1)
+    acquire = leader.try_acquire
+    unblocked = threading.Event()
+
+    def hang():
+        unblocked.wait(5)
+        return True
+
+    leader.start()
+    try:
+        assert leader.is_leader
+        leader.try_acquire = hang
+
+        # Demoted before the lease expires and a follower may take over
+        hung_at = time.monotonic()
+        assert wait_until(lambda: not leader.is_leader)
+        assert time.monotonic() - hung_at < leader.lease_seconds
+        assert leader.changes == ["elected", "demoted"]
+
+        # The late renewal isn't trusted, the next one elects the leader again
+        leader.try_acquire = acquire
+        unblocked.set()
+        assert wait_until(lambda: leader.is_leader)
+        assert leader.changes == ["elected", "demoted", "elected"]
+    finally:
+        unblocked.set()
+        leader.stop()
+
+
+def test_late_renewal_does_not_elect(lease_name):
+    leader = Candidate(lease_name, lease_seconds=0.2, renew_seconds=0.05, margin_seconds=0.05)
+    acquire = leader.try_acquire
+
+    def slow():
+        time.sleep(0.2)
+        return acquire()
+
+    leader.try_acquire = slow
+
+    assert not leader.run_once()
+    assert leader.changes == []
+
+
+def test_leader_polls_the_job_store_within_the_on_time_window(monkeypatch):
+    from backend.helper import job_helper
+
+    assert job_helper.SCHEDULER_LEADER_POLL_SECONDS <= job_helper.SCHEDULER_ON_TIME_SECONDS / 2
+
+    wakeups = []
+    monkeypatch.setattr(job_helper, "SCHEDULER_LEADER_POLL_SECONDS", 0.01)
+    monkeypatch.setattr(job_helper.scheduler, "wakeup", lambda: wakeups.append(time.monotonic()))
+    monkeypatch.setattr(job_helper.leader_election, "is_leader", False)
+
+    poller = threading.Thread(target=job_helper._poll_job_store)
+    poller.start()
+    try:
+        time.sleep(0.1)
+        assert wakeups == []
+
+        job_helper.leader_election.is_leader = True
+        time.sleep(0.1)
+        assert wakeups
+    finally:
+        job_helper._poller_stopped.set()
+        poller.join(5)
+        job_helper._poller_stopped.clear()
@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta, timezone
+
+import queue
+import time
+from threading import Event
+
+import pytest
+from apscheduler.events import EVENT_JOB_MISSED, JobExecutionEvent
+
+from backend.config.db import get_database_connection
+from backend.helper import constants, job_helper
+from backend.helper import reference_cache
+from backend.models.job import Job, JobType
+from backend.tasks import misfire_replay
+
+
+@pytest.fixture
+def replays(monkeypatch):
+    """
+    Record the runs queued for replay instead of replaying them.
+    """
+    queued = []
+    monkeypatch.setattr(
+        misfire_replay,
+        "enqueue_replay",
+        lambda job_id, scheduled_run_time, priority: queued.append((job_id, priority)),
+    )
+    return queued
+
+
+@pytest.fixture
+def make_job(database):
+    """
+    Create jobs, deleted once the test is done.
+    """
+    ids = []
+
+    def make_job(**columns):
+        with get_database_connection() as db:
+            job = Job(name=f"misfire-test-{len(ids)}", **columns)
+            db.add(job)
+            db.flush()
+            ids.append(job.id)
+            return job.id
+
+    yield make_job
+
+    with get_database_connection() as db:
+        db.query(Job).filter(Job.id.in_(ids)).delete(synchronize_session=False)
+
+
+def miss(job_id, seconds_ago):
+    job_helper._on_job_missed(
+        JobExecutionEvent(
+            EVENT_JOB_MISSED,
+            f"job-{job_id}",
+            "default",
+            datetime.now(timezone.utc) - timedelta(seconds=seconds_ago),
+        )
+    )
+
+
+def test_missed_run_of_a_coalescing_job_is_replayed(replays, make_job):
+    job_id = make_job(misfire_policy=constants.MISFIRE_COALESCE, priority=4)
+
+    miss(job_id, seconds_ago=10)
+
+    assert replays == [(job_id, 4)]
+
+
+@pytest.mark.parametrize(
+    "job, job_type, expected",
+    [
+        (Job(), None, (job_helper.JOB_MISFIRE_POLICY, job_helper.JOB_MISFIRE_GRACE_SECONDS)),
+        (Job(), {}, (job_helper.JOB_MISFIRE_POLICY, job_helper.JOB_MISFIRE_GRACE_SECONDS)),
+        (
+            Job(),
+            {"misfire_policy": "all", "misfire_grace_seconds": 60},
+            ("all", 60),
+        ),
+        (
+            Job(misfire_policy="skip", misfire_grace_seconds=10),
+            {"misfire_policy": "all", "misfire_grace_seconds": 60},
+            ("skip", 10),
+        ),
+        # A grace of 0 is a setting, not a missing one
+        (Job(misfire_grace_seconds=0), {"misfire_grace_seconds": 60}, (job_helper.JOB_MISFIRE_POLICY, 0)),
+        (Job(), {"misfire_grace_seconds": 0}, (job_helper.JOB_MISFIRE_POLICY, 0)),
+    ],
+)
+def test_job_settings_win_over_job_type_settings_and_defaults(job, job_type, expected):
+    assert job_helper.get_misfire_policy(job, job_type) == expected
+
+
+def test_missed_run_of_a_skipping_job_is_dropped(replays, make_job):
+    job_id = make_job(misfire_policy=constants.MISFIRE_SKIP)
+
+    miss(job_id, seconds_ago=10)
+
+    assert replays == []
+
+
+def test_every_missed_run_is_replayed_with_the_all_policy(replays, make_job):
+    job_id = make_job(misfire_policy=constants.MISFIRE_ALL, priority=1)
+
+    for seconds_ago in (30, 20, 10):
+        miss(job_id, seconds_ago)
+
+    assert replays == [(job_id, 1)] * 3
+
+
+def test_run_missed_beyond_the_grace_window_is_dropped(replays, make_job):
+    job_id = make_job(misfire_policy=constants.MISFIRE_COALESCE, misfire_grace_seconds=60)
+
+    miss(job_id, seconds_ago=120)
+    miss(job_id, seconds_ago=30)
+
+    assert replays == [(job_id, 0)]
+
+
+def test_policy_of_the_job_type_applies(replays, make_job):
+    with get_database_connection() as db:
+        job_type = JobType(name="misfire-test-type", misfire_policy=constants.MISFIRE_SKIP)
+        db.add(job_type)
+        db.flush()
+        job_type_id = job_type.id
+    reference_cache.job_types.invalidate()
+
+    try:
+        miss(make_job(job_type_id=job_type_id), seconds_ago=10)
+    finally:
+        with get_database_connection() as db:
+            db.query(Job).filter(Job.job_type_id == job_type_id).update({Job.job_type_id: None})
+            db.query(JobType).filter(JobType.id == job_type_id).delete()
+        reference_cache.job_types.invalidate()
+
+    assert replays == []
+
+
+def test_missed_runs_of_unknown_jobs_are_ignored(replays, database):
+    miss(-1, seconds_ago=10)
+    job_helper._on_job_missed(
+        JobExecutionEvent(EVENT_JOB_MISSED, "other", "default", datetime.now(timezone.utc))
+    )
+
+    assert replays == []
+
+
+def test_replays_are_rate_limited(monkeypatch):
+    from backend.tasks import dispatch_queue
+
+    dispatched = []
+    done = Event()
+
+    def dispatch(job_id, priority):
+        dispatched.append((job_id, priority, time.monotonic()))
+        if len(dispatched) == 4:
+            done.set()
+
+    misfire_replay.shutdown()
+    monkeypatch.setattr(misfire_replay, "MISFIRE_REPLAY_RATE", 20)
+    monkeypatch.setattr(dispatch_queue, "dispatch", dispatch)
+
+    try:
+        for job_id in range(4):
+            misfire_replay.enqueue_replay(job_id, None, 2)
+        assert done.wait(5)
+    finally:
+        misfire_replay.shutdown()
+
+    assert [(job_id, priority) for job_id, priority, _ in dispatched] == [(job_id, 2) for job_id in range(4)]
+    # One replay every 1 / 20 s
+    assert dispatched[-1][2] - dispatched[0][2] >= 3 * 0.05 * 0.9
+
+
+def test_replays_beyond_the_queue_size_are_dropped(monkeypatch):
+    monkeypatch.setattr(misfire_replay, "_replays", queue.Queue(maxsize=1))
+    monkeypatch.setattr(misfire_replay, "_ensure_replayer", lambda: None)
+
+    misfire_replay.enqueue_replay(1, None, 0)
+    misfire_replay.enqueue_replay(2, None, 0)
+
+    assert misfire_replay._replays.get_nowait() == (1, None, 0)
+    assert misfire_replay._replays.empty()
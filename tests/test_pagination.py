@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from backend.config.db import get_database_connection
+from backend.helper import constants, pagination
+from backend.models.job import Job
+
+STATUS = "PaginationTest"
+
+
+@pytest.fixture(scope="module")
+def jobs(database):
+    """
+    Jobs sharing execution times and priorities, some without execution time.
+    """
+    start = datetime(2030, 1, 1, 12, 0, 0)
+    rows = []
+    for index in range(12):
+        execution_time = None if index % 4 == 3 else start + timedelta(minutes=index % 3)
+        rows.append(
+            Job(
+                name=f"pagination-test-{index}",
+                execution_time=execution_time,
+                priority=index % 2,
+                status=STATUS,
+            )
+        )
+
+    with get_database_connection() as db:
+        db.add_all(rows)
+        db.flush()
+        ids = [job.id for job in rows]
+
+    with get_database_connection() as db:
+        expected = (
+            db.query(Job)
+            .filter(Job.id.in_(ids))
+            .order_by(*pagination.job_keyset_order())
+            .all()
+        )
+        yield [job.id for job in expected]
+
+        db.query(Job).filter(Job.id.in_(ids)).delete(synchronize_session=False)
+
+
+def test_cursor_round_trip():
+    job = Job(id=42, execution_time=datetime(2030, 1, 1, 12, 30, 15, 250), priority=3)
+
+    cursor = pagination.encode_job_cursor(job)
+
+    assert pagination.decode_job_cursor(cursor) == (job.execution_time, 3, 42)
+
+
+def test_cursor_round_trip_without_execution_time():
+    job = Job(id=7, execution_time=None, priority=0)
+
+    assert pagination.decode_job_cursor(pagination.encode_job_cursor(job)) == (None, 0, 7)
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "bm90IGpzb24=", "WzEsIDJd", "WyJub3cnIiwgMSwgMl0="])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        pagination.decode_job_cursor(cursor)
+
+    assert error.value.status_code == 400
+    assert error.value.detail == constants.INVALID_CURSOR
+
+
+def test_pages_cover_every_job_once_in_order(client, jobs):
+    seen = []
+    params = {"status": STATUS, "limit": 5}
+    while True:
+        response = client.get("/jobs/", params=params)
+        assert response.status_code == 200
+        seen.extend(job["id"] for job in response.json())
+
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params["cursor"] = cursor
+
+    assert seen == jobs
+
+
+def test_last_full_page_has_no_cursor(client, jobs):
+    response = client.get("/jobs/", params={"status": STATUS, "limit": len(jobs)})
+
+    assert len(response.json()) == len(jobs)
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_invalid_cursor_is_a_bad_request(client, jobs):
+    response = client.get("/jobs/", params={"status": STATUS, "cursor": "not base64!"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == constants.INVALID_CURSOR
@@ -0,0 +1,182 @@
+import threading
+import time
+from threading import Condition, Event, Thread
+
+import pytest
+
+from backend.tasks.status_buffer import StatusBuffer
+
+
+class RecordingBuffer(StatusBuffer):
+    """
+    Status buffer keeping its flushes in memory, failing the ones asked to.
+    """
+
+    def __init__(self, flush_interval=60, batch_size=100):
+        super().__init__(flush_interval, batch_size)
+        self.flushes = []
+        self.failures = []
+
+    def _flush(self, rows):
+        self.flushes.append([(row["job_id"], row["new_status"]) for row in rows])
+        if self.failures:
+            raise self.failures.pop(0)
+
+
+def test_writes_of_a_job_are_coalesced():
+    buffer = RecordingBuffer()
+
+    buffer.write(1, "Scheduled")
+    buffer.write(2, "Scheduled")
+    buffer.write(1, "Running")
+    buffer.write(1, "Completed", durable=True)
+    buffer.shutdown()
+
+    assert buffer.flushes == [[(1, "Completed"), (2, "Scheduled")]]
+
+
+def test_full_batch_is_flushed_without_waiting_for_the_interval():
+    buffer = RecordingBuffer(batch_size=2)
+    flushed = Event()
+    buffer._flush = lambda rows: flushed.set()
+
+    buffer.write(1, "Running")
+    buffer.write(2, "Running")
+
+    assert flushed.wait(5)
+    buffer.shutdown()
+
+
+def test_shutdown_flushes_pending_statuses():
+    buffer = RecordingBuffer()
+
+    buffer.write(1, "Running")
+    buffer.shutdown()
+
+    assert buffer.flushes == [[(1, "Running")]]
+
+
+def test_durable_write_raises_when_its_flush_fails():
+    buffer = RecordingBuffer()
+    buffer.failures.append(RuntimeError("database is down"))
+
+    with pytest.raises(RuntimeError, match="database is down"):
+        buffer.write(1, "Completed", durable=True)
+
+    # The failure belongs to that writer only
+    buffer.write(2, "Completed", durable=True)
+    buffer.shutdown()
+
+
+class SlowWakeupCondition(Condition):
+    """
+    Condition letting a given thread go back to sleep for a while once
+    woken up, so that other threads can take the lock in the meantime.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.slow_thread = None
+        self.woken = Event()
+        self.resume = Event()
+
+    def wait(self, timeout=None):
+        notified = super().wait(timeout)
+        if threading.current_thread() is self.slow_thread:
+            self.release()
+            self.woken.set()
+            self.resume.wait(5)
+            self.acquire()
+        return notified
+
+
+def test_durable_failure_survives_a_later_successful_flush():
+    buffer = RecordingBuffer()
+    buffer._condition = condition = SlowWakeupCondition()
+    buffer.failures.append(RuntimeError("database is down"))
+    errors = []
+
+    def write_durable():
+        try:
+            buffer.write(1, "Completed", durable=True)
+        except RuntimeError as e:
+            errors.append(e)
+
+    writer = Thread(target=write_durable)
+    condition.slow_thread = writer
+    writer.start()
+
+    # The failed flush woke the writer up, another flush succeeds before it reads its error
+    assert condition.woken.wait(5)
+    buffer.write(2, "Running", durable=True)
+    condition.resume.set()
+    writer.join(5)
+    buffer.shutdown()
+
+    assert [str(e) for e in errors] == ["database is down"]
+    assert buffer._failed_generations == {}
+
+
+def test_failed_statuses_are_written_by_the_next_flush():
+    buffer = RecordingBuffer(flush_interval=0.01)
+    buffer.failures.append(RuntimeError("database is down"))
+
+    buffer.write(1, "Running")
+    buffer.write(2, "Running")
+    assert wait_for_flushes(buffer, 2)
+    buffer.shutdown()
+
+    assert buffer.flushes == [[(1, "Running"), (2, "Running")]] * 2
+
+
+def test_newer_status_wins_over_a_failed_one():
+    buffer = RecordingBuffer()
+    flushing = Event()
+    resume = Event()
+
+    def flush(rows):
+        buffer.flushes.append([(row["job_id"], row["new_status"]) for row in rows])
+        if len(buffer.flushes) == 1:
+            flushing.set()
+            resume.wait(5)
+            raise RuntimeError("database is down")
+
+    buffer._flush = flush
+    buffer.write(1, "Running")
+    buffer.write(2, "Running")
+    with buffer._condition:
+        buffer._flush_requested = True
+        buffer._condition.notify_all()
+    assert flushing.wait(5)
+
+    buffer.write(1, "Completed")
+    resume.set()
+    buffer.write(3, "Completed", durable=True)
+    buffer.shutdown()
+
+    assert [sorted(rows) for rows in buffer.flushes[1:]] == [
+        [(1, "Completed"), (2, "Running"), (3, "Completed")]
+    ]
+
+
+def test_retries_back_off():
+    buffer = RecordingBuffer(flush_interval=0.05)
+    buffer.retry_max_delay = 0.1
+    buffer.failures.extend(RuntimeError("database is down") for _ in range(3))
+
+    started = time.monotonic()
+    buffer.write(1, "Running")
+    assert wait_for_flushes(buffer, 4)
+    buffer.shutdown()
+
+    # Failed flushes are retried after 0.05, 0.1 then 0.1 seconds
+    assert time.monotonic() - started >= 0.25
+
+
+def wait_for_flushes(buffer, count, timeout=5):
+    deadline = time.monotonic() + timeout
+    while len(buffer.flushes) < count:
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
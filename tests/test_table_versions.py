@@ -0,0 +1,162 @@
+import time
+from collections import namedtuple
+from datetime import datetime
+
+import pytest
+from starlette.requests import Request
+
+from backend.config.db import get_database_connection
+from backend.helper import table_versions
+from backend.tasks import status_buffer
+
+Version = namedtuple("Version", ["version", "updated_at"])
+
+VERSION = Version(3, datetime(2030, 1, 1, 12, 0, 0, 500000))
+
+
+def request_with(**headers):
+    return Request(
+        {
+            "type": "http",
+            "headers": [
+                (name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()
+            ],
+        }
+    )
+
+
+def test_etag_changes_with_the_version_and_write_time():
+    etag = table_versions.get_etag(table_versions.JOBS, VERSION)
+
+    assert etag.startswith('W/"jobs-3-')
+    assert etag != table_versions.get_etag(table_versions.JOBS, Version(4, VERSION.updated_at))
+    assert etag != table_versions.get_etag(
+        table_versions.JOBS, Version(3, VERSION.updated_at.replace(microsecond=0))
+    )
+    assert etag != table_versions.get_etag(table_versions.JOB_TYPES, VERSION)
+
+
+def test_request_without_validators_is_modified():
+    assert not table_versions.is_not_modified(request_with(), table_versions.JOBS, VERSION)
+
+
+@pytest.mark.parametrize(
+    "if_none_match",
+    [
+        "{etag}",
+        "{strong}",
+        'W/"jobs-2-0", {etag}',
+        "*",
+    ],
+)
+def test_matching_etag_is_not_modified(if_none_match):
+    etag = table_versions.get_etag(table_versions.JOBS, VERSION)
+    request = request_with(
+        if_none_match=if_none_match.format(etag=etag, strong=etag.removeprefix("W/"))
+    )
+
+    assert table_versions.is_not_modified(request, table_versions.JOBS, VERSION)
+
+
+def test_other_etag_is_modified():
+    request = request_with(if_none_match='W/"jobs-2-0"')
+
+    assert not table_versions.is_not_modified(request, table_versions.JOBS, VERSION)
+
+
+def test_etag_takes_precedence_over_the_modification_date():
+    request = request_with(
+        if_none_match='W/"jobs-2-0"',
+        if_modified_since="Tue, 01 Jan 2030 12:00:00 GMT",
+    )
+
+    assert not table_versions.is_not_modified(request, table_versions.JOBS, VERSION)
+
+
+@pytest.mark.parametrize(
+    "if_modified_since, not_modified",
+    [
+        # Last-Modified has a one second resolution, the microseconds are dropped
+        ("Tue, 01 Jan 2030 12:00:00 GMT", True),
+        ("Tue, 01 Jan 2030 12:00:01 GMT", True),
+        ("Tue, 01 Jan 2030 11:59:59 GMT", False),
+        ("not a date", False),
+    ],
+)
+def test_modification_date(if_modified_since, not_modified):
+    request = request_with(if_modified_since=if_modified_since)
+
+    assert table_versions.is_not_modified(request, table_versions.JOBS, VERSION) is not_modified
+
+
+def test_unchanged_list_is_answered_with_304(client):
+    response = client.get("/event_mappings/")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    not_modified = client.get("/event_mappings/", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+    assert not_modified.headers["ETag"] == etag
+
+    not_modified = client.get(
+        "/event_mappings/", headers={"If-Modified-Since": response.headers["Last-Modified"]}
+    )
+    assert not_modified.status_code == 304
+
+
+def test_write_changes_the_etag_of_the_list(client):
+    etag = client.get("/event_mappings/").headers["ETag"]
+
+    created = client.post(
+        "/event_mappings/", json={"name": "etag-test-event", "description": "ETag test"}
+    )
+    assert created.status_code == 200
+
+    response = client.get("/event_mappings/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert "etag-test-event" in [mapping["name"] for mapping in response.json()]
+
+    client.delete(f"/event_mappings/{created.json()['id']}")
+
+
+def test_unchanged_job_page_is_answered_with_304(client):
+    etag = client.get("/jobs/").headers["ETag"]
+
+    assert client.get("/jobs/", headers={"If-None-Match": etag}).status_code == 304
+
+
+def get_jobs_version():
+    with get_database_connection() as db:
+        return table_versions.get_version(db, table_versions.JOBS).version
+
+
+def test_status_writes_bump_the_jobs_version_once(database):
+    table_versions.shutdown()
+    before = get_jobs_version()
+
+    for _ in range(10):
+        status_buffer.write_status(-1, "Running")
+
+    # Not in the transaction of the writes, which don't wait on the version row
+    assert get_jobs_version() == before
+
+    table_versions.shutdown()
+    assert get_jobs_version() == before + 1
+
+
+def test_pending_bumps_are_applied_by_the_bumper(database, monkeypatch):
+    monkeypatch.setattr(table_versions, "TABLE_VERSION_BUMP_INTERVAL_SECONDS", 0.01)
+    table_versions.shutdown()
+    before = get_jobs_version()
+
+    try:
+        table_versions.bump_later(table_versions.JOBS)
+        deadline = time.monotonic() + 5
+        while get_jobs_version() == before and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        table_versions.shutdown()
+
+    assert get_jobs_version() == before + 1